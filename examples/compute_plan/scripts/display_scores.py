@@ -34,10 +34,16 @@ columns = [
     ['TRAINTUPLE'],
     ['TESTTUPLE'],
 ]
-for i, testtuple_key in enumerate(testtuple_keys):
-    testtuple = client.get_testtuple(testtuple_key)
-    score = testtuple['dataset']['perf'] if testtuple['status'] == 'done' else testtuple['status']
+testtuples = client.get_many('testtuple', testtuple_keys)
+for i, (testtuple_key, testtuple) in enumerate(zip(testtuple_keys, testtuples)):
     columns[0].append(str(i+1))
+    # the testtuples which could not be fetched are returned as exceptions
+    if isinstance(testtuple, substra.sdk.exceptions.SDKException):
+        columns[1].append(f'{testtuple.__class__.__name__}: {testtuple}')
+        columns[2].append('')
+        columns[3].append(testtuple_key)
+        continue
+    score = testtuple['dataset']['perf'] if testtuple['status'] == 'done' else testtuple['status']
     columns[1].append(str(score))
     columns[2].append(testtuple['traintupleKey'])
     columns[3].append(testtuple['key'])
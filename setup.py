@@ -51,9 +51,12 @@ setup(
     packages=find_packages(exclude=['docs', 'tests*']),
     include_package_data=True,
     install_requires=['click', 'requests', 'docker', 'consolemd', 'pyyaml', 'keyring'],
+    extras_require={
+        'fast-json': ['ijson>=3.1'],
+    },
     python_requires='>=3.6',
     setup_requires=['pytest-runner'],
-    tests_require=['pytest', 'pytest-cov', 'pytest-mock', 'keyrings.alt'],
+    tests_require=['pytest', 'pytest-cov', 'pytest-mock', 'keyrings.alt', 'ijson>=3.1'],
     entry_points={
         'console_scripts': [
             'substra=substra.cli.interface:cli',
@@ -13,11 +13,13 @@
 # limitations under the License.
 
 from substra.__version__ import __version__
-from substra.sdk import Client, exceptions
+from substra.sdk import Client, AsyncClient, MultiClient, exceptions
 
 
 __all__ = [
     '__version__',
     'Client',
+    'AsyncClient',
+    'MultiClient',
     'exceptions',
 ]
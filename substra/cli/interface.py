@@ -12,28 +12,33 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import contextlib
 import json
 import functools
 import os
 import logging
+import sys
 
 import click
 import consolemd
 
 from substra import __version__, runner
 from substra.cli import printers
-from substra.sdk import assets, exceptions
+from substra.sdk import assets, exceptions, utils
+from substra.sdk import cache as assets_cache
 from substra.sdk import config as configuration
-from substra.sdk.client import Client
+from substra.sdk.client import Client, DEFAULT_MAX_WORKERS
+from substra.sdk.rest_client import DEFAULT_PAGE_SIZE
 from substra.sdk import user as usr
 
 
-def get_client(global_conf):
+def get_client(global_conf, cache_path=None):
     """Initialize substra client from config file, profile name and user file."""
     help_command = "substra config <url> ..."
 
     try:
-        client = Client(global_conf.config, global_conf.profile, global_conf.user)
+        client = Client(global_conf.config, global_conf.profile, global_conf.user,
+                        cache_path=cache_path)
 
     except FileNotFoundError:
         raise click.ClickException(
@@ -237,7 +242,8 @@ def error_printer(fn):
         except (exceptions.ConnectionError,
                 exceptions.InvalidResponse,
                 exceptions.LoadDataException,
-                exceptions.BadConfiguration) as e:
+                exceptions.BadConfiguration,
+                exceptions.WaitTimeout) as e:
             raise click.ClickException(str(e))
 
     return wrapper
@@ -309,10 +315,28 @@ def add(ctx):
               help='Add multiple data samples at once.')
 @click.option('--test-only', is_flag=True, default=False,
               help='Data sample(s) used as test data only.')
+@click.option('--stream', is_flag=True, default=False,
+              help='Archive local data samples while uploading them.')
+@click.option('--compression', type=click.Choice(utils.COMPRESSIONS),
+              help='Local data samples archive compression (default to the profile '
+                   'archive_compression or default). The bytes and time saved are displayed '
+                   'once the data samples are added.')
+@click.option('--batch-size', type=click.IntRange(min=1),
+              help='Add local data samples through concurrent batches of this size '
+                   '(requires --multiple).')
+@click.option('--workers', type=click.IntRange(min=1), default=DEFAULT_MAX_WORKERS,
+              show_default=True, help='Number of batches added concurrently.')
+@click.option('--journal', type=click.Path(dir_okay=False),
+              help='Journal file recording the added data samples, used to resume an '
+                   'interrupted ingestion (requires --batch-size).')
+@click.option('--precheck', is_flag=True, default=False,
+              help='Compute the data samples keys locally and skip the upload of the '
+                   'existing ones (requires --batch-size).')
 @click_global_conf
 @click.pass_context
 @error_printer
-def add_data_sample(ctx, path, dataset_key, local, multiple, test_only):
+def add_data_sample(ctx, path, dataset_key, local, multiple, test_only, stream, compression,
+                    batch_size, workers, journal, precheck):
     """Add data sample(s).
 
 
@@ -320,6 +344,17 @@ def add_data_sample(ctx, path, dataset_key, local, multiple, test_only):
     directory containing data samples directories (if --multiple option is
     set).
     """
+    if batch_size and not (multiple and local):
+        raise click.BadOptionUsage('--batch-size',
+                                   'The --batch-size option requires the --multiple and --local '
+                                   'options.')
+    if journal and not batch_size:
+        raise click.BadOptionUsage('--journal',
+                                   'The --journal option requires the --batch-size option.')
+    if precheck and not batch_size:
+        raise click.BadOptionUsage('--precheck',
+                                   'The --precheck option requires the --batch-size option.')
+
     client = get_client(ctx.obj)
     if multiple and local:
         subdirs = next(os.walk(path))[1]
@@ -337,9 +372,23 @@ def add_data_sample(ctx, path, dataset_key, local, multiple, test_only):
     }
     if test_only:
         data['test_only'] = True
-    res = client.add_data_samples(data, local=local)
+    if batch_size:
+        res = client.add_data_samples_in_batches(data, batch_size=batch_size,
+                                                 max_workers=workers, journal_path=journal,
+                                                 stream=stream, compression=compression,
+                                                 precheck=precheck)
+    else:
+        res = client.add_data_samples(data, local=local, stream=stream, compression=compression)
     display(res)
 
+    stats = client.get_archive_stats()
+    if stats['archives']:
+        time_saved = stats['time_saved']
+        time_saved = 'unknown time' if time_saved is None else f'~{time_saved:.2f}s'
+        click.echo(f"Archived {stats['archives']} data sample(s) in {stats['duration']:.2f}s: "
+                   f"{stats['files_size']} bytes into {stats['archive_size']} bytes, "
+                   f"{stats['bytes_saved']} bytes and {time_saved} saved", err=True)
+
 
 @add.command('dataset')
 @click.argument('data', type=click.Path(exists=True, dir_okay=False), callback=load_json_from_path,
@@ -841,21 +890,29 @@ def add_testtuple(ctx, objective_key, dataset_key, traintuple_key, data_samples,
 ]))
 @click.argument('asset-key')
 @click_option_expand
+@click.option('--no-cache', 'use_cache', is_flag=True, default=True, flag_value=False,
+              help='Fetch the asset from the server instead of the local cache '
+                   '(~/.substra-cache).')
 @click_global_conf_with_output_format
 @click.pass_context
 @error_printer
-def get(ctx, expand, asset_name, asset_key):
-    """Get asset definition."""
+def get(ctx, expand, use_cache, asset_name, asset_key):
+    """Get asset definition.
+
+    Assets are cached locally; the ones which may still change (datasets,
+    objectives, running tuples and compute plans) are only cached for a few
+    seconds.
+    """
     expand_valid_assets = (assets.DATASET, assets.TRAINTUPLE, assets.OBJECTIVE, assets.TESTTUPLE,
                            assets.COMPOSITE_TRAINTUPLE, assets.AGGREGATETUPLE, assets.COMPUTE_PLAN)
     if expand and asset_name not in expand_valid_assets:  # fail fast
         raise click.UsageError(
             f'--expand option is available with assets {expand_valid_assets}')
 
-    client = get_client(ctx.obj)
+    client = get_client(ctx.obj, cache_path=assets_cache.DEFAULT_PATH)
     # method must exist in sdk
     method = getattr(client, f'get_{asset_name.lower()}')
-    res = method(asset_key)
+    res = method(asset_key, cache=use_cache)
     printer = printers.get_asset_printer(asset_name, ctx.obj.output_format)
     printer.print(res, profile=ctx.obj.profile, expand=expand)
 
@@ -894,10 +951,17 @@ def get(ctx, expand, asset_name, asset_key):
 @click.pass_context
 @error_printer
 def list_(ctx, asset_name, filters, filters_logical_clause, advanced_filters):
-    """List assets."""
+    """List assets.
+
+    With the pretty output format, assets are displayed page by page as soon as
+    they are received.
+    """
     client = get_client(ctx.obj)
     # method must exist in sdk
-    method = getattr(client, f'list_{asset_name.lower()}')
+    if asset_name == assets.NODE:
+        method = client.list_node
+    else:
+        method = getattr(client, f'iter_{asset_name.lower()}')
     # handle filters
     if advanced_filters and filters:
         raise click.UsageError('The --filter and --advanced-filters options are mutually exclusive')
@@ -912,7 +976,10 @@ def list_(ctx, asset_name, filters, filters_logical_clause, advanced_filters):
         filters = advanced_filters
     res = method(filters)
     printer = printers.get_asset_printer(asset_name, ctx.obj.output_format)
-    printer.print(res, is_list=True)
+    if isinstance(printer, printers.AssetPrinter):
+        printer.print(res, is_list=True, chunk_size=DEFAULT_PAGE_SIZE)
+    else:
+        printer.print(list(res), is_list=True)
 
 
 @cli.command()
@@ -944,25 +1011,44 @@ def describe(ctx, asset_name, asset_key):
     assets.AGGREGATE_ALGO,
     assets.DATASET,
     assets.OBJECTIVE,
+    assets.COMPUTE_PLAN,
 ]))
 @click.argument('key')
 @click.option('--folder', type=click.Path(), help='destination folder',
               default='.')
+@click.option('--workers', type=click.IntRange(min=1), default=DEFAULT_MAX_WORKERS,
+              show_default=True, help='Number of files downloaded concurrently '
+                                      '(compute_plan only).')
 @click_global_conf
 @click.pass_context
 @error_printer
-def download(ctx, asset_name, key, folder):
+def download(ctx, asset_name, key, folder, workers):
     """Download asset implementation.
 
     \b
     - algo: the algo and its dependencies
     - dataset: the opener script
     - objective: the metrics and its dependencies
+    - compute_plan: the algos, openers and metrics of all its tuples, in
+      <folder>/<asset>/<key> folders
     """
     client = get_client(ctx.obj)
-    # method must exist in sdk
-    method = getattr(client, f'download_{asset_name.lower()}')
-    res = method(key, folder)
+    if asset_name == assets.COMPUTE_PLAN:
+        with contextlib.ExitStack() as stack:
+            bars = []
+
+            def progress(done, total):
+                if not bars:
+                    bars.append(stack.enter_context(
+                        click.progressbar(length=total, label='Downloading', file=sys.stderr)))
+                bars[0].update(done - bars[0].pos)
+
+            res = client.download_compute_plan(key, folder, max_workers=workers,
+                                               progress=progress)
+    else:
+        # method must exist in sdk
+        method = getattr(client, f'download_{asset_name.lower()}')
+        res = method(key, folder)
     display(res)
 
 
@@ -1092,6 +1178,35 @@ def cancel_compute_plan(ctx, compute_plan_id):
     printer.print(res, profile=ctx.obj.profile)
 
 
+@cli.group()
+@click.pass_context
+def watch(ctx):
+    """Watch execution of an asset."""
+    pass
+
+
+@watch.command('compute_plan')
+@click.argument('compute_plan_id', type=click.STRING)
+@click.option('--timeout', type=click.FloatRange(min=0),
+              help='Maximum duration of the watch, in seconds.')
+@click_global_conf
+@click.pass_context
+@error_printer
+def watch_compute_plan(ctx, compute_plan_id, timeout):
+    """Watch execution of a compute plan until it ends.
+
+    Display the status changes of the compute plan and of its tuples, and the
+    compute plan progress.
+    """
+    client = get_client(ctx.obj)
+    progress = printers.ProgressField('Progress', 'doneCount', 'tupleCount')
+    for event in client.watch_compute_plan(compute_plan_id, timeout=timeout):
+        line = f"{event['asset']} {event['key']}: {event['status']}"
+        if event['asset'] == assets.COMPUTE_PLAN:
+            line += f" ({progress.get_value(event['item'])})"
+        click.echo(line)
+
+
 @cli.group()
 @click.pass_context
 def update(ctx):
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 import json
 import math
 
@@ -154,22 +155,42 @@ class BasePrinter:
         return columns
 
     @staticmethod
-    def _get_column_widths(columns):
+    def _get_column_widths(columns, min_widths=None):
         column_widths = []
-        for column in columns:
+        for index, column in enumerate(columns):
             width = max([len(x) for x in column])
             width = (math.ceil(width / 4) + 1) * 4
+            if min_widths:
+                width = max(width, min_widths[index])
             column_widths.append(width)
         return column_widths
 
-    def print_table(self, items, fields):
-        columns = self._get_columns(items, fields)
-        column_widths = self._get_column_widths(columns)
-
-        for row_index in range(len(items) + 1):
-            for col_index, column in enumerate(columns):
-                print(column[row_index].ljust(column_widths[col_index]), end='')
-            print()
+    def print_table(self, items, fields, chunk_size=None):
+        """Print items as a table.
+
+        If `chunk_size` is set, items are consumed and printed by chunks of this size,
+        so that rows are printed as soon as they are available when items are a
+        generator. The column widths are then computed from the first chunk and only
+        grow with the following ones.
+        """
+        items = iter(items)
+        column_widths = None
+        # the first row of the columns is the header, printed with the first chunk only
+        first_row = 0
+        while True:
+            chunk = list(itertools.islice(items, chunk_size))
+            if first_row and not chunk:
+                break
+
+            columns = self._get_columns(chunk, fields)
+            column_widths = self._get_column_widths(columns, column_widths)
+            for row_index in range(first_row, len(chunk) + 1):
+                for col_index, column in enumerate(columns):
+                    print(column[row_index].ljust(column_widths[col_index]), end='')
+                print()
+            if chunk_size is None:
+                break
+            first_row = 1
 
     @staticmethod
     def _get_field_name_length(fields):
@@ -222,9 +243,9 @@ class AssetPrinter(BasePrinter):
         self.print_download_message(item, profile)
         self.print_description_message(item, profile)
 
-    def print(self, data, profile=None, expand=False, is_list=False):
+    def print(self, data, profile=None, expand=False, is_list=False, chunk_size=None):
         if is_list:
-            self.print_table(data, self._get_list_fields())
+            self.print_table(data, self._get_list_fields(), chunk_size=chunk_size)
         else:
             self.print_details(data, self._get_single_fields(), expand)
             self.print_messages(data, profile)
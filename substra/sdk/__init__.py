@@ -13,5 +13,8 @@
 # limitations under the License.
 
 from substra.sdk.client import Client
+from substra.sdk.async_client import AsyncClient
+from substra.sdk.multi_client import MultiClient
+from substra.sdk.compute_plan import ComputePlanBuilder
 
-__all__ = ['Client']
+__all__ = ['Client', 'AsyncClient', 'MultiClient', 'ComputePlanBuilder']
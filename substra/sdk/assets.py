@@ -30,6 +30,9 @@ _SERVER_MAPPER = {
     DATASET: 'data_manager',
 }
 
+# statuses of the executable assets once their execution has ended
+TERMINAL_STATUSES = ('done', 'failed', 'canceled')
+
 
 def get_all():
     return (
@@ -49,6 +52,16 @@ def get_all():
     )
 
 
+def get_executable():
+    return (
+        TESTTUPLE,
+        TRAINTUPLE,
+        AGGREGATETUPLE,
+        COMPOSITE_TRAINTUPLE,
+        COMPUTE_PLAN,
+    )
+
+
 def to_server_name(asset):
     try:
         return _SERVER_MAPPER[asset]
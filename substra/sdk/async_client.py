@@ -0,0 +1,93 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+
+from substra.sdk.client import Client, DEFAULT_RETRY_TIMEOUT
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+_ASYNC_METHOD_PREFIXES = ('add_', 'get_', 'list_', 'download_', 'describe_', 'wait')
+_SYNC_METHODS = ('add_profile', )
+
+
+class AsyncClient(object):
+    """Asyncio client mirroring the `Client` methods as coroutines.
+
+    Each call is run on the pooled connections of an underlying `Client` by a
+    thread pool of `max_concurrency` workers, so that many calls can be awaited
+    at once (e.g. with `asyncio.gather`) while at most `max_concurrency`
+    requests are in flight. The profile `pool_maxsize` should be at least
+    `max_concurrency` for all the connections to be reused.
+
+    Errors are raised as in the `Client`, from the `substra.exceptions` module.
+    """
+
+    def __init__(self, config_path=None, profile_name=None, user_path=None,
+                 retry_timeout=DEFAULT_RETRY_TIMEOUT, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 cache_path=None):
+        self.client = Client(
+            config_path=config_path,
+            profile_name=profile_name,
+            user_path=user_path,
+            retry_timeout=retry_timeout,
+            cache_path=cache_path,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Wait for pending calls and close the connections opened to the server."""
+        self._executor.shutdown(wait=True)
+        self.client.close()
+
+    def set_profile(self, profile_name):
+        """Set profile from profile name."""
+        return self.client.set_profile(profile_name)
+
+    def add_profile(self, profile_name, username, password, url, version='0.0', insecure=False):
+        """Add new profile (in-memory only)."""
+        return self.client.add_profile(
+            profile_name, username, password, url, version=version, insecure=insecure)
+
+    async def login(self):
+        """Login."""
+        return await self._run(self.client.login)
+
+    async def _run(self, f, *args, **kwargs):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(f, *args, **kwargs))
+
+
+def _make_async_method(name):
+    method = getattr(Client, name)
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await self._run(getattr(self.client, name), *args, **kwargs)
+
+    return wrapper
+
+
+for _name in dir(Client):
+    if _name.startswith(_ASYNC_METHOD_PREFIXES) and _name not in _SYNC_METHODS:
+        setattr(AsyncClient, _name, _make_async_method(_name))
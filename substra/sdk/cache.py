@@ -0,0 +1,352 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from substra.sdk import assets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.path.expanduser('~/.substra-cache')
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+DEFAULT_TTL = 30
+DEFAULT_FILES_MAX_SIZE = 2 * 1024 * 1024 * 1024
+DEFAULT_REVALIDATION_MAX_ENTRIES = 256
+DEFAULT_REVALIDATION_MAX_SIZE = 64 * 1024 * 1024
+
+# assets which may be updated once they are on the ledger
+_MUTABLE_ASSETS = (assets.DATASET, assets.OBJECTIVE)
+
+_SHA256_REGEX = re.compile(r'[0-9a-f]{64}')
+
+
+def is_file_hash(checksum):
+    """Return true if the checksum is a storage hash of a file (a sha256 hex digest)."""
+    return bool(checksum) and _SHA256_REGEX.fullmatch(checksum) is not None
+
+
+def get_file_hash(path):
+    """Get the sha256 hex digest of a file, as the storage hash of the assets files."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for data in iter(lambda: fh.read(1024 * 1024), b''):
+            sha256.update(data)
+    return sha256.hexdigest()
+
+
+def link_or_copy(src, dst):
+    """Hard link a file, or copy it if it cannot be linked (e.g. on another device)."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def is_immutable(asset, data):
+    """Return true if the asset cannot change anymore."""
+    if asset in _MUTABLE_ASSETS:
+        return False
+    if asset in assets.get_executable():
+        # executable assets are updated until their execution ends
+        return data.get('status') in assets.TERMINAL_STATUSES
+    return True
+
+
+class _BaseCache():
+    """Cache of files in a folder, evicting the least recently used ones.
+
+    The size of the cache is computed once from its folder, then kept up to date by
+    the writes and removals. The folder is only walked again when the cache exceeds
+    its max size: entries are then evicted down to `EVICTION_RATIO` of the max size
+    so that the following writes do not trigger an eviction right away.
+    """
+
+    EVICTION_RATIO = 0.9
+
+    def __init__(self, path, max_size):
+        self.path = path
+        self.max_size = max_size
+        self._size = None
+        self._size_lock = threading.Lock()
+
+    def _entries(self):
+        entries = []
+        for root, _, files in os.walk(self.path):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    entries.append((path, os.stat(path)))
+                except OSError:
+                    continue
+        return entries
+
+    def _get_size(self):
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(stat.st_size for _, stat in self._entries())
+            return self._size
+
+    def _add_size(self, delta):
+        with self._size_lock:
+            if self._size is not None:
+                self._size += delta
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    def _replace(self, tmp_path, path):
+        """Move a written temporary file to its entry path, accounting for its size."""
+        delta = self._file_size(tmp_path) - self._file_size(path)
+        os.replace(tmp_path, path)
+        self._add_size(delta)
+
+    def _evict(self):
+        if self._get_size() <= self.max_size:
+            return
+
+        # the folder may have been modified by other processes, the size is computed again
+        entries = self._entries()
+        size = sum(stat.st_size for _, stat in entries)
+        entries.sort(key=lambda e: e[1].st_mtime)
+        for path, stat in entries:
+            if size <= self.max_size * self.EVICTION_RATIO:
+                break
+            self._remove(path)
+            size -= stat.st_size
+
+        with self._size_lock:
+            self._size = size
+
+    def _remove(self, path):
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except OSError:
+            return
+        self._add_size(-size)
+
+
+class Cache(_BaseCache):
+    """On-disk cache of the assets fetched from a server.
+
+    Each asset is stored in a JSON file named after the server URL, the asset type
+    and the asset key. Immutable assets are kept until they are evicted; the other
+    ones (datasets, objectives, running tuples and compute plans) expire after
+    `ttl` seconds.
+
+    Once the cache exceeds `max_size` bytes, the least recently used entries are
+    evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL):
+        super().__init__(path, max_size)
+        self.ttl = ttl
+
+    def _entry_path(self, url, asset, key):
+        name = hashlib.sha256(f'{url}|{asset}|{key}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.path, name[:2], f'{name}.json')
+
+    def get(self, url, asset, key):
+        """Get a cached asset, or None if it is not cached or has expired."""
+        path = self._entry_path(url, asset, key)
+        try:
+            with open(path) as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+        now = time.time()
+        if not entry['immutable'] and entry['created_at'] + self.ttl < now:
+            self._remove(path)
+            return None
+
+        # the modification time of the entries is their last access time
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        logger.debug(f"Cache hit for {asset} '{key}'")
+        return entry['asset']
+
+    def set(self, url, asset, key, data):
+        """Cache an asset."""
+        path = self._entry_path(url, asset, key)
+        entry = {
+            'immutable': is_immutable(asset, data),
+            'created_at': time.time(),
+            'asset': data,
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write a temporary file first so that concurrent readers never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as fh:
+                json.dump(entry, fh)
+            self._replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+    def delete(self, url, asset, key):
+        """Remove an asset from the cache."""
+        self._remove(self._entry_path(url, asset, key))
+
+    def clear(self):
+        """Remove all the cached assets."""
+        for path, _ in self._entries():
+            self._remove(path)
+
+
+class FileCache(_BaseCache):
+    """On-disk cache of the files downloaded from a server, addressed by their hash.
+
+    Files are stored as `<hash>/<filename>`. They are checked against their hash
+    when they are read, so that a file modified in place through a hard link is
+    never served. Once the cache exceeds `max_size` bytes, the oldest files are
+    evicted.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_size=DEFAULT_FILES_MAX_SIZE):
+        super().__init__(path, max_size)
+
+    def get(self, checksum):
+        """Get the path of a cached file, or None if it is not cached."""
+        if not is_file_hash(checksum):
+            return None
+        folder = os.path.join(self.path, checksum)
+        try:
+            filename = next(f for f in os.listdir(folder) if not f.endswith('.tmp'))
+        except (OSError, StopIteration):
+            return None
+
+        path = os.path.join(folder, filename)
+        if get_file_hash(path) != checksum:
+            logger.warning(f"Removing cached file '{path}' which has been modified")
+            self._remove(path)
+            return None
+        logger.debug(f"Cache hit for file '{checksum}'")
+        return path
+
+    def add(self, checksum, path):
+        """Cache a file whose content has been checked against its hash."""
+        if not is_file_hash(checksum):
+            return
+        folder = os.path.join(self.path, checksum)
+        os.makedirs(folder, exist_ok=True)
+        # link a temporary file first so that concurrent readers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+        os.close(fd)
+        try:
+            link_or_copy(path, tmp_path)
+            self._replace(tmp_path, os.path.join(folder, os.path.basename(path)))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        self._evict()
+
+
+RevalidationEntry = collections.namedtuple('RevalidationEntry', ['etag', 'last_modified', 'body'])
+
+
+class RevalidationCache():
+    """In-memory cache of the responses to GET requests, revalidated by the server.
+
+    The raw body of the responses is stored with their `ETag` and `Last-Modified`
+    headers, so that the following requests to the same URL can be made conditional
+    and the cached body parsed again when the server responds 304 Not Modified.
+
+    Once there are more than `max_entries` entries or their bodies exceed `max_size`
+    bytes, the least recently used ones are evicted. Bodies larger than a sixteenth of
+    `max_size` (e.g. large lists) are not cached.
+    """
+
+    def __init__(self, max_entries=DEFAULT_REVALIDATION_MAX_ENTRIES,
+                 max_size=DEFAULT_REVALIDATION_MAX_SIZE):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.max_entry_size = max_size // 16
+        self._entries = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url, params):
+        return url, json.dumps(params, sort_keys=True, default=str)
+
+    def get(self, url, params=None):
+        """Get the cached entry of a request, or None if it is not cached."""
+        key = self._key(url, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def get_headers(entry):
+        """Get the headers making a request conditional on the cached entry."""
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    @staticmethod
+    def get_body(entry):
+        """Parse the cached body, which may then be modified by the caller."""
+        return json.loads(entry.body)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    def set(self, url, params, response):
+        """Cache the body of a response if it has validators and is not too large."""
+        etag = response.headers.get('etag')
+        last_modified = response.headers.get('last-modified')
+        body = response.content
+        key = self._key(url, params)
+        with self._lock:
+            self._pop(key)
+            if (not etag and not last_modified) or len(body) > self.max_entry_size:
+                return
+            # the raw body is immutable, it is stored as is
+            self._entries[key] = RevalidationEntry(etag, last_modified, body)
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_size:
+                self._pop(next(iter(self._entries)))
+
+    def clear(self):
+        """Remove all the cached responses."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
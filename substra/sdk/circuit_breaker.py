@@ -0,0 +1,126 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+
+from substra.sdk import exceptions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RECOVERY_TIMEOUT = 30
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# circuit breakers by server URL, shared by all the clients of the process
+_circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+class CircuitBreaker():
+    """Fail fast the requests to a server which is down.
+
+    The circuit opens after `failure_threshold` consecutive failures: requests then
+    raise `CircuitOpen` without being sent. After `recovery_timeout` seconds, the
+    circuit is half open and a single request is sent to probe the server; the
+    circuit is closed if it succeeds and opened again if it fails or times out. A
+    probe whose outcome is unknown after `recovery_timeout` seconds (e.g. it has been
+    interrupted) is replaced by a new one.
+    """
+
+    def __init__(self, url, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 recovery_timeout=DEFAULT_RECOVERY_TIMEOUT):
+        self.url = url
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self._failures = 0
+        # time at which the circuit has been opened, or the probe sent if it is half open
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raise `CircuitOpen` if the request must not be sent."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if now - self._opened_at >= self.recovery_timeout:
+                logger.info(f"Probing server '{self.url}'")
+                self.state = HALF_OPEN
+                self._opened_at = now
+                return
+        raise exceptions.CircuitOpen(
+            f"Server '{self.url}' is unavailable, requests are suspended", None)
+
+    def _open(self):
+        if self.state != OPEN:
+            logger.warning(f"Server '{self.url}' is unavailable, suspending requests "
+                           f"for {self.recovery_timeout}s")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+
+    def on_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Server '{self.url}' is available again")
+            self.state = CLOSED
+            self._failures = 0
+
+    def on_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open()
+
+    def on_timeout(self):
+        """Record a request which has timed out.
+
+        A timeout does not tell whether the server is available: it does not change
+        the count of failures, but a timed out probe opens the circuit again.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+
+    def release(self):
+        """Release the probe of a request interrupted before its outcome is known."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                # the next request probes the server right away
+                self.state = OPEN
+                self._opened_at = time.monotonic() - self.recovery_timeout
+
+
+def get(url, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+        recovery_timeout=DEFAULT_RECOVERY_TIMEOUT):
+    """Get the circuit breaker of a server URL, shared by all the clients of the process."""
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(url, failure_threshold, recovery_timeout)
+            _circuit_breakers[url] = breaker
+        breaker.failure_threshold = failure_threshold
+        breaker.recovery_timeout = recovery_timeout
+        return breaker
+
+
+def reset():
+    """Forget the state of all the servers."""
+    with _circuit_breakers_lock:
+        _circuit_breakers.clear()
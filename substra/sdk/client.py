@@ -14,55 +14,147 @@
 
 from copy import deepcopy
 import functools
+import inspect
 import logging
 import os
+import threading
 import time
 import json
 
 import keyring
 
 from substra.sdk import utils, assets, rest_client, exceptions
+from substra.sdk import cache as assets_cache
 from substra.sdk import config as cfg
+from substra.sdk import download as dl
+from substra.sdk import journal as jnl
 from substra.sdk import user as usr
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_RETRY_TIMEOUT = 5 * 60
+# as many workers as pooled connections
+DEFAULT_MAX_WORKERS = rest_client.DEFAULT_POOL_MAXSIZE
+DEFAULT_BATCH_SIZE = 10
+DEFAULT_POLL_MIN_DELAY = 1
+DEFAULT_POLL_MAX_DELAY = 30
+
+
+def _log_done(name, ts, error):
+    elaps = (time.time() - ts) * 1000
+    logger.info(f'{name}: done in {elaps:.2f}ms; error={error}')
+
+
+def _log_generator(name, generator, ts):
+    error = None
+    try:
+        yield from generator
+    except Exception as e:
+        error = e.__class__.__name__
+        raise
+    finally:
+        _log_done(name, ts, error)
 
 
 def logit(f):
-    """Decorator used to log all high-level methods of the Substra client."""
+    """Decorator used to log all high-level methods of the Substra client.
+
+    The methods returning a generator are logged once it has been consumed.
+    """
     @functools.wraps(f)
     def wrapper(*args, **kwargs):
         logger.debug(f'{f.__name__}: call')
         ts = time.time()
+        res = None
         error = None
         try:
-            return f(*args, **kwargs)
+            res = f(*args, **kwargs)
         except Exception as e:
             error = e.__class__.__name__
             raise
         finally:
             # add a log even if the function raises an exception
-            te = time.time()
-            elaps = (te - ts) * 1000
-            logger.info(f'{f.__name__}: done in {elaps:.2f}ms; error={error}')
+            if not inspect.isgenerator(res):
+                _log_done(f.__name__, ts, error)
+        if inspect.isgenerator(res):
+            return _log_generator(f.__name__, res, ts)
+        return res
     return wrapper
 
 
+# field of the downloadable file and its default filename, by asset
+_DOWNLOADABLE_FILES = {
+    assets.ALGO: ('content', 'algo.tar.gz'),
+    assets.AGGREGATE_ALGO: ('content', 'aggregate_algo.tar.gz'),
+    assets.COMPOSITE_ALGO: ('content', 'composite_algo.tar.gz'),
+    assets.DATASET: ('opener', 'opener.py'),
+    assets.OBJECTIVE: ('metrics', 'metrics.py'),
+}
+
+# compute plan field of the tuple keys, tuple asset and algo asset
+_COMPUTE_PLAN_TUPLES = (
+    ('traintupleKeys', assets.TRAINTUPLE, assets.ALGO),
+    ('compositeTraintupleKeys', assets.COMPOSITE_TRAINTUPLE, assets.COMPOSITE_ALGO),
+    ('aggregatetupleKeys', assets.AGGREGATETUPLE, assets.AGGREGATE_ALGO),
+    ('testtupleKeys', assets.TESTTUPLE, None),
+)
+
+
+def _watch_event(asset, key, item, previous_status):
+    return {
+        'asset': asset,
+        'key': key,
+        'status': item['status'],
+        'previous_status': previous_status,
+        'item': item,
+    }
+
+
+def _raise_first_error(results):
+    errors = [r for r in results if isinstance(r, exceptions.SDKException)]
+    if errors:
+        raise errors[0]
+
+
 def get_asset_key(data):
     return data.get('pkhash') or data.get('key')
 
 
 class Client(object):
+    """Client of the Substra platform.
+
+    If `cache_path` is set, the assets fetched by the `get_*` methods are cached
+    on disk in this folder (e.g. `substra.sdk.cache.DEFAULT_PATH`) and are not
+    fetched again from the server. Running tuples and compute plans, datasets and
+    objectives are only cached for a few seconds as they may still change. The
+    `cache=False` argument of the `get_*` methods bypasses the cache.
+
+    The files fetched by the `download_*` methods are cached as well, by their
+    storage hash: a file already downloaded is hard linked (or copied) from the
+    cache instead of being fetched again. As hard links share their content,
+    downloaded files should be replaced rather than modified in place.
+
+    The `get_*`, `add_*` and `download_*` methods accept a `deadline` argument, a
+    `time.time()` timestamp after which the call fails with `DeadlineExceeded`
+    instead of waiting for a response or retrying. The `connect_timeout` and
+    `read_timeout` fields of the profile bound the time spent waiting for the
+    server by each request.
+    """
 
     def __init__(self, config_path=None, profile_name=None, user_path=None,
-                 retry_timeout=DEFAULT_RETRY_TIMEOUT):
+                 retry_timeout=DEFAULT_RETRY_TIMEOUT, cache_path=None):
         self._cfg_manager = cfg.Manager(config_path or cfg.DEFAULT_PATH)
         self._usr_manager = usr.Manager(user_path or usr.DEFAULT_PATH)
+        self._cache = None
+        self._file_cache = None
+        if cache_path:
+            self._cache = assets_cache.Cache(os.path.join(cache_path, 'assets'))
+            self._file_cache = assets_cache.FileCache(os.path.join(cache_path, 'files'))
         self._current_profile = None
         self._profiles = {}
         self.client = rest_client.Client()
+        self._archive_stats = utils.ArchiveStats()
+        self._archive_stats_lock = threading.Lock()
         self._profile_name = 'default'
         self._retry_timeout = retry_timeout
 
@@ -73,6 +165,49 @@ class Client(object):
         # set current logged user if exists
         self.set_user()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the connections opened to the server.
+
+        The client can also be used as a context manager to release its
+        connections on exit.
+        """
+        self.client.close()
+
+    def get_retry_metrics(self):
+        """Get the counts of requests and retries.
+
+        Requests failing with transient errors are retried with an exponential
+        backoff, up to the `retry_max_attempts` field of the profile (5 by default).
+        The returned dict counts the `calls`, the `retries` (also by error as
+        `retries.<error>`) and the calls which failed once their retries were
+        exhausted (`retries_exhausted`, `retry_budget_exhausted`).
+        """
+        return self.client.get_retry_metrics()
+
+    def _add_archive_stats(self, stats):
+        with self._archive_stats_lock:
+            self._archive_stats.merge(stats)
+
+    def get_archive_stats(self):
+        """Get the stats of the data sample archives built by the client.
+
+        The returned dict sums the stats of all the archives: the number of
+        `archives`, the size of the archived files (`files_size`), of the files
+        stored without compression (`stored_size`) and of the archives
+        (`archive_size`), the time spent archiving (`duration`), the `bytes_saved`
+        by the compression and the `time_saved` by storing files without compression.
+        The time saved is estimated from the throughput of the compressed files; it
+        is None if no file has been compressed.
+        """
+        with self._archive_stats_lock:
+            return self._archive_stats.to_dict()
+
     @logit
     def login(self):
         """Login.
@@ -142,10 +277,16 @@ class Client(object):
         keyring.set_password(profile_name, username, password)
         return self._set_current_profile(profile_name, profile)
 
-    def _add(self, asset, data, files=None, exist_ok=False):
+    def _add(self, asset, data, files=None, exist_ok=False, stream=False, deadline=None):
         """Add asset."""
         data = deepcopy(data)  # make a deep copy for avoiding modification by reference
-        if files:
+        if files and stream:
+            body = utils.MultipartStream({'json': json.dumps(data)}, files)
+            requests_kwargs = {
+                'data': body,
+                'headers': {'Content-Type': body.content_type},
+            }
+        elif files:
             requests_kwargs = {
                 'data': {
                     'json': json.dumps(data),
@@ -161,21 +302,72 @@ class Client(object):
             asset,
             retry_timeout=self._retry_timeout,
             exist_ok=exist_ok,
+            deadline=deadline,
             **requests_kwargs)
 
-    def _add_data_samples(self, data, local=True):
+    def _get_cache_url(self):
+        return (self._current_profile or {}).get('url')
+
+    def _get(self, asset, key, cache=True, deadline=None):
+        """Get asset, from the cache if it is enabled."""
+        if self._cache is not None and cache:
+            data = self._cache.get(self._get_cache_url(), asset, key)
+            if data is not None:
+                return data
+
+        data = self.client.get(asset, key, deadline=deadline)
+        if self._cache is not None:
+            self._cache.set(self._get_cache_url(), asset, key, data)
+        return data
+
+    def _invalidate(self, asset, key):
+        if self._cache is not None:
+            self._cache.delete(self._get_cache_url(), asset, key)
+
+    def _get_archive_compression(self, compression):
+        """Get the data sample archive compression, defaulting to the profile one."""
+        if compression is None:
+            profile = self._current_profile or {}
+            compression = profile.get('archive_compression', utils.COMPRESSION_DEFAULT)
+        if compression not in utils.COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression '{compression}', must be one of {utils.COMPRESSIONS}")
+        return compression
+
+    def _get_archive_workers(self):
+        """Get the number of threads compressing the data sample archives."""
+        profile = self._current_profile or {}
+        return profile.get('archive_workers')
+
+    def _add_data_samples(self, data, local=True, stream=False, compression=None,
+                          deadline=None):
         """Create new data sample(s) asset."""
         if not local:
             return self._add(
                 assets.DATA_SAMPLE, data,
-                exist_ok=False)
-        with utils.extract_data_sample_files(data) as (data, files):
+                exist_ok=False, deadline=deadline)
+        compression = self._get_archive_compression(compression)
+        with utils.extract_data_sample_files(
+                data, stream=stream, compression=compression,
+                max_workers=self._get_archive_workers(),
+                on_stats=self._add_archive_stats) as (data, files):
             return self._add(
                 assets.DATA_SAMPLE, data,
-                files=files, exist_ok=False)
+                files=files, exist_ok=False, stream=stream, deadline=deadline)
+
+    def _get_existing_data_sample_keys(self, paths, max_workers=DEFAULT_MAX_WORKERS):
+        """Get the keys of the local data sample paths which already exist on the server.
+
+        The keys are computed locally from the content of the paths and compared with
+        the data samples listed through a single request.
+        """
+        hashes = utils.map_concurrently(utils.get_data_sample_hash, paths, max_workers)
+        existing_keys = set(get_asset_key(d) for d in self.list_data_sample())
+        return {p: h for p, h in zip(paths, hashes) if h in existing_keys}
 
     @logit
-    def add_data_sample(self, data, local=True, exist_ok=False):
+    def add_data_sample(self, data, local=True, exist_ok=False, stream=False, compression=None,
+                        precheck=False, deadline=None):
         """Create new data sample asset.
 
         `data` is a dict object with the following schema:
@@ -199,19 +391,49 @@ class Client(object):
         filesystem. This directory must be accessible (readable) by the server.  This
         mode is well suited for all kind of file sizes.
 
+        If `stream` is true, the local directory is archived chunk by chunk while it is
+        being uploaded through a chunked HTTP request, instead of being archived in
+        memory before the upload starts. The memory used is then bounded whatever the
+        directory size.
+
+        If `local` is true, `compression` defines how the directory is archived before
+        being transferred:
+        - `store`: files are not compressed
+        - `fast`: fastest compression
+        - `default`: default compression level
+        - `best`: highest compression ratio
+        - `auto`: files with an already compressed format (images, videos, archives,
+          parquet files...) are not compressed, the other ones are compressed with the
+          default level
+
+        If `compression` is not set, the `archive_compression` field of the profile is
+        used, `default` otherwise. If the `archive_workers` field of the profile is
+        greater than 1, the files of the directory are compressed concurrently by as
+        many threads. The archive sizes and duration are logged and summed in
+        `Client.get_archive_stats`.
+
         If a data sample with the same content already exists, an `AlreadyExists` exception will be
         raised.
 
         If `exist_ok` is true, `AlreadyExists` exceptions will be ignored and the
         existing asset will be returned.
 
+        If `local` and `precheck` are true, the key of the data sample is computed from
+        the directory content and looked up on the server before archiving the
+        directory, so that an existing data sample is not uploaded again.
+
         """
         if 'paths' in data:
             raise ValueError("data: invalid 'paths' field")
         if 'path' not in data:
             raise ValueError("data: missing 'path' field")
         try:
-            data_samples = self._add_data_samples(data, local=local)
+            existing_keys = (self._get_existing_data_sample_keys([data['path']])
+                             if local and precheck else {})
+            if existing_keys:
+                raise exceptions.AlreadyExists(list(existing_keys.values()), 409)
+            data_samples = self._add_data_samples(
+                data, local=local, stream=stream, compression=compression, deadline=deadline)
         except exceptions.AlreadyExists as e:
             # exist_ok option must be handle separately for data samples as a get action
             # is not allowed on data samples
@@ -225,7 +447,8 @@ class Client(object):
         return data_samples[0]
 
     @logit
-    def add_data_samples(self, data, local=True):
+    def add_data_samples(self, data, local=True, stream=False, compression=None,
+                         deadline=None):
         """Create many data sample assets.
 
         `data` is a dict object with the following schema:
@@ -242,11 +465,13 @@ class Client(object):
         The `paths` in the data dictionary must be a list of paths where each path
         points to a directory representing one data sample.
 
-        For the `local` argument, please refer to the method `Client.add_data_sample`.
+        For the `local`, `stream` and `compression` arguments, please refer to the
+        method `Client.add_data_sample`.
 
         This method is well suited for adding multiple small files only. For adding a
-        large amount of data it is recommended to add them one by one. It allows a
-        better control in case of failures.
+        large amount of data it is recommended to use the method
+        `Client.add_data_samples_in_batches`. It allows a better control in case of
+        failures.
 
         If data samples with the same content as any of the paths already exists, an `AlreadyExists`
         exception will be raised.
@@ -255,10 +480,105 @@ class Client(object):
             raise ValueError("data: invalid 'path' field")
         if 'paths' not in data:
             raise ValueError("data: missing 'paths' field")
-        return self._add_data_samples(data, local=local)
+        return self._add_data_samples(data, local=local, stream=stream, compression=compression,
+                                      deadline=deadline)
+
+    @staticmethod
+    def _get_batch_keys(paths, res, local):
+        """Map the data samples added by a batch to their paths.
+
+        Local paths are matched with the keys computed from their content. Otherwise,
+        or if the server computed different keys, the server is expected to return the
+        created data samples in the order of the paths.
+        """
+        if len(res) != len(paths):
+            raise exceptions.InvalidResponse(
+                res, f"{len(res)} data samples returned for a batch of {len(paths)} paths")
+        keys = [get_asset_key(r) for r in res]
+        if local:
+            hashes = {p: utils.get_data_sample_hash(p) for p in paths}
+            if set(hashes.values()) == set(keys):
+                return hashes
+            logger.warning('The data sample keys returned by the server do not match the '
+                           'local ones, mapping them to the paths by position')
+        return dict(zip(paths, keys))
 
     @logit
-    def add_dataset(self, data, exist_ok=False):
+    def add_data_samples_in_batches(self, data, local=True, batch_size=DEFAULT_BATCH_SIZE,
+                                    max_workers=DEFAULT_MAX_WORKERS, journal_path=None,
+                                    stream=False, compression=None, precheck=False,
+                                    deadline=None):
+        """Create many data sample assets through concurrent batches.
+
+        `data` is a dict object with the same schema as for the method
+        `Client.add_data_samples`. For the `local`, `stream` and `compression`
+        arguments, please refer to the method `Client.add_data_sample`.
+
+        The `paths` are split in batches of `batch_size` data samples, each batch being
+        archived and added through a single HTTP request. Up to `max_workers` batches
+        are processed concurrently.
+
+        If `journal_path` is set, the paths of the added data samples and their keys are
+        recorded in this file as soon as their batch is added. Running the method again
+        with the same journal only adds the data samples which are not in the journal,
+        so that an interrupted ingestion resumes where it stopped.
+
+        If `local` and `precheck` are true, the keys of the data samples are computed
+        from the content of the paths and looked up on the server before the
+        ingestion; the data samples which already exist are not uploaded again. Their
+        keys are returned and recorded in the journal as for the added ones.
+
+        A failed batch does not stop the other ones; once all the batches have been
+        processed the first error is raised.
+
+        Returns the keys of the data samples, in the order of `paths`.
+        """
+        if 'path' in data:
+            raise ValueError("data: invalid 'path' field")
+        if 'paths' not in data:
+            raise ValueError("data: missing 'paths' field")
+
+        journal = jnl.Journal(journal_path) if journal_path else None
+        keys = journal.load() if journal else {}
+
+        paths = [os.path.abspath(p) if local else p for p in data['paths']]
+        remaining_paths = [p for p in paths if p not in keys]
+        if len(remaining_paths) < len(paths):
+            logger.info(f'Resuming ingestion: {len(paths) - len(remaining_paths)} data samples '
+                        f'already added')
+
+        if local and precheck and remaining_paths:
+            existing_keys = self._get_existing_data_sample_keys(remaining_paths, max_workers)
+            if existing_keys:
+                logger.info(f'Skipping {len(existing_keys)} data samples which already exist')
+                if journal:
+                    journal.add(existing_keys)
+                keys.update(existing_keys)
+                remaining_paths = [p for p in remaining_paths if p not in existing_keys]
+        batches = [remaining_paths[i:i + batch_size]
+                   for i in range(0, len(remaining_paths), batch_size)]
+
+        def _add_batch(batch_paths):
+            batch_data = dict(data, paths=batch_paths)
+            res = self._add_data_samples(
+                batch_data, local=local, stream=stream, compression=compression,
+                deadline=deadline)
+            batch_keys = self._get_batch_keys(batch_paths, res, local)
+            if journal:
+                journal.add(batch_keys)
+            keys.update(batch_keys)
+            logger.info(f'Added batch of {len(batch_paths)} data samples')
+
+        results = utils.map_concurrently(_add_batch, batches, max_workers)
+        errors = [r for r in results if isinstance(r, exceptions.SDKException)]
+        if errors:
+            logger.error(f'{len(errors)}/{len(batches)} batches of data samples failed')
+            raise errors[0]
+
+        return [keys[p] for p in paths]
+
+    @logit
+    def add_dataset(self, data, exist_ok=False, deadline=None):
         """Create new dataset asset.
 
         `data` is a dict object with the following schema:
@@ -286,14 +606,15 @@ class Client(object):
         """
         attributes = ['data_opener', 'description']
         with utils.extract_files(data, attributes) as (data, files):
-            res = self._add(assets.DATASET, data, files=files, exist_ok=exist_ok)
+            res = self._add(assets.DATASET, data, files=files, exist_ok=exist_ok,
+                            deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_dataset(get_asset_key(res))
+        return self._get(assets.DATASET, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_objective(self, data, exist_ok=False):
+    def add_objective(self, data, exist_ok=False, deadline=None):
         """Create new objective asset.
 
         `data` is a dict object with the following schema:
@@ -322,14 +643,15 @@ class Client(object):
         """
         attributes = ['metrics', 'description']
         with utils.extract_files(data, attributes) as (data, files):
-            res = self._add(assets.OBJECTIVE, data, files=files, exist_ok=exist_ok)
+            res = self._add(assets.OBJECTIVE, data, files=files, exist_ok=exist_ok,
+                            deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_objective(get_asset_key(res))
+        return self._get(assets.OBJECTIVE, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_algo(self, data, exist_ok=False):
+    def add_algo(self, data, exist_ok=False, deadline=None):
         """Create new algo asset.
 
         `data` is a dict object with the following schema:
@@ -355,14 +677,15 @@ class Client(object):
         """
         attributes = ['file', 'description']
         with utils.extract_files(data, attributes) as (data, files):
-            res = self._add(assets.ALGO, data, files=files, exist_ok=exist_ok)
+            res = self._add(assets.ALGO, data, files=files, exist_ok=exist_ok,
+                            deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_algo(get_asset_key(res))
+        return self._get(assets.ALGO, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_aggregate_algo(self, data, exist_ok=False):
+    def add_aggregate_algo(self, data, exist_ok=False, deadline=None):
         """Create new aggregate algo asset.
         `data` is a dict object with the following schema:
 ```
@@ -385,14 +708,15 @@ class Client(object):
         """
         attributes = ['file', 'description']
         with utils.extract_files(data, attributes) as (data, files):
-            res = self._add(assets.AGGREGATE_ALGO, data, files=files, exist_ok=exist_ok)
+            res = self._add(assets.AGGREGATE_ALGO, data, files=files, exist_ok=exist_ok,
+                            deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_aggregate_algo(get_asset_key(res))
+        return self._get(assets.AGGREGATE_ALGO, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_composite_algo(self, data, exist_ok=False):
+    def add_composite_algo(self, data, exist_ok=False, deadline=None):
         """Create new composite algo asset.
         `data` is a dict object with the following schema:
 ```
@@ -415,14 +739,15 @@ class Client(object):
         """
         attributes = ['file', 'description']
         with utils.extract_files(data, attributes) as (data, files):
-            res = self._add(assets.COMPOSITE_ALGO, data, files=files, exist_ok=exist_ok)
+            res = self._add(assets.COMPOSITE_ALGO, data, files=files, exist_ok=exist_ok,
+                            deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_composite_algo(get_asset_key(res))
+        return self._get(assets.COMPOSITE_ALGO, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_traintuple(self, data, exist_ok=False):
+    def add_traintuple(self, data, exist_ok=False, deadline=None):
         """Create new traintuple asset.
 
         `data` is a dict object with the following schema:
@@ -446,14 +771,14 @@ class Client(object):
         If `exist_ok` is true, `AlreadyExists` exceptions will be ignored and the
         existing asset will be returned.
         """
-        res = self._add(assets.TRAINTUPLE, data, exist_ok=exist_ok)
+        res = self._add(assets.TRAINTUPLE, data, exist_ok=exist_ok, deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_traintuple(get_asset_key(res))
+        return self._get(assets.TRAINTUPLE, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_aggregatetuple(self, data, exist_ok=False):
+    def add_aggregatetuple(self, data, exist_ok=False, deadline=None):
         """Create new aggregatetuple asset.
         `data` is a dict object with the following schema:
 ```
@@ -474,14 +799,14 @@ class Client(object):
         If `exist_ok` is true, `AlreadyExists` exceptions will be ignored and the
         existing asset will be returned.
         """
-        res = self._add(assets.AGGREGATETUPLE, data, exist_ok=exist_ok)
+        res = self._add(assets.AGGREGATETUPLE, data, exist_ok=exist_ok, deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_aggregatetuple(get_asset_key(res))
+        return self._get(assets.AGGREGATETUPLE, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_composite_traintuple(self, data, exist_ok=False):
+    def add_composite_traintuple(self, data, exist_ok=False, deadline=None):
         """Create new composite traintuple asset.
         `data` is a dict object with the following schema:
 ```
@@ -511,14 +836,14 @@ class Client(object):
         If `exist_ok` is true, `AlreadyExists` exceptions will be ignored and the
         existing asset will be returned.
         """
-        res = self._add(assets.COMPOSITE_TRAINTUPLE, data, exist_ok=exist_ok)
+        res = self._add(assets.COMPOSITE_TRAINTUPLE, data, exist_ok=exist_ok, deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_composite_traintuple(get_asset_key(res))
+        return self._get(assets.COMPOSITE_TRAINTUPLE, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_testtuple(self, data, exist_ok=False):
+    def add_testtuple(self, data, exist_ok=False, deadline=None):
         """Create new testtuple asset.
 
         `data` is a dict object with the following schema:
@@ -542,14 +867,14 @@ class Client(object):
         If `exist_ok` is true, `AlreadyExists` exceptions will be ignored and the
         existing asset will be returned.
         """
-        res = self._add(assets.TESTTUPLE, data, exist_ok=exist_ok)
+        res = self._add(assets.TESTTUPLE, data, exist_ok=exist_ok, deadline=deadline)
 
         # The backend has inconsistent API responses when getting or adding an asset (with much
         # less data when responding to adds). A second GET request hides the discrepancies.
-        return self.get_testtuple(get_asset_key(res))
+        return self._get(assets.TESTTUPLE, get_asset_key(res), deadline=deadline)
 
     @logit
-    def add_compute_plan(self, data):
+    def add_compute_plan(self, data, deadline=None):
         """Create compute plan.
 
         Data is a dict object with the following schema:
@@ -598,57 +923,170 @@ class Client(object):
         As specified in the data dict structure, output trunk models of composite
         traintuples cannot be made public.
         """
-        return self._add(assets.COMPUTE_PLAN, data)
+        return self._add(assets.COMPUTE_PLAN, data, deadline=deadline)
 
     @logit
-    def get_algo(self, algo_key):
+    def get_algo(self, algo_key, cache=True, deadline=None):
         """Get algo by key."""
-        return self.client.get(assets.ALGO, algo_key)
+        return self._get(assets.ALGO, algo_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_compute_plan(self, compute_plan_key):
+    def get_compute_plan(self, compute_plan_key, cache=True, deadline=None):
         """Get compute plan by key."""
-        return self.client.get(assets.COMPUTE_PLAN, compute_plan_key)
+        return self._get(assets.COMPUTE_PLAN, compute_plan_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_aggregate_algo(self, aggregate_algo_key):
+    def get_aggregate_algo(self, aggregate_algo_key, cache=True, deadline=None):
         """Get aggregate algo by key."""
-        return self.client.get(assets.AGGREGATE_ALGO, aggregate_algo_key)
+        return self._get(assets.AGGREGATE_ALGO, aggregate_algo_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_composite_algo(self, composite_algo_key):
+    def get_composite_algo(self, composite_algo_key, cache=True, deadline=None):
         """Get composite algo by key."""
-        return self.client.get(assets.COMPOSITE_ALGO, composite_algo_key)
+        return self._get(assets.COMPOSITE_ALGO, composite_algo_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_dataset(self, dataset_key):
+    def get_dataset(self, dataset_key, cache=True, deadline=None):
         """Get dataset by key."""
-        return self.client.get(assets.DATASET, dataset_key)
+        return self._get(assets.DATASET, dataset_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_objective(self, objective_key):
+    def get_objective(self, objective_key, cache=True, deadline=None):
         """Get objective by key."""
-        return self.client.get(assets.OBJECTIVE, objective_key)
+        return self._get(assets.OBJECTIVE, objective_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_testtuple(self, testtuple_key):
+    def get_testtuple(self, testtuple_key, cache=True, deadline=None):
         """Get testtuple by key."""
-        return self.client.get(assets.TESTTUPLE, testtuple_key)
+        return self._get(assets.TESTTUPLE, testtuple_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_traintuple(self, traintuple_key):
+    def get_traintuple(self, traintuple_key, cache=True, deadline=None):
         """Get traintuple by key."""
-        return self.client.get(assets.TRAINTUPLE, traintuple_key)
+        return self._get(assets.TRAINTUPLE, traintuple_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_aggregatetuple(self, aggregatetuple_key):
+    def get_aggregatetuple(self, aggregatetuple_key, cache=True, deadline=None):
         """Get aggregatetuple by key."""
-        return self.client.get(assets.AGGREGATETUPLE, aggregatetuple_key)
+        return self._get(assets.AGGREGATETUPLE, aggregatetuple_key, cache=cache, deadline=deadline)
 
     @logit
-    def get_composite_traintuple(self, composite_traintuple_key):
+    def get_composite_traintuple(self, composite_traintuple_key, cache=True, deadline=None):
         """Get composite traintuple by key."""
-        return self.client.get(assets.COMPOSITE_TRAINTUPLE, composite_traintuple_key)
+        return self._get(assets.COMPOSITE_TRAINTUPLE, composite_traintuple_key, cache=cache,
+                         deadline=deadline)
+
+    @logit
+    def get_many(self, asset, keys, max_workers=DEFAULT_MAX_WORKERS, cache=True,
+                 deadline=None):
+        """Get many assets of the same type by key.
+
+        The assets are fetched concurrently by `max_workers` threads sharing the
+        client connection pool, and are returned in the order of `keys`.
+
+        A key that cannot be fetched does not fail the whole batch: the raised
+        `SDKException` (e.g. `NotFound`) is returned in place of its asset.
+        """
+        # data samples, models and nodes have no get method
+        if asset not in assets.get_all() or not hasattr(self, f'get_{asset}'):
+            raise ValueError(f"Cannot get asset '{asset}'")
+        method = functools.partial(getattr(self, f'get_{asset}'), cache=cache, deadline=deadline)
+        return utils.map_concurrently(method, keys, max_workers)
+
+    @logit
+    def wait(self, asset, key, timeout=None, min_delay=DEFAULT_POLL_MIN_DELAY,
+             max_delay=DEFAULT_POLL_MAX_DELAY):
+        """Wait for the execution of a tuple or a compute plan to end.
+
+        The asset is polled every `min_delay` seconds at first; the delay is
+        increased up to `max_delay` seconds as long as its status does not change.
+
+        Returns the asset once its status is `done`, `failed` or `canceled`. If
+        `timeout` (in seconds) is set, a `WaitTimeout` exception is raised once it
+        has elapsed.
+        """
+        if asset not in assets.get_executable():
+            raise ValueError(f"Cannot wait for asset '{asset}'")
+        method = getattr(self, f'get_{asset}')
+        poller = utils.Poller(min_delay, max_delay, timeout)
+
+        status = None
+        while True:
+            data = method(key, cache=False)
+            if data['status'] in assets.TERMINAL_STATUSES:
+                return data
+            if not poller.wait(changed=data['status'] != status):
+                raise exceptions.WaitTimeout(asset, key, data['status'])
+            status = data['status']
+
+    @logit
+    def watch_compute_plan(self, compute_plan_id, timeout=None,
+                           min_delay=DEFAULT_POLL_MIN_DELAY, max_delay=DEFAULT_POLL_MAX_DELAY):
+        """Watch the execution of a compute plan.
+
+        Generator of the status changes of the compute plan and of its tuples. Each
+        event is a dict with the following schema:
+
+```
+        {
+            "asset": str,
+            "key": str,
+            "status": str,
+            "previous_status": str,
+            "item": dict,
+        }
+```
+        An event is also generated for the compute plan each time its `doneCount`
+        changes. The first events give the initial statuses, with a `None`
+        previous status.
+
+        The compute plan and its running tuples are polled as with the method
+        `Client.wait`; tuples which have ended are not fetched anymore, tuples added
+        to the compute plan while it is watched are fetched from the next poll. The
+        generator stops once the compute plan has ended, or raises a `WaitTimeout`
+        exception once `timeout` (in seconds) has elapsed.
+        """
+        poller = utils.Poller(min_delay, max_delay, timeout)
+        statuses = {}
+        compute_plan = None
+        # keys of the tuples which have not ended, by tuple asset
+        running_keys = {tuple_asset: [] for _, tuple_asset, _ in _COMPUTE_PLAN_TUPLES}
+
+        while True:
+            previous_compute_plan = compute_plan
+            compute_plan = self.get_compute_plan(compute_plan_id, cache=False)
+            # tuples may be added to the compute plan while it is running
+            for field, tuple_asset, _ in _COMPUTE_PLAN_TUPLES:
+                running_keys[tuple_asset].extend(
+                    key for key in compute_plan.get(field) or [] if key not in statuses)
+
+            events = []
+            for tuple_asset, keys in running_keys.items():
+                if not keys:
+                    continue
+                tuples = self.get_many(tuple_asset, keys, cache=False)
+                _raise_first_error(tuples)
+                for key, item in zip(keys, tuples):
+                    previous_status = statuses.get(key)
+                    if item['status'] != previous_status:
+                        statuses[key] = item['status']
+                        events.append(_watch_event(tuple_asset, key, item, previous_status))
+                running_keys[tuple_asset] = [
+                    key for key in keys if statuses[key] not in assets.TERMINAL_STATUSES]
+
+            if (previous_compute_plan is None or
+                    compute_plan['status'] != previous_compute_plan['status'] or
+                    compute_plan['doneCount'] != previous_compute_plan['doneCount']):
+                previous_status = previous_compute_plan and previous_compute_plan['status']
+                events.append(_watch_event(
+                    assets.COMPUTE_PLAN, compute_plan_id, compute_plan, previous_status))
+
+            yield from events
+            if compute_plan['status'] in assets.TERMINAL_STATUSES:
+                return
+            if not poller.wait(changed=bool(events)):
+                raise exceptions.WaitTimeout(
+                    assets.COMPUTE_PLAN, compute_plan_id, compute_plan['status'])
 
     @logit
     def list_algo(self, filters=None):
@@ -710,9 +1148,82 @@ class Client(object):
         """List nodes."""
         return self.client.list(assets.NODE)
 
+    def _iter_list(self, asset, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                   prefetch=True):
+        return self.client.iter_list(asset, filters=filters, page_size=page_size,
+                                     prefetch=prefetch)
+
+    @logit
+    def iter_algo(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE, prefetch=True):
+        """Iterate over algos.
+
+        The algos are fetched lazily, by pages of `page_size` assets. If `prefetch` is
+        true, the next page is fetched in the background while the current one is
+        consumed. The `iter_*` methods are well suited for listing large amounts of
+        assets with a bounded memory usage.
+        """
+        return self._iter_list(assets.ALGO, filters, page_size, prefetch)
+
+    @logit
+    def iter_compute_plan(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                          prefetch=True):
+        """Iterate over compute plans, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.COMPUTE_PLAN, filters, page_size, prefetch)
+
+    @logit
+    def iter_aggregate_algo(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                            prefetch=True):
+        """Iterate over aggregate algos, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.AGGREGATE_ALGO, filters, page_size, prefetch)
+
+    @logit
+    def iter_composite_algo(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                            prefetch=True):
+        """Iterate over composite algos, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.COMPOSITE_ALGO, filters, page_size, prefetch)
+
+    @logit
+    def iter_data_sample(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                         prefetch=True):
+        """Iterate over data samples, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.DATA_SAMPLE, filters, page_size, prefetch)
+
+    @logit
+    def iter_dataset(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE, prefetch=True):
+        """Iterate over datasets, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.DATASET, filters, page_size, prefetch)
+
+    @logit
+    def iter_objective(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE, prefetch=True):
+        """Iterate over objectives, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.OBJECTIVE, filters, page_size, prefetch)
+
+    @logit
+    def iter_testtuple(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE, prefetch=True):
+        """Iterate over testtuples, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.TESTTUPLE, filters, page_size, prefetch)
+
+    @logit
+    def iter_traintuple(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE, prefetch=True):
+        """Iterate over traintuples, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.TRAINTUPLE, filters, page_size, prefetch)
+
+    @logit
+    def iter_aggregatetuple(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                            prefetch=True):
+        """Iterate over aggregatetuples, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.AGGREGATETUPLE, filters, page_size, prefetch)
+
+    @logit
+    def iter_composite_traintuple(self, filters=None, page_size=rest_client.DEFAULT_PAGE_SIZE,
+                                  prefetch=True):
+        """Iterate over composite traintuples, see the method `Client.iter_algo`."""
+        return self._iter_list(assets.COMPOSITE_TRAINTUPLE, filters, page_size, prefetch)
+
     @logit
     def update_dataset(self, dataset_key, data):
         """Update dataset."""
+        self._invalidate(assets.DATASET, dataset_key)
         return self.client.request(
             'post',
             assets.DATASET,
@@ -769,6 +1280,7 @@ class Client(object):
         traintuples cannot be made public.
 
         """
+        self._invalidate(assets.COMPUTE_PLAN, compute_plan_id)
         return self.client.request(
             'post',
             assets.COMPUTE_PLAN,
@@ -779,6 +1291,7 @@ class Client(object):
     @logit
     def link_dataset_with_objective(self, dataset_key, objective_key):
         """Link dataset with objective."""
+        self._invalidate(assets.OBJECTIVE, objective_key)
         return self.update_dataset(
             dataset_key, {'objective_key': objective_key, })
 
@@ -789,6 +1302,7 @@ class Client(object):
             'data_manager_keys': [dataset_key],
             'data_sample_keys': data_sample_keys,
         }
+        self._invalidate(assets.DATASET, dataset_key)
         return self.client.request(
             'post',
             assets.DATA_SAMPLE,
@@ -796,84 +1310,203 @@ class Client(object):
             data=data,
         )
 
-    def _download(self, url, destination_folder, default_filename):
+    def _download(self, url, destination_folder, default_filename, checksum=None,
+                  deadline=None):
         """Download request content in destination file.
 
         Destination folder must exist.
-        """
-        response = self.client.get_data(url, stream=True)
 
-        destination_filename = utils.response_get_destination_filename(response)
-        if not destination_filename:
-            destination_filename = default_filename
-        destination_path = os.path.join(destination_folder,
-                                        destination_filename)
+        If `checksum` is the sha256 storage hash of the content, the downloaded file
+        is checked against it and the file is served from the download cache if
+        it is enabled.
 
-        chunk_size = 1024
-        with open(destination_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size):
-                f.write(chunk)
+        The `download_chunk_size` and `download_workers` fields of the profile
+        configure the downloader (see `substra.sdk.download.Downloader`).
+        """
+        if self._file_cache is not None:
+            cached_path = self._file_cache.get(checksum)
+            if cached_path:
+                destination_path = os.path.join(destination_folder,
+                                                os.path.basename(cached_path))
+                assets_cache.link_or_copy(cached_path, destination_path)
+                return destination_path
+
+        profile = self._current_profile or {}
+        downloader = dl.Downloader(
+            self.client,
+            chunk_size=profile.get('download_chunk_size', dl.DEFAULT_CHUNK_SIZE),
+            max_workers=profile.get('download_workers', 1),
+        )
+        destination_path, content_hash = downloader.download(
+            url, destination_folder, default_filename, deadline=deadline)
+
+        if assets_cache.is_file_hash(checksum):
+            if content_hash != checksum:
+                os.remove(destination_path)
+                raise exceptions.InvalidResponse(
+                    None, f"Downloaded file '{url}' does not match its hash '{checksum}'")
+            if self._file_cache is not None:
+                self._file_cache.add(checksum, destination_path)
         return destination_path
 
     @logit
-    def download_dataset(self, asset_key, destination_folder):
+    def download_dataset(self, asset_key, destination_folder, deadline=None):
         """Download data manager resource.
 
         Download opener script in destination folder.
         """
-        data = self.get_dataset(asset_key)
+        data = self.get_dataset(asset_key, deadline=deadline)
         # download opener file
         default_filename = 'opener.py'
         url = data['opener']['storageAddress']
-        self._download(url, destination_folder, default_filename)
+        self._download(url, destination_folder, default_filename,
+                       checksum=data['opener']['hash'], deadline=deadline)
 
     @logit
-    def download_algo(self, asset_key, destination_folder):
+    def download_algo(self, asset_key, destination_folder, deadline=None):
         """Download algo resource.
 
         Download algo package in destination folder.
         """
-        data = self.get_algo(asset_key)
+        data = self.get_algo(asset_key, deadline=deadline)
         # download algo package
         default_filename = 'algo.tar.gz'
         url = data['content']['storageAddress']
-        self._download(url, destination_folder, default_filename)
+        self._download(url, destination_folder, default_filename,
+                       checksum=data['content']['hash'], deadline=deadline)
 
     @logit
-    def download_aggregate_algo(self, asset_key, destination_folder):
+    def download_aggregate_algo(self, asset_key, destination_folder, deadline=None):
         """Download aggregate algo resource.
 
         Download aggregate algo package in destination folder.
         """
-        data = self.get_aggregate_algo(asset_key)
+        data = self.get_aggregate_algo(asset_key, deadline=deadline)
         # download aggregate algo package
         default_filename = 'aggregate_algo.tar.gz'
         url = data['content']['storageAddress']
-        self._download(url, destination_folder, default_filename)
+        self._download(url, destination_folder, default_filename,
+                       checksum=data['content']['hash'], deadline=deadline)
 
     @logit
-    def download_composite_algo(self, asset_key, destination_folder):
+    def download_composite_algo(self, asset_key, destination_folder, deadline=None):
         """Download composite algo resource.
 
         Download composite algo package in destination folder.
         """
-        data = self.get_composite_algo(asset_key)
+        data = self.get_composite_algo(asset_key, deadline=deadline)
         # download composite algo package
         default_filename = 'composite_algo.tar.gz'
         url = data['content']['storageAddress']
-        self._download(url, destination_folder, default_filename)
+        self._download(url, destination_folder, default_filename,
+                       checksum=data['content']['hash'], deadline=deadline)
 
     @logit
-    def download_objective(self, asset_key, destination_folder):
+    def download_objective(self, asset_key, destination_folder, deadline=None):
         """Download objective resource.
 
         Download metrics script in destination folder.
         """
-        data = self.get_objective(asset_key)
+        data = self.get_objective(asset_key, deadline=deadline)
         # download metrics script
         default_filename = 'metrics.py'
         url = data['metrics']['storageAddress']
-        self._download(url, destination_folder, default_filename)
+        self._download(url, destination_folder, default_filename,
+                       checksum=data['metrics']['hash'], deadline=deadline)
+
+    def _download_many(self, asset_keys, destination_folder, max_workers, progress,
+                       deadline=None):
+        """Download the files of many (asset, key) pairs concurrently.
+
+        Each file is downloaded once per storage hash, to
+        `<destination_folder>/<asset>/<key>/<filename>`.
+        """
+        results = utils.map_concurrently(
+            lambda asset_key: self._get(*asset_key, deadline=deadline), asset_keys, max_workers)
+        _raise_first_error(results)
+
+        checksums = []
+        files = {}
+        for (asset, key), data in zip(asset_keys, results):
+            field, default_filename = _DOWNLOADABLE_FILES[asset]
+            checksum = data[field]['hash']
+            checksums.append(checksum)
+            folder = os.path.join(destination_folder, asset, key)
+            files.setdefault(checksum, (data[field]['storageAddress'], folder, default_filename))
+
+        total = len(files)
+        done = 0
+        lock = threading.Lock()
+        if progress:
+            progress(done, total)
+
+        def _download_file(checksum):
+            nonlocal done
+            url, folder, default_filename = files[checksum]
+            os.makedirs(folder, exist_ok=True)
+            path = self._download(url, folder, default_filename, checksum=checksum,
+                                  deadline=deadline)
+            with lock:
+                done += 1
+                if progress:
+                    progress(done, total)
+            return path
+
+        results = utils.map_concurrently(_download_file, list(files), max_workers)
+        _raise_first_error(results)
+        paths = dict(zip(files, results))
+        return {key: paths[checksum] for (_, key), checksum in zip(asset_keys, checksums)}
+
+    @logit
+    def download_many(self, asset, keys, destination_folder, max_workers=DEFAULT_MAX_WORKERS,
+                      progress=None, deadline=None):
+        """Download the resources of many assets of the same type concurrently.
+
+        `asset` is one of the assets which can be downloaded (algo, aggregate algo,
+        composite algo, dataset and objective). Each resource is downloaded to the
+        `<destination_folder>/<asset>/<key>` folder, once per storage hash, by up to
+        `max_workers` threads.
+
+        If set, `progress` is called with the number of downloaded files and the total
+        number of files to download, before the first download and after each one.
+
+        Returns the path of the downloaded resource of each key.
+        """
+        if asset not in _DOWNLOADABLE_FILES:
+            raise ValueError(f"Cannot download asset '{asset}'")
+        asset_keys = [(asset, key) for key in dict.fromkeys(keys)]
+        return self._download_many(asset_keys, destination_folder, max_workers, progress,
+                                   deadline=deadline)
+
+    @logit
+    def download_compute_plan(self, compute_plan_id, destination_folder,
+                              max_workers=DEFAULT_MAX_WORKERS, progress=None, deadline=None):
+        """Download the resources needed to reproduce a compute plan.
+
+        The algos, openers and metrics used by the tuples of the compute plan are
+        downloaded concurrently as with the method `Client.download_many`.
+
+        Returns the path of the downloaded resource of each asset key.
+        """
+        compute_plan = self.get_compute_plan(compute_plan_id, deadline=deadline)
+
+        asset_keys = []
+        for field, tuple_asset, algo_asset in _COMPUTE_PLAN_TUPLES:
+            tuples = self.get_many(tuple_asset, compute_plan.get(field) or [],
+                                   max_workers=max_workers, deadline=deadline)
+            _raise_first_error(tuples)
+            for t in tuples:
+                # the algo of a testtuple is the one of its traintuple
+                if algo_asset:
+                    asset_keys.append((algo_asset, t['algo']['hash']))
+                if t.get('dataset'):
+                    asset_keys.append((assets.DATASET, t['dataset']['openerHash']))
+                if t.get('objective'):
+                    asset_keys.append((assets.OBJECTIVE, t['objective']['hash']))
+
+        asset_keys = list(dict.fromkeys(asset_keys))
+        return self._download_many(asset_keys, destination_folder, max_workers, progress,
+                                   deadline=deadline)
 
     def _describe(self, asset, asset_key):
         """Get asset description."""
@@ -916,6 +1549,7 @@ class Client(object):
     @logit
     def cancel_compute_plan(self, compute_plan_id):
         """Cancel execution of compute plan."""
+        self._invalidate(assets.COMPUTE_PLAN, compute_plan_id)
         return self.client.request(
             'post',
             assets.COMPUTE_PLAN,
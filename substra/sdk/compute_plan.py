@@ -0,0 +1,237 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import uuid
+
+from substra.sdk import exceptions
+
+TRAINTUPLES = 'traintuples'
+AGGREGATETUPLES = 'aggregatetuples'
+COMPOSITE_TRAINTUPLES = 'composite_traintuples'
+TESTTUPLES = 'testtuples'
+
+# field of the compute plan payload of each type of tuple, with the field of its id
+_ID_FIELDS = {
+    TRAINTUPLES: 'traintuple_id',
+    AGGREGATETUPLES: 'aggregatetuple_id',
+    COMPOSITE_TRAINTUPLES: 'composite_traintuple_id',
+}
+
+
+def _get_parent_ids(field, spec):
+    if field == COMPOSITE_TRAINTUPLES:
+        return [i for i in (spec.get('in_head_model_id'), spec.get('in_trunk_model_id')) if i]
+    return spec.get('in_models_ids') or []
+
+
+def _drop_none(spec):
+    return {k: v for k, v in spec.items() if v is not None}
+
+
+class ComputePlanBuilder():
+    """Build the payload of a compute plan, checking the graph of its tuples locally.
+
+    The tuples are added with the `add_*` methods, which return their id in the
+    compute plan (a random one if it is not set). They may reference the tuples
+    added before or after them, and the tuples already in the compute plan whose
+    ids are given as `existing_ids` when building an update.
+
+    `validate` checks that the references are valid and that the graph has no cycle
+    in linear time, so that errors are found before sending the compute plan.
+    The payloads list the tuples in a topological order:
+    - `build` returns the payload of `Client.add_compute_plan`
+    - `build_update` returns the payload of `Client.update_compute_plan`
+    - `build_batches` splits the tuples in payloads of at most `batch_size` tuples,
+      to add a large compute plan through an add then successive updates
+    """
+
+    def __init__(self, tag=None, clean_models=None, existing_ids=None):
+        self.tag = tag
+        self.clean_models = clean_models
+        self.existing_ids = set(existing_ids or [])
+        # tuple id -> (payload field, tuple spec), in the order they have been added
+        self._tuples = collections.OrderedDict()
+        self._testtuples = []
+
+    def __len__(self):
+        return len(self._tuples) + len(self._testtuples)
+
+    def _add(self, field, tuple_id, spec):
+        tuple_id = tuple_id or str(uuid.uuid4())
+        if tuple_id in self._tuples or tuple_id in self.existing_ids:
+            raise exceptions.InvalidComputePlan([f"Duplicate tuple id '{tuple_id}'"])
+        spec[_ID_FIELDS[field]] = tuple_id
+        self._tuples[tuple_id] = (field, _drop_none(spec))
+        return tuple_id
+
+    def add_traintuple(self, algo_key, data_manager_key, train_data_sample_keys,
+                       in_models_ids=None, tag=None, traintuple_id=None):
+        return self._add(TRAINTUPLES, traintuple_id, {
+            'algo_key': algo_key,
+            'data_manager_key': data_manager_key,
+            'train_data_sample_keys': list(train_data_sample_keys),
+            'in_models_ids': list(in_models_ids or []),
+            'tag': tag,
+        })
+
+    def add_aggregatetuple(self, algo_key, worker, in_models_ids=None, tag=None,
+                           aggregatetuple_id=None):
+        return self._add(AGGREGATETUPLES, aggregatetuple_id, {
+            'algo_key': algo_key,
+            'worker': worker,
+            'in_models_ids': list(in_models_ids or []),
+            'tag': tag,
+        })
+
+    def add_composite_traintuple(self, algo_key, data_manager_key, train_data_sample_keys,
+                                 in_head_model_id=None, in_trunk_model_id=None,
+                                 out_trunk_model_permissions=None, tag=None,
+                                 composite_traintuple_id=None):
+        return self._add(COMPOSITE_TRAINTUPLES, composite_traintuple_id, {
+            'algo_key': algo_key,
+            'data_manager_key': data_manager_key,
+            'train_data_sample_keys': list(train_data_sample_keys),
+            'in_head_model_id': in_head_model_id,
+            'in_trunk_model_id': in_trunk_model_id,
+            'out_trunk_model_permissions': out_trunk_model_permissions,
+            'tag': tag,
+        })
+
+    def add_testtuple(self, objective_key, traintuple_id, data_manager_key=None,
+                      test_data_sample_keys=None, tag=None):
+        self._testtuples.append(_drop_none({
+            'objective_key': objective_key,
+            'data_manager_key': data_manager_key,
+            'test_data_sample_keys': (list(test_data_sample_keys)
+                                      if test_data_sample_keys is not None else None),
+            'traintuple_id': traintuple_id,
+            'tag': tag,
+        }))
+
+    def _check_reference(self, errors, tuple_id, parent_id, fields=None):
+        if parent_id in self.existing_ids:
+            return
+        parent = self._tuples.get(parent_id)
+        if parent is None:
+            errors.append(f"Tuple '{tuple_id}' references unknown tuple '{parent_id}'")
+        elif fields and parent[0] not in fields:
+            errors.append(f"Tuple '{tuple_id}' references tuple '{parent_id}' which is not "
+                          f"one of the {', '.join(fields)}")
+
+    def _get_reference_errors(self):
+        errors = []
+        for tuple_id, (field, spec) in self._tuples.items():
+            if field == COMPOSITE_TRAINTUPLES:
+                if spec.get('in_head_model_id'):
+                    # a head model is only produced by a composite traintuple
+                    self._check_reference(errors, tuple_id, spec['in_head_model_id'],
+                                          (COMPOSITE_TRAINTUPLES, ))
+                if spec.get('in_trunk_model_id'):
+                    self._check_reference(errors, tuple_id, spec['in_trunk_model_id'])
+            else:
+                for parent_id in spec['in_models_ids']:
+                    self._check_reference(errors, tuple_id, parent_id)
+        for testtuple in self._testtuples:
+            self._check_reference(errors, 'testtuple', testtuple['traintuple_id'])
+        return errors
+
+    def _sort(self):
+        """Sort the tuple ids in a topological order with Kahn's algorithm.
+
+        Returns the sorted ids and the ids of the tuples which are part of a cycle, or
+        depend on one.
+        """
+        in_degrees = {}
+        children = collections.defaultdict(list)
+        for tuple_id, (field, spec) in self._tuples.items():
+            parent_ids = [p for p in _get_parent_ids(field, spec) if p in self._tuples]
+            in_degrees[tuple_id] = len(parent_ids)
+            for parent_id in parent_ids:
+                children[parent_id].append(tuple_id)
+
+        queue = collections.deque(i for i, d in in_degrees.items() if d == 0)
+        order = []
+        while queue:
+            tuple_id = queue.popleft()
+            order.append(tuple_id)
+            for child_id in children[tuple_id]:
+                in_degrees[child_id] -= 1
+                if in_degrees[child_id] == 0:
+                    queue.append(child_id)
+
+        unsorted_ids = [i for i, d in in_degrees.items() if d > 0]
+        return order, unsorted_ids
+
+    def validate(self):
+        """Check the references between tuples and the absence of cycles.
+
+        Raises `InvalidComputePlan` with the list of errors.
+        """
+        errors = self._get_reference_errors()
+        _, unsorted_ids = self._sort()
+        if unsorted_ids:
+            errors.append(f"Cycle between the tuples {', '.join(unsorted_ids)}")
+        if errors:
+            raise exceptions.InvalidComputePlan(errors)
+
+    def get_topological_order(self):
+        """Get the ids of the tuples, each one after the tuples it depends on."""
+        self.validate()
+        order, _ = self._sort()
+        return order
+
+    def _build(self, tuple_ids, testtuples):
+        payload = {field: [] for field in _ID_FIELDS}
+        for tuple_id in tuple_ids:
+            field, spec = self._tuples[tuple_id]
+            payload[field].append(dict(spec))
+        payload[TESTTUPLES] = [dict(t) for t in testtuples]
+        return payload
+
+    def _add_plan_fields(self, payload):
+        if self.tag is not None:
+            payload['tag'] = self.tag
+        if self.clean_models is not None:
+            payload['clean_models'] = self.clean_models
+        return payload
+
+    def build(self):
+        """Get the payload of `Client.add_compute_plan`."""
+        return self._add_plan_fields(self._build(self.get_topological_order(), self._testtuples))
+
+    def build_update(self):
+        """Get the payload of `Client.update_compute_plan`."""
+        return self._build(self.get_topological_order(), self._testtuples)
+
+    def build_batches(self, batch_size):
+        """Split the compute plan in payloads of at most `batch_size` tuples.
+
+        The first payload is the one of `Client.add_compute_plan`, the next ones are
+        the ones of `Client.update_compute_plan`. As the tuples are in a topological
+        order, each payload only references the tuples of the previous ones. Testtuples
+        are added with their traintuple.
+        """
+        order = self.get_topological_order()
+        batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)] or [[]]
+        batch_indexes = {i: n for n, batch in enumerate(batches) for i in batch}
+
+        testtuples = [[] for _ in batches]
+        for testtuple in self._testtuples:
+            testtuples[batch_indexes.get(testtuple['traintuple_id'], 0)].append(testtuple)
+
+        payloads = [self._build(batch, t) for batch, t in zip(batches, testtuples)]
+        if not self.existing_ids:
+            self._add_plan_fields(payloads[0])
+        return payloads
@@ -0,0 +1,159 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import logging
+import os
+
+from substra.sdk import utils
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# files larger than this are fetched as parallel ranges of this size
+DEFAULT_RANGE_SIZE = 64 * 1024 * 1024
+PART_SUFFIX = '.part'
+
+
+def _get_content_length(response):
+    try:
+        return int(response.headers.get('content-length'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _accept_ranges(response):
+    return response.headers.get('accept-ranges') == 'bytes'
+
+
+def _get_file_hash(path, chunk_size):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for data in iter(lambda: fh.read(chunk_size), b''):
+            sha256.update(data)
+    return sha256
+
+
+def _write_response(response, fh, sha256, chunk_size, deadline):
+    for chunk in response.iter_content(chunk_size):
+        utils.get_remaining_time(deadline)
+        sha256.update(chunk)
+        fh.write(chunk)
+
+
+class Downloader():
+    """Download files from the server.
+
+    Files are downloaded to a `.part` temporary file which is renamed once the
+    download is complete, so that partial files never appear at their
+    destination path. Responses are read by chunks of `chunk_size` bytes.
+
+    If `deadline` is set (a `time.time()` timestamp), the download fails with
+    `DeadlineExceeded` once it has expired; the temporary file is then kept so that
+    the download can be resumed.
+
+    If the server accepts range requests:
+    - an interrupted download is resumed from its temporary file
+    - if `max_workers` is greater than 1, files larger than `range_size` are
+      fetched as ranges of `range_size` bytes by `max_workers` threads
+    """
+
+    def __init__(self, client, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=1,
+                 range_size=DEFAULT_RANGE_SIZE):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.range_size = range_size
+
+    def download(self, url, destination_folder, default_filename, deadline=None):
+        """Download url content in the destination folder.
+
+        Returns the destination path and the sha256 hex digest of the content.
+        """
+        response = self.client.get_data(url, stream=True, deadline=deadline)
+        # the response holds a throttling slot until it is closed
+        try:
+            destination_filename = utils.response_get_destination_filename(response)
+            if not destination_filename:
+                destination_filename = default_filename
+            destination_path = os.path.join(destination_folder, destination_filename)
+            part_path = destination_path + PART_SUFFIX
+
+            size = _get_content_length(response)
+            accept_ranges = _accept_ranges(response) and size is not None
+            part_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+            if accept_ranges and self.max_workers > 1 and size > self.range_size:
+                # release the slot before the range requests wait for theirs
+                response.close()
+                sha256 = self._download_ranges(url, part_path, size, deadline)
+            elif accept_ranges and 0 < part_size < size:
+                response.close()
+                sha256 = self._resume(url, part_path, part_size, deadline)
+            else:
+                sha256 = hashlib.sha256()
+                with open(part_path, 'wb') as fh:
+                    _write_response(response, fh, sha256, self.chunk_size, deadline)
+        finally:
+            response.close()
+
+        os.replace(part_path, destination_path)
+        return destination_path, sha256.hexdigest()
+
+    def _resume(self, url, part_path, part_size, deadline):
+        logger.info(f"Resuming download of '{url}' from byte {part_size}")
+        response = self.client.get_data(
+            url, stream=True, headers={'Range': f'bytes={part_size}-'}, deadline=deadline)
+        try:
+            if response.status_code != 206:
+                # the range has been ignored, the whole content is sent again
+                sha256 = hashlib.sha256()
+                mode = 'wb'
+            else:
+                sha256 = _get_file_hash(part_path, self.chunk_size)
+                mode = 'ab'
+            with open(part_path, mode) as fh:
+                _write_response(response, fh, sha256, self.chunk_size, deadline)
+        finally:
+            response.close()
+        return sha256
+
+    def _download_range(self, url, part_path, start, end, deadline):
+        response = self.client.get_data(
+            url, stream=True, headers={'Range': f'bytes={start}-{end - 1}'}, deadline=deadline)
+        try:
+            if response.status_code != 206:
+                raise ValueError(f"Range request of '{url}' not supported")
+            with open(part_path, 'r+b') as fh:
+                fh.seek(start)
+                for chunk in response.iter_content(self.chunk_size):
+                    utils.get_remaining_time(deadline)
+                    fh.write(chunk)
+        finally:
+            response.close()
+
+    def _download_ranges(self, url, part_path, size, deadline):
+        with open(part_path, 'wb') as fh:
+            fh.truncate(size)
+
+        ranges = [(start, min(start + self.range_size, size))
+                  for start in range(0, size, self.range_size)]
+        logger.info(f"Downloading '{url}' as {len(ranges)} ranges")
+        results = utils.map_concurrently(
+            lambda r: self._download_range(url, part_path, *r, deadline), ranges,
+            self.max_workers)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            raise errors[0]
+        return _get_file_hash(part_path, self.chunk_size)
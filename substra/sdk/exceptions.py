@@ -22,6 +22,9 @@ class LoadDataException(SDKException):
 
 
 class RequestException(SDKException):
+    # value of the Retry-After header of the response
+    retry_after = None
+
     def __init__(self, msg, status_code):
         self.msg = msg
         self.status_code = status_code
@@ -39,17 +42,30 @@ class RequestException(SDKException):
         except AttributeError:
             status_code = None
 
-        return cls(msg, status_code)
+        exception = cls(msg, status_code)
+        try:
+            exception.retry_after = request_exception.response.headers.get('Retry-After')
+        except AttributeError:
+            pass
+        return exception
 
 
 class ConnectionError(RequestException):
     pass
 
 
+class CircuitOpen(ConnectionError):
+    """The server is unavailable, the request has not been sent"""
+
+
 class Timeout(RequestException):
     pass
 
 
+class DeadlineExceeded(Timeout):
+    """The deadline of the call has expired"""
+
+
 class HTTPError(RequestException):
     pass
 
@@ -62,6 +78,10 @@ class GatewayUnavailable(HTTPError):
     pass
 
 
+class TooManyRequests(HTTPError):
+    pass
+
+
 class InvalidRequest(HTTPError):
     def __init__(self, msg, status_code, errors=None):
         super().__init__(msg, status_code)
@@ -134,6 +154,16 @@ class InvalidResponse(SDKException):
         super(InvalidResponse, self).__init__(msg)
 
 
+class WaitTimeout(SDKException):
+    """The asset execution has not ended before the timeout"""
+
+    def __init__(self, asset, key, status):
+        self.asset = asset
+        self.key = key
+        self.status = status
+        super().__init__(f"Timeout while waiting for {asset} '{key}' (status: {status})")
+
+
 class AuthenticationError(HTTPError):
     pass
 
@@ -160,3 +190,11 @@ class UserException(SDKException):
 class KeyringException(SDKException):
     """Could not retrieve password from keyring"""
     pass
+
+
+class InvalidComputePlan(SDKException):
+    """The graph of the compute plan tuples is invalid"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
@@ -0,0 +1,65 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Journal():
+    """Local record of the data sample paths already added and their keys.
+
+    The journal is an append-only file with one JSON object per line, written
+    as soon as a batch is added so that an interrupted ingestion can resume
+    from it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load the added paths and their keys."""
+        keys = {}
+        if not os.path.exists(self.path):
+            return keys
+
+        line = ''
+        with open(self.path) as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.decoder.JSONDecodeError:
+                    # the last line may be truncated if the process was killed while writing it
+                    logger.warning(f"Skipping invalid line in journal '{self.path}'")
+                    continue
+                keys[entry['path']] = entry['key']
+
+        if line and not line.endswith('\n'):
+            # terminate the truncated line so that new entries are not appended to it
+            with open(self.path, 'a') as fh:
+                fh.write('\n')
+        return keys
+
+    def add(self, keys):
+        """Append paths and their keys to the journal."""
+        lines = [json.dumps({'path': path, 'key': key}) + '\n' for path, key in keys.items()]
+        with self._lock:
+            with open(self.path, 'a') as fh:
+                fh.writelines(lines)
+                fh.flush()
+                os.fsync(fh.fileno())
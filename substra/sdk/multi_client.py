@@ -0,0 +1,150 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import logging
+
+from substra.sdk import exceptions, utils
+from substra.sdk.client import Client, DEFAULT_RETRY_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+SOURCE_NODES_FIELD = 'source_nodes'
+
+_MERGED_METHOD_PREFIXES = ('list_', )
+
+
+def _tag(item, profile_name):
+    if not isinstance(item, dict):
+        return item
+    return dict(item, **{SOURCE_NODES_FIELD: [profile_name]})
+
+
+def merge(results):
+    """Merge the lists of items returned by each profile.
+
+    Items are deduplicated by asset key (or by value if they do not have one), in the
+    order of the profiles, and the names of the profiles which returned them are set
+    in their `source_nodes` field.
+    """
+    merged = {}
+    for profile_name, items in results.items():
+        for item in items:
+            item_id = utils.get_item_id(item)
+            if item_id not in merged:
+                merged[item_id] = _tag(item, profile_name)
+            elif isinstance(item, dict):
+                merged[item_id][SOURCE_NODES_FIELD].append(profile_name)
+    return list(merged.values())
+
+
+class MultiClient():
+    """Client running the same calls on the nodes of many profiles concurrently.
+
+    A `Client` is created for each profile, with its own pool of connections, and
+    the calls are run on all the nodes at once by a thread pool:
+    - `run` calls any method of the `Client` and returns its result by profile
+    - the `list_*` methods merge the assets listed by all the nodes, see `merge`
+    - `leaderboard` merges the testtuples of the leaderboards of all the nodes
+
+    If `ignore_errors` is false, the first error raised by a node is raised once all
+    the calls are done. Otherwise the nodes which failed are logged and left out of
+    the results.
+
+    If set, `user_paths` maps profile names to the user file of their login token.
+    """
+
+    def __init__(self, profile_names, config_path=None, user_paths=None,
+                 retry_timeout=DEFAULT_RETRY_TIMEOUT, cache_path=None, ignore_errors=False):
+        user_paths = user_paths or {}
+        self.clients = {
+            name: Client(
+                config_path=config_path,
+                profile_name=name,
+                user_path=user_paths.get(name),
+                retry_timeout=retry_timeout,
+                cache_path=cache_path,
+            )
+            for name in profile_names
+        }
+        self.ignore_errors = ignore_errors
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.clients)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the connections opened to all the nodes."""
+        self._executor.shutdown(wait=True)
+        for client in self.clients.values():
+            client.close()
+
+    def run(self, method_name, *args, **kwargs):
+        """Call a `Client` method on all the nodes concurrently.
+
+        Returns the results by profile name, in the order of the profiles.
+        """
+        futures = {
+            name: self._executor.submit(getattr(client, method_name), *args, **kwargs)
+            for name, client in self.clients.items()
+        }
+        results = {}
+        errors = []
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except exceptions.SDKException as e:
+                logger.warning(f"{method_name} failed on '{name}': {e.__class__.__name__}: {e}")
+                errors.append(e)
+        if errors and not self.ignore_errors:
+            raise errors[0]
+        return results
+
+    def login(self):
+        """Login on all the nodes."""
+        return self.run('login')
+
+    def leaderboard(self, objective_key, sort='desc'):
+        """Get the leaderboard of an objective, merged from all the nodes.
+
+        The testtuples are merged as the `list_*` results and sorted by perf.
+        """
+        results = self.run('leaderboard', objective_key, sort=sort)
+        if not results:
+            return None
+        leaderboard = dict(next(iter(results.values())))
+        testtuples = merge({name: r['testtuples'] for name, r in results.items()})
+        testtuples.sort(key=lambda t: t.get('dataset', {}).get('perf') or 0,
+                        reverse=sort == 'desc')
+        leaderboard['testtuples'] = testtuples
+        return leaderboard
+
+
+def _make_merged_method(name):
+    method = getattr(Client, name)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return merge(self.run(name, *args, **kwargs))
+
+    return wrapper
+
+
+for _name in dir(Client):
+    if _name.startswith(_MERGED_METHOD_PREFIXES):
+        setattr(MultiClient, _name, _make_merged_method(_name))
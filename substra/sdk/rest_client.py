@@ -11,25 +11,80 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import gzip
+import json
 import logging
+import threading
 import time
 
 import keyring
 import requests
 
-from substra.sdk import exceptions, assets, utils
+from substra.sdk import exceptions, assets, cache, circuit_breaker, retry, throttling, utils
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_POOL_BLOCK = False
+DEFAULT_KEEP_ALIVE = True
+DEFAULT_COMPRESSION = True
+# encodings supported by the installed urllib3, including brotli if it is installed
+ACCEPT_ENCODING = requests.utils.DEFAULT_ACCEPT_ENCODING
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+JSON_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _bound_timeout(timeout, remaining):
+    """Bound the connect and read timeouts of a request by the time left before its deadline."""
+    if not isinstance(timeout, tuple):
+        timeout = (timeout, timeout)
+    return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+
+
+def _release_on_close(response, release):
+    """Call `release` once the response is closed, whatever the number of closes."""
+    close = response.close
+    lock = threading.Lock()
+    released = False
+
+    def _close():
+        nonlocal released
+        try:
+            close()
+        finally:
+            with lock:
+                if not released:
+                    released = True
+                    release()
+
+    response.close = _close
+
 
 class Client():
-    """REST Client to communicate with Substra server."""
+    """REST Client to communicate with Substra server.
+
+    All the HTTP requests go through a single `requests.Session` so that the
+    underlying TCP/TLS connections are pooled and reused between calls.
+    """
 
     def __init__(self, config=None):
         self._headers = {}
         self._default_kwargs = {}
         self._base_url = None
         self._auth = {}
+        self._session = requests.Session()
+        self._pool_config = None
+        self._request_compression_min_size = None
+        self._revalidation_cache = None
+        self._single_flight = utils.SingleFlight()
+        self._retry_policy = retry.RetryPolicy()
+        self._throttle = throttling.Throttle()
+        self._circuit_breaker = None
 
         if config:
             self.set_config(config)
@@ -43,11 +98,15 @@ class Client():
         headers = {
             'Accept': self._headers['Accept'],
         }
+        if 'Connection' in self._headers:
+            headers['Connection'] = self._headers['Connection']
 
         try:
-            r = requests.post(f'{self._base_url}/api-token-auth/',
-                              data=self._auth,
-                              headers=headers)
+            with self._throttle:
+                r = self._session.post(f'{self._base_url}/api-token-auth/',
+                                       data=self._auth,
+                                       headers=headers,
+                                       timeout=self._default_kwargs.get('timeout'))
             r.raise_for_status()
         except requests.exceptions.ConnectionError as e:
             raise exceptions.ConnectionError.from_request_exception(e)
@@ -63,14 +122,91 @@ class Client():
         else:
             return r
 
+    def _set_pool_config(self, config):
+        """Mount an HTTP adapter sized from config on the session.
+
+        The adapter is only replaced when the pool settings change so that
+        open connections survive config updates (e.g. after login).
+        """
+        pool_config = {
+            'pool_connections': config.get('pool_connections', DEFAULT_POOL_CONNECTIONS),
+            'pool_maxsize': config.get('pool_maxsize', DEFAULT_POOL_MAXSIZE),
+            'pool_block': config.get('pool_block', DEFAULT_POOL_BLOCK),
+        }
+        if pool_config == self._pool_config:
+            return
+
+        for adapter in self._session.adapters.values():
+            adapter.close()
+        adapter = requests.adapters.HTTPAdapter(**pool_config)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._pool_config = pool_config
+
+    def _set_throttle(self, config):
+        """Create the throttle of the requests from config if its settings change."""
+        rate = config.get('max_requests_per_second')
+        burst = config.get('max_requests_burst')
+        max_in_flight = config.get('max_requests_in_flight')
+        throttle = self._throttle
+        if (throttle.rate, throttle.burst, throttle.max_in_flight) == (rate, burst, max_in_flight):
+            return
+        self._throttle = throttling.Throttle(rate, burst, max_in_flight)
+
     def set_config(self, config, profile_name='default'):
-        """Reset internal attributes from config."""
+        """Reset internal attributes from config.
+
+        Besides the mandatory profile fields, the following optional fields
+        configure the timeouts in seconds of the requests:
+        - connect_timeout: timeout of the connection to the server
+        - read_timeout: timeout of each read of the response, i.e. maximum time
+          without receiving any data from the server
+
+        and the connection pool:
+        - pool_connections: number of hosts to keep a pool for
+        - pool_maxsize: maximum number of connections kept open per host
+        - pool_block: block when all connections to a host are in use instead
+          of opening new short-lived ones
+        - keep_alive: reuse connections between requests
+
+        and the compression of the exchanged data:
+        - compression: ask the server for compressed responses
+        - request_compression_min_size: gzip the JSON request bodies larger than
+          this number of bytes (disabled by default as the server must support it)
+
+        and the revalidation of GET responses:
+        - revalidation_cache_size: number of responses kept in memory with their
+          `ETag`/`Last-Modified` validators, 0 to disable the revalidation cache
+        - revalidation_cache_max_size: maximum size in bytes of the cached response
+          bodies, the bodies larger than a sixteenth of it are not cached
+
+        and the retries of the requests failing with transient errors:
+        - retry_max_attempts: maximum number of attempts of a request
+        - retry_base_delay: delay before the first retry, doubled at each retry
+        - retry_max_delay: maximum delay between two attempts
+
+        and the throttling of the requests, shared by all the threads using the client:
+        - max_requests_per_second: maximum rate of the requests
+        - max_requests_burst: number of requests which may be sent at once before
+          the rate applies, defaults to the rate
+        - max_requests_in_flight: maximum number of concurrent requests, a streamed
+          response holding its slot until it is closed
+
+        and the circuit breaker of the server, shared by all the clients of the process:
+        - circuit_breaker_threshold: number of consecutive connection or gateway
+          errors after which requests fail fast, 0 to disable the circuit breaker
+        - circuit_breaker_recovery_timeout: delay in seconds after which a request is
+          sent again to the server
+        """
         # get default requests keyword arguments from config
         kwargs = {}
 
         if config['insecure']:
             kwargs['verify'] = False
 
+        kwargs['timeout'] = (config.get('connect_timeout', DEFAULT_CONNECT_TIMEOUT),
+                             config.get('read_timeout', DEFAULT_READ_TIMEOUT))
+
         # get default HTTP headers from config
         headers = {
             'Accept': 'application/json;version={}'.format(config['version']),
@@ -81,10 +217,45 @@ class Client():
                 'Authorization': f"Token {config['token']}"
             })
 
+        if not config.get('keep_alive', DEFAULT_KEEP_ALIVE):
+            headers['Connection'] = 'close'
+
+        if config.get('compression', DEFAULT_COMPRESSION):
+            headers['Accept-Encoding'] = ACCEPT_ENCODING
+        else:
+            headers['Accept-Encoding'] = 'identity'
+
         self._headers = headers
+        self._request_compression_min_size = config.get('request_compression_min_size')
+
+        # the cache is reset with the config as the responses depend on the user
+        revalidation_cache_size = config.get('revalidation_cache_size',
+                                             cache.DEFAULT_REVALIDATION_MAX_ENTRIES)
+        revalidation_cache_max_size = config.get('revalidation_cache_max_size',
+                                                 cache.DEFAULT_REVALIDATION_MAX_SIZE)
+        self._revalidation_cache = (
+            cache.RevalidationCache(revalidation_cache_size, revalidation_cache_max_size)
+            if revalidation_cache_size else None)
+
+        # the policy is kept so that its retry budget and metrics are not reset
+        self._retry_policy.max_attempts = config.get('retry_max_attempts',
+                                                     retry.DEFAULT_MAX_ATTEMPTS)
+        self._retry_policy.base_delay = config.get('retry_base_delay', retry.DEFAULT_BASE_DELAY)
+        self._retry_policy.max_delay = config.get('retry_max_delay', retry.DEFAULT_MAX_DELAY)
+        self._set_throttle(config)
+        self._set_pool_config(config)
         self._default_kwargs = kwargs
         self._base_url = config['url'][:-1] if config['url'].endswith('/') else config['url']
 
+        threshold = config.get('circuit_breaker_threshold',
+                               circuit_breaker.DEFAULT_FAILURE_THRESHOLD)
+        self._circuit_breaker = circuit_breaker.get(
+            self._base_url,
+            failure_threshold=threshold,
+            recovery_timeout=config.get('circuit_breaker_recovery_timeout',
+                                        circuit_breaker.DEFAULT_RECOVERY_TIMEOUT),
+        ) if threshold else None
+
         if not isinstance(config['auth'], dict):
             raise exceptions.BadConfiguration('Your configuration is outdated, please update it.')
 
@@ -101,13 +272,65 @@ class Client():
             'password': password
         }
 
+    def _compress_json_body(self, kwargs, headers):
+        """Replace the JSON body of a request by its gzip compression if it is large enough.
+
+        Returns the size of the body before and after compression, or None if the
+        body has not been compressed.
+        """
+        min_size = self._request_compression_min_size
+        if min_size is None or kwargs.get('json') is None:
+            return None
+
+        body = json.dumps(kwargs['json']).encode('utf-8')
+        if len(body) < min_size:
+            return None
+
+        del kwargs['json']
+        kwargs['data'] = gzip.compress(body)
+        headers['Content-Type'] = 'application/json'
+        headers['Content-Encoding'] = 'gzip'
+        return len(body), len(kwargs['data'])
+
+    @staticmethod
+    def _log_transfer_sizes(request_name, url, response, request_sizes, stream):
+        if request_sizes:
+            size, wire_size = request_sizes
+            logger.debug(f'{request_name} {url}: sent {size} bytes ({wire_size} on the wire)')
+        # streamed responses are consumed by the caller
+        if stream:
+            return
+        size = len(response.content)
+        wire_size = response.headers.get('content-length', size)
+        encoding = response.headers.get('content-encoding', 'identity')
+        logger.debug(f'{request_name} {url}: received {size} bytes '
+                     f'({wire_size} on the wire, encoding={encoding})')
+
+    def _send(self, fn, url, **kwargs):
+        """Send a request within the throttle.
+
+        The in-flight slot of a streamed request is held until its response is closed,
+        so that the bodies being downloaded count as requests in flight.
+        """
+        self._throttle.acquire()
+        try:
+            r = fn(url, **kwargs)
+        except BaseException:
+            self._throttle.release()
+            raise
+        if kwargs.get('stream'):
+            _release_on_close(r, self._throttle.release)
+        else:
+            self._throttle.release()
+        return r
+
     def __request(self, request_name, url, **request_kwargs):
         """Base request helper."""
 
         if request_name == 'get':
-            fn = requests.get
+            fn = self._session.get
         elif request_name == 'post':
-            fn = requests.post
+            fn = self._session.post
         else:
             raise NotImplementedError
 
@@ -115,14 +338,33 @@ class Client():
         kwargs = dict(self._default_kwargs)
         kwargs.update(request_kwargs)
 
+        headers = dict(self._headers)
+        headers.update(kwargs.pop('headers', {}))
+
         # rewind files so that they are properly sent in retries as well
         if 'files' in kwargs:
             for file in kwargs['files'].values():
                 file.seek(0)
 
+        json_kwargs = {'json': kwargs['json']} if 'json' in kwargs else {}
+        request_sizes = self._compress_json_body(kwargs, headers)
+
         # do HTTP request and catch generic exceptions
         try:
-            r = fn(url, headers=self._headers, **kwargs)
+            r = self._send(fn, url, headers=headers, **kwargs)
+
+            if request_sizes and r.status_code == 415:
+                logger.warning("Compressed requests are not supported by the server, "
+                               "disabling request compression")
+                self._request_compression_min_size = None
+                request_sizes = None
+                del headers['Content-Encoding'], headers['Content-Type']
+                kwargs.pop('data')
+                r = self._send(fn, url, headers=headers, **kwargs, **json_kwargs)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log_transfer_sizes(request_name, url, r, request_sizes,
+                                         kwargs.get('stream', False))
             r.raise_for_status()
 
         except requests.exceptions.ConnectionError as e:
@@ -133,6 +375,12 @@ class Client():
 
         except requests.exceptions.HTTPError as e:
             logger.error(f"Requests error status {e.response.status_code}: {e.response.text}")
+            if kwargs.get('stream'):
+                # the caller does not get the response to close it
+                e.response.close()
+            if kwargs.get('stream'):
+                # the caller does not get the response to close it
+                e.response.close()
 
             if e.response.status_code == 400:
                 raise exceptions.InvalidRequest.from_request_exception(e)
@@ -152,6 +400,9 @@ class Client():
             if e.response.status_code == 409:
                 raise exceptions.AlreadyExists.from_request_exception(e)
 
+            if e.response.status_code == 429:
+                raise exceptions.TooManyRequests.from_request_exception(e)
+
             if e.response.status_code == 500:
                 raise exceptions.InternalServerError.from_request_exception(e)
 
@@ -162,51 +413,125 @@ class Client():
 
         return r
 
-    def _request(self, request_name, url, **request_kwargs):
-        """Wrapper to __request to emit a log for each HTTP request."""
+    def _request(self, request_name, url, deadline=None, **request_kwargs):
+        """Wrapper to __request to emit a log for each HTTP request.
+
+        The timeouts of the request are bounded by the time left before `deadline`.
+        """
+        remaining = utils.get_remaining_time(deadline)
+        if remaining is not None:
+            timeout = request_kwargs.get('timeout', self._default_kwargs.get('timeout'))
+            request_kwargs['timeout'] = _bound_timeout(timeout, remaining)
+
+        breaker = self._circuit_breaker
+        if breaker:
+            breaker.before_request()
+
         ts = time.time()
         error = None
         try:
-            return self.__request(request_name, url, **request_kwargs)
+            r = self.__request(request_name, url, **request_kwargs)
         except Exception as e:
             error = e.__class__.__name__
+            if breaker:
+                if isinstance(e, (exceptions.ConnectionError, exceptions.GatewayUnavailable)):
+                    breaker.on_failure()
+                elif isinstance(e, exceptions.Timeout):
+                    breaker.on_timeout()
+                else:
+                    # the server has responded
+                    breaker.on_success()
             raise
+        except BaseException:
+            # e.g. KeyboardInterrupt, the outcome of the request is unknown
+            if breaker:
+                breaker.release()
+            raise
+        else:
+            if breaker:
+                breaker.on_success()
+            return r
         finally:
             te = time.time()
             elaps = (te - ts) * 1000
             logger.debug(f'{request_name} {url}: done in {elaps:.2f}ms error={error}')
 
-    @utils.retry_on_exception(exceptions=(exceptions.GatewayUnavailable))
     def request(self, request_name, asset_name, path=None, json_response=True,
-                **request_kwargs):
-        """Base request."""
+                idempotent=None, deadline=None, **request_kwargs):
+        """Base request.
+
+        Requests failing with transient errors are retried according to the retry
+        policy. GET requests are idempotent, other requests are considered idempotent
+        only if `idempotent` is true.
+
+        If `deadline` is set (a `time.time()` timestamp), the request and its retries
+        fail with `DeadlineExceeded` once it has expired.
+        """
 
         path = path or ''
         url = f"{self._base_url}/{assets.to_server_name(asset_name)}/{path}"
         if not url.endswith("/"):
             url = url + "/"  # server requires a suffix /
 
-        response = self._request(
-            request_name,
-            url,
-            **request_kwargs,
-        )
+        # identical concurrent GET requests share a single HTTP call and parsed response
+        if request_name == 'get' and json_response and not request_kwargs.get('stream'):
+            key = (url, json.dumps(request_kwargs, sort_keys=True, default=str))
+            get_json = functools.partial(self._get_json, url, deadline=deadline, **request_kwargs)
+            return self._single_flight.do(
+                key, lambda: self._retry_policy.call(get_json, deadline=deadline))
+
+        if idempotent is None:
+            idempotent = request_name == 'get'
+        send = functools.partial(self._request, request_name, url, deadline=deadline,
+                                 **request_kwargs)
+        response = self._retry_policy.call(send, idempotent=idempotent, deadline=deadline)
 
         if not json_response:
             return response
 
+        return self._parse_json(response)
+
+    def get_retry_metrics(self):
+        """Get the counts of requests and retries."""
+        return self._retry_policy.metrics
+
+    @staticmethod
+    def _parse_json(response):
         try:
             return response.json()
         except ValueError as e:
             msg = f"Cannot parse response to JSON: {e}"
             raise exceptions.InvalidResponse(response, msg)
 
-    def get(self, name, key):
+    def _get_json(self, url, deadline=None, **request_kwargs):
+        """GET request whose response is revalidated with the server if it is cached."""
+        revalidation_cache = self._revalidation_cache
+        cache_entry = None
+        params = request_kwargs.get('params')
+        if revalidation_cache is not None:
+            cache_entry = revalidation_cache.get(url, params)
+            if cache_entry is not None:
+                request_kwargs['headers'] = dict(request_kwargs.get('headers', {}),
+                                                 **revalidation_cache.get_headers(cache_entry))
+
+        response = self._request('get', url, deadline=deadline, **request_kwargs)
+
+        if cache_entry is not None and response.status_code == 304:
+            logger.debug(f'get {url}: not modified')
+            return revalidation_cache.get_body(cache_entry)
+
+        body = self._parse_json(response)
+        if revalidation_cache is not None:
+            revalidation_cache.set(url, params, response)
+        return body
+
+    def get(self, name, key, deadline=None):
         """Get asset by key."""
         return self.request(
             'get',
             name,
             path=f"{key}",
+            deadline=deadline,
         )
 
     def list(self, name, filters=None):
@@ -228,13 +553,72 @@ class Client():
 
         return items
 
-    def _add(self, name, exist_ok=False, **request_kwargs):
+    def iter_list(self, name, filters=None, page_size=DEFAULT_PAGE_SIZE, prefetch=True):
+        """Iterate over assets by filters, fetching them page by page.
+
+        Pages are requested with the `page` and `page_size` query parameters. If
+        `prefetch` is true, the next page is requested in the background while the
+        assets of the current one are consumed.
+
+        Servers which do not paginate list responses send all the assets at once: the
+        response is then parsed incrementally and the assets are yielded while it is
+        received.
+        """
+        # filters are passed as an already escaped query string
+        search = [utils.parse_filters(filters)] if filters else []
+
+        def _get_page(page, stream=False):
+            return self.request(
+                'get',
+                name,
+                params='&'.join(search + [f'page={page}', f'page_size={page_size}']),
+                json_response=not stream,
+                stream=stream,
+            )
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = 1
+            r = _get_page(page, stream=True)
+            try:
+                body = utils.JsonStream(r.iter_content(JSON_STREAM_CHUNK_SIZE))
+                if body.peek() == '[':
+                    # the server does not paginate list responses
+                    yield from utils.iter_unique(body.iter_items())
+                    return
+                response = body.load()
+            except ValueError as e:
+                raise exceptions.InvalidResponse(r, f"Cannot parse response to JSON: {e}")
+            finally:
+                r.close()
+
+            if not isinstance(response, dict) or 'results' not in response:
+                raise exceptions.InvalidResponse(r, "Cannot parse list response")
+
+            while True:
+                next_page = None
+                if response.get('next'):
+                    page += 1
+                    if executor:
+                        next_page = executor.submit(_get_page, page)
+                yield from response['results']
+
+                if not response.get('next'):
+                    return
+                response = next_page.result() if next_page else _get_page(page)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def _add(self, name, exist_ok=False, deadline=None, **request_kwargs):
         """ Add asset wrapper.
 
         Handles conflict error when created asset already exists.
         """
         try:
-            return self.request('post', name, **request_kwargs)
+            # conflicts are ignored, the request may then be safely retried
+            return self.request('post', name, idempotent=exist_ok, deadline=deadline,
+                                **request_kwargs)
 
         except exceptions.AlreadyExists as e:
             if not exist_ok:
@@ -247,18 +631,21 @@ class Client():
                 raise
 
             logger.warning(f"{name} already exists: key='{key}'")
-            return self.get(name, key)
+            return self.get(name, key, deadline=deadline)
 
-    def add(self, name, retry_timeout=False, exist_ok=False, **request_kwargs):
+    def add(self, name, retry_timeout=False, exist_ok=False, deadline=None, **request_kwargs):
         """Add asset.
 
         In case of timeout, block till resource is created.
 
         If `exist_ok` is true, `AlreadyExists` exceptions will be ignored and the
         existing asset will be returned.
+
+        If `deadline` is set (a `time.time()` timestamp), the requests are not
+        retried beyond it and `DeadlineExceeded` is raised once it has expired.
         """
         try:
-            return self._add(name, exist_ok=exist_ok, **request_kwargs)
+            return self._add(name, exist_ok=exist_ok, deadline=deadline, **request_kwargs)
 
         except exceptions.RequestTimeout as e:
             key = e.pkhash
@@ -268,19 +655,28 @@ class Client():
 
             logger.warning(
                 f'Request timeout, blocking till {name} is created: key={key}')
+            timeout = float(retry_timeout)
+            remaining = utils.get_remaining_time(deadline)
+            if remaining is not None:
+                timeout = min(timeout, remaining)
             retry = utils.retry_on_exception(
                 exceptions=(exceptions.RequestTimeout),
-                timeout=float(retry_timeout),
+                timeout=timeout,
             )
             # XXX as there is no guarantee that the request has been sent to the ledger
             #     (and will be processed), retry on on the add request and ignore
             #     potential conflicts
-            return retry(self._add)(name, exist_ok=True, **request_kwargs)
+            return retry(self._add)(name, exist_ok=True, deadline=deadline, **request_kwargs)
 
-    def get_data(self, address, **request_kwargs):
+    def get_data(self, address, deadline=None, **request_kwargs):
         """Get asset data."""
         return self._request(
             'get',
             address,
+            deadline=deadline,
             **request_kwargs,
         )
+
+    def close(self):
+        """Close all the pooled connections."""
+        self._session.close()
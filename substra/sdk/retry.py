@@ -0,0 +1,180 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import email.utils
+import logging
+import random
+import threading
+import time
+
+from substra.sdk import exceptions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1
+DEFAULT_MAX_DELAY = 30
+DEFAULT_TIMEOUT = 300
+DEFAULT_BUDGET_RATIO = 0.1
+DEFAULT_BUDGET_RESERVE = 10
+
+# gateway errors telling that the request has not been processed by the server
+_NOT_PROCESSED_STATUS_CODES = (502, 503)
+
+
+def full_jitter(attempt, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+    """Get the delay before a retry, drawn between 0 and the exponential backoff.
+
+    `attempt` is the number of retries already made.
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """Get the number of seconds to wait from a `Retry-After` header value.
+
+    The value is either a number of seconds or an HTTP date. Returns None if it is
+    missing or invalid.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0., float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0., date.timestamp() - time.time())
+
+
+class RetryBudget():
+    """Limit the retries to a ratio of the calls.
+
+    Each call deposits `ratio` token and each retry withdraws one, up to `reserve`
+    tokens. When the server keeps failing, the budget is quickly exhausted and only
+    a fraction of the calls are retried instead of all of them.
+    """
+
+    def __init__(self, ratio=DEFAULT_BUDGET_RATIO, reserve=DEFAULT_BUDGET_RESERVE):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._tokens = reserve
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.reserve, self._tokens + self.ratio)
+
+    def withdraw(self):
+        """Withdraw a token for a retry, return false if the budget is exhausted."""
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class RetryPolicy():
+    """Retry the calls failing with transient errors.
+
+    Retries are delayed by an exponential backoff from `base_delay` seconds, capped to
+    `max_delay` seconds and with full jitter so that concurrent clients do not retry
+    all at once. The `Retry-After` header of the response is used instead when it is
+    set.
+
+    Idempotent calls (e.g. GET requests) are retried on connection errors, timeouts,
+    gateway errors and 429 responses. The other ones are only retried on the errors
+    telling that the request has not been processed (429, 502 and 503 responses).
+    Requests are not retried once the circuit breaker of the server is open.
+
+    A call is attempted at most `max_attempts` times, during `timeout` seconds or until
+    its deadline, and retries are limited by a `RetryBudget` shared by all the calls
+    of the policy.
+    The numbers of calls and retries are counted in `metrics`.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, timeout=DEFAULT_TIMEOUT, budget=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.budget = budget or RetryBudget()
+        self._metrics = collections.Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def metrics(self):
+        """Counts of calls, retries and of the reasons why retries stopped."""
+        with self._lock:
+            return dict(self._metrics)
+
+    def _count(self, *names):
+        with self._lock:
+            self._metrics.update(names)
+
+    @staticmethod
+    def is_retryable(error, idempotent):
+        if isinstance(error, (exceptions.CircuitOpen, exceptions.DeadlineExceeded)):
+            return False
+        if isinstance(error, exceptions.TooManyRequests):
+            return True
+        if isinstance(error, exceptions.GatewayUnavailable):
+            return idempotent or error.status_code in _NOT_PROCESSED_STATUS_CODES
+        if isinstance(error, (exceptions.ConnectionError, exceptions.Timeout)):
+            return idempotent
+        return False
+
+    def get_delay(self, attempt, error):
+        retry_after = parse_retry_after(getattr(error, 'retry_after', None))
+        if retry_after is not None:
+            return retry_after
+        return full_jitter(attempt, self.base_delay, self.max_delay)
+
+    def call(self, f, *args, idempotent=True, deadline=None, **kwargs):
+        """Call f, retrying it on transient errors.
+
+        No retry is made after `deadline`, a `time.time()` timestamp.
+        """
+        self._count('calls')
+        self.budget.deposit()
+        tstart = time.time()
+        attempt = 0
+
+        while True:
+            try:
+                return f(*args, **kwargs)
+            except exceptions.RequestException as e:
+                if not self.is_retryable(e, idempotent):
+                    raise
+
+                delay = self.get_delay(attempt, e)
+                attempt += 1
+                if attempt >= self.max_attempts or time.time() - tstart + delay > self.timeout:
+                    self._count('retries_exhausted')
+                    raise
+                if deadline is not None and time.time() + delay > deadline:
+                    self._count('deadline_exceeded')
+                    raise
+                if not self.budget.withdraw():
+                    self._count('retry_budget_exhausted')
+                    raise
+
+                self._count('retries', f'retries.{e.__class__.__name__}')
+                logger.warning(f'Request failed with {e.__class__.__name__}: '
+                               f'retry {attempt} in {delay:.2f}s')
+                time.sleep(delay)
@@ -0,0 +1,89 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket():
+    """Limit the rate of an operation to `rate` per second, with bursts of `burst`.
+
+    The bucket holds up to `burst` tokens and is refilled at `rate` tokens per
+    second; each operation takes a token, waiting for one if the bucket is empty.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting for it if needed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class Throttle():
+    """Limit the rate and the concurrency of the requests sent to a server.
+
+    Used as a context manager around each request, it waits for a token of a
+    `TokenBucket` if `rate` is set and for one of the `max_in_flight` slots if it
+    is set. A single throttle is shared by all the threads of a client.
+
+    The slot of a streamed request must be held until its response is closed, with
+    the `acquire` and `release` methods.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._semaphore = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def acquire(self):
+        """Wait for a slot and a token to send a request."""
+        tstart = time.monotonic()
+        if self._semaphore:
+            self._semaphore.acquire()
+        if self._bucket:
+            self._bucket.acquire()
+        waited = time.monotonic() - tstart
+        if waited > 0.001:
+            logger.debug(f'Request throttled for {waited * 1000:.2f}ms')
+
+    def release(self):
+        """Release the slot of a request which is done."""
+        if self._semaphore:
+            self._semaphore.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -12,21 +12,80 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import codecs
+import collections
+from concurrent.futures import Future, ThreadPoolExecutor
 import contextlib
 import copy
 import io
 import itertools
 import functools
+import hashlib
+import json
 import logging
 import time
 import os
 import re
+import shutil
+import struct
+import tempfile
+import threading
 from urllib.parse import quote
+import uuid
 import zipfile
+import zlib
 
 import ntpath
 
-from substra.sdk import exceptions
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+from substra.sdk import exceptions, retry
+
+logger = logging.getLogger(__name__)
+
+# the ijson coroutine interface with the use_float option requires ijson 3.1
+IJSON_MIN_VERSION = (3, 1)
+if ijson is not None and (
+        tuple(int(v) for v in ijson.__version__.split('.')[:2]) < IJSON_MIN_VERSION):
+    ijson = None  # pragma: no cover
+
+DEFAULT_STREAM_CHUNK_SIZE = 1024 * 1024
+
+COMPRESSION_STORE = 'store'
+COMPRESSION_FAST = 'fast'
+COMPRESSION_DEFAULT = 'default'
+COMPRESSION_BEST = 'best'
+COMPRESSION_AUTO = 'auto'
+COMPRESSIONS = (
+    COMPRESSION_STORE,
+    COMPRESSION_FAST,
+    COMPRESSION_DEFAULT,
+    COMPRESSION_BEST,
+    COMPRESSION_AUTO,
+)
+
+# zip compression type and level of each compression option
+_ZIP_COMPRESSIONS = {
+    COMPRESSION_STORE: (zipfile.ZIP_STORED, None),
+    COMPRESSION_FAST: (zipfile.ZIP_DEFLATED, 1),
+    COMPRESSION_DEFAULT: (zipfile.ZIP_DEFLATED, None),
+    COMPRESSION_BEST: (zipfile.ZIP_DEFLATED, 9),
+}
+
+# compressed members larger than this are spooled to disk by the parallel archiver
+_MEMBER_SPOOL_SIZE = 8 * DEFAULT_STREAM_CHUNK_SIZE
+_ZIP64_VERSION = 45
+_UTF8_FLAG = 0x800
+
+# file formats which are already compressed, stored as is with the 'auto' compression
+INCOMPRESSIBLE_EXTENSIONS = frozenset((
+    '.7z', '.avi', '.br', '.bz2', '.flac', '.gif', '.gz', '.heic', '.jp2', '.jpeg', '.jpg',
+    '.lz4', '.mkv', '.mov', '.mp3', '.mp4', '.npz', '.ogg', '.parquet', '.png', '.tgz',
+    '.webm', '.webp', '.xz', '.zip', '.zst',
+))
 
 
 def path_leaf(path):
@@ -59,25 +118,410 @@ def extract_files(data, file_attributes):
             f.close()
 
 
-def zip_folder(fp, path):
-    zipf = zipfile.ZipFile(fp, 'w', zipfile.ZIP_DEFLATED)
+def _walk_folder(path):
+    """Yield the absolute and archive paths of the files of a folder."""
     for root, dirs, files in os.walk(path):
         for f in files:
             abspath = os.path.join(root, f)
             archive_path = os.path.relpath(abspath, start=path)
-            zipf.write(abspath, arcname=archive_path)
-    zipf.close()
+            yield abspath, archive_path
 
 
-def zip_folder_in_memory(path):
+def get_zip_compression(compression, filename):
+    """Get the zip compression type and level to archive a file with."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression '{compression}', must be one of {COMPRESSIONS}")
+
+    if compression == COMPRESSION_AUTO:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in INCOMPRESSIBLE_EXTENSIONS:
+            compression = COMPRESSION_STORE
+        else:
+            compression = COMPRESSION_DEFAULT
+
+    return _ZIP_COMPRESSIONS[compression]
+
+
+def _get_zip_info(abspath, archive_path, compression):
+    zinfo = zipfile.ZipInfo.from_file(abspath, arcname=archive_path)
+    zinfo.compress_type, level = get_zip_compression(compression, abspath)
+    # the compression level attribute has been made public in python 3.13
+    if hasattr(zinfo, 'compress_level'):
+        zinfo.compress_level = level
+    else:
+        zinfo._compresslevel = level
+    return zinfo
+
+
+class ArchiveStats():
+    """Sizes and durations of folder archives.
+
+    The stats of many archives can be summed with `merge`. `bytes_saved` is the size
+    saved by the compression; `time_saved` estimates the compression time saved by
+    storing files without compression, from the throughput of the compressed files.
+    It is None if no file has been compressed to measure this throughput.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.archives = 0
+        self.files_size = 0
+        self.stored_size = 0
+        self.stored_duration = 0
+        self.compressed_size = 0
+        self.compressed_duration = 0
+        self.archive_size = 0
+        self.duration = 0
+
+    def add_file(self, zinfo, duration):
+        self.files_size += zinfo.file_size
+        if zinfo.compress_type == zipfile.ZIP_STORED:
+            self.stored_size += zinfo.file_size
+            self.stored_duration += duration
+        else:
+            self.compressed_size += zinfo.file_size
+            self.compressed_duration += duration
+
+    def merge(self, other):
+        for attr in ('archives', 'files_size', 'stored_size', 'stored_duration',
+                     'compressed_size', 'compressed_duration', 'archive_size', 'duration'):
+            setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+
+    @property
+    def bytes_saved(self):
+        return self.files_size - self.archive_size
+
+    @property
+    def time_saved(self):
+        if not self.stored_size:
+            return 0
+        if not self.compressed_size:
+            return None
+        compression_duration = self.stored_size * self.compressed_duration / self.compressed_size
+        return max(0, compression_duration - self.stored_duration)
+
+    def to_dict(self):
+        return {
+            'archives': self.archives,
+            'files_size': self.files_size,
+            'stored_size': self.stored_size,
+            'archive_size': self.archive_size,
+            'duration': self.duration,
+            'bytes_saved': self.bytes_saved,
+            'time_saved': self.time_saved,
+        }
+
+    def __str__(self):
+        time_saved = 'unknown' if self.time_saved is None else f'~{self.time_saved:.2f}s'
+        return (f"{self.files_size} bytes archived into {self.archive_size} bytes in "
+                f"{self.duration:.2f}s ({self.bytes_saved} bytes saved, {self.stored_size} "
+                f"bytes stored without compression, {time_saved} saved)")
+
+    def log(self):
+        logger.info(f"Archived '{self.path}': {self}")
+
+
+def _compress_member(abspath, archive_path, compression, chunk_size):
+    """Compress a file as a raw zip member.
+
+    Returns the member zip info, a temporary file holding its compressed data and the
+    compression duration.
+    """
+    ts = time.time()
+    zinfo = _get_zip_info(abspath, archive_path, compression)
+    compress_type, level = get_zip_compression(compression, abspath)
+    compressor = None
+    if compress_type == zipfile.ZIP_DEFLATED:
+        if level is None:
+            level = zlib.Z_DEFAULT_COMPRESSION
+        # negative window bits produce the raw deflate stream expected in zip archives
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+
+    member = tempfile.SpooledTemporaryFile(max_size=_MEMBER_SPOOL_SIZE)
+    crc = 0
+    file_size = 0
+    with open(abspath, 'rb') as src:
+        for data in iter(lambda: src.read(chunk_size), b''):
+            crc = zlib.crc32(data, crc)
+            file_size += len(data)
+            member.write(compressor.compress(data) if compressor else data)
+    if compressor:
+        member.write(compressor.flush())
+
+    zinfo.CRC = crc
+    zinfo.file_size = file_size
+    zinfo.compress_size = member.tell()
+    member.seek(0)
+    return zinfo, member, time.time() - ts
+
+
+def _encode_filename(zinfo):
+    try:
+        return zinfo.filename.encode('ascii'), zinfo.flag_bits
+    except UnicodeEncodeError:
+        return zinfo.filename.encode('utf-8'), zinfo.flag_bits | _UTF8_FLAG
+
+
+def _get_central_directory(members, offset):
+    """Get the zip central directory and end records of the members written before offset."""
+    records = []
+    for zinfo in members:
+        file_size = zinfo.file_size
+        compress_size = zinfo.compress_size
+        header_offset = zinfo.header_offset
+        extra = []
+        if file_size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT:
+            extra.extend((file_size, compress_size))
+            file_size = compress_size = 0xffffffff
+        if header_offset > zipfile.ZIP64_LIMIT:
+            extra.append(header_offset)
+            header_offset = 0xffffffff
+
+        extract_version = zinfo.extract_version
+        create_version = zinfo.create_version
+        extra_data = zinfo.extra
+        if extra:
+            extra_data = struct.pack(f'<HH{len(extra)}Q', 1, 8 * len(extra), *extra) + extra_data
+            extract_version = max(_ZIP64_VERSION, extract_version)
+            create_version = max(_ZIP64_VERSION, create_version)
+
+        dt = zinfo.date_time
+        dosdate = (dt[0] - 1980) << 9 | dt[1] << 5 | dt[2]
+        dostime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+        filename, flag_bits = _encode_filename(zinfo)
+        records.append(struct.pack(
+            zipfile.structCentralDir, zipfile.stringCentralDir, create_version,
+            zinfo.create_system, extract_version, zinfo.reserved, flag_bits,
+            zinfo.compress_type, dostime, dosdate, zinfo.CRC, compress_size, file_size,
+            len(filename), len(extra_data), len(zinfo.comment), 0, zinfo.internal_attr,
+            zinfo.external_attr, header_offset))
+        records.extend((filename, extra_data, zinfo.comment))
+
+    count = len(members)
+    size = sum(len(r) for r in records)
+    if (count >= zipfile.ZIP_FILECOUNT_LIMIT or offset > zipfile.ZIP64_LIMIT or
+            size > zipfile.ZIP64_LIMIT):
+        records.append(struct.pack(
+            zipfile.structEndArchive64, zipfile.stringEndArchive64, 44, _ZIP64_VERSION,
+            _ZIP64_VERSION, 0, 0, count, count, size, offset))
+        records.append(struct.pack(
+            zipfile.structEndArchive64Locator, zipfile.stringEndArchive64Locator, 0,
+            offset + size, 1))
+        count = min(count, 0xffff)
+        size = min(size, 0xffffffff)
+        offset = min(offset, 0xffffffff)
+    records.append(struct.pack(
+        zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0, count, count, size,
+        offset, 0))
+    return b''.join(records)
+
+
+def _iter_zip_folder_parallel(path, compression, max_workers, stats,
+                              chunk_size=DEFAULT_STREAM_CHUNK_SIZE):
+    """Yield the chunks of a zip archive of a folder whose files are compressed concurrently.
+
+    Files are compressed by a pool of `max_workers` threads (zlib releases the GIL)
+    and written in order as soon as they are ready. At most twice as many files as
+    workers are compressed ahead of the one being written.
+    """
+    members = []
+    offset = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = collections.deque()
+        files = _walk_folder(path)
+        while True:
+            for abspath, archive_path in itertools.islice(files, 2 * max_workers - len(pending)):
+                pending.append(executor.submit(
+                    _compress_member, abspath, archive_path, compression, chunk_size))
+            if not pending:
+                break
+
+            zinfo, member, duration = pending.popleft().result()
+            with member:
+                zinfo.header_offset = offset
+                header = zinfo.FileHeader()
+                offset += len(header)
+                yield header
+                for data in iter(lambda: member.read(chunk_size), b''):
+                    offset += len(data)
+                    yield data
+            members.append(zinfo)
+            stats.add_file(zinfo, duration)
+
+    yield _get_central_directory(members, offset)
+
+
+def zip_folder(fp, path, compression=COMPRESSION_DEFAULT, max_workers=None, on_stats=None):
+    """Archive a folder in a file object.
+
+    `compression` is one of:
+    - store: files are stored without compression
+    - fast: fastest compression
+    - default: default compression level
+    - best: highest compression ratio
+    - auto: files with a compressed format (images, videos, archives...) are
+      stored, the other ones are compressed with the default level
+
+    If `max_workers` is greater than 1, files are compressed concurrently by as
+    many threads.
+
+    Returns the archive `ArchiveStats`, which are also passed to the `on_stats`
+    callback if it is set.
+    """
+    ts = time.time()
+    stats = ArchiveStats(path)
+    start = fp.tell()
+    if max_workers and max_workers > 1:
+        for data in _iter_zip_folder_parallel(path, compression, max_workers, stats):
+            fp.write(data)
+    else:
+        with zipfile.ZipFile(fp, 'w') as zipf:
+            for abspath, archive_path in _walk_folder(path):
+                member_ts = time.time()
+                zinfo = _get_zip_info(abspath, archive_path, compression)
+                with open(abspath, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                    shutil.copyfileobj(src, dst, DEFAULT_STREAM_CHUNK_SIZE)
+                stats.add_file(zinfo, time.time() - member_ts)
+    stats.archives = 1
+    stats.archive_size = fp.tell() - start
+    stats.duration = time.time() - ts
+    stats.log()
+    if on_stats:
+        on_stats(stats)
+    return stats
+
+
+def zip_folder_in_memory(path, compression=COMPRESSION_DEFAULT, max_workers=None,
+                         on_stats=None):
     fp = io.BytesIO()
-    zip_folder(fp, path)
+    zip_folder(fp, path, compression=compression, max_workers=max_workers, on_stats=on_stats)
     fp.seek(0)
     return fp
 
 
+class _StreamBuffer(io.RawIOBase):
+    """Write-only and non-seekable buffer, emptied by the zip stream reader."""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._buffer.extend(b)
+        return len(b)
+
+    def pop(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class ZipStream():
+    """Zip archive of a folder produced chunk by chunk while iterating.
+
+    Only about `chunk_size` bytes of the archive are held in memory at once.
+    The archive is built again each time the object is iterated so that it can
+    be sent again when a request is retried. Once the archive has been iterated, its
+    `ArchiveStats` are passed to the `on_stats` callback if it is set.
+    """
+
+    def __init__(self, path, chunk_size=DEFAULT_STREAM_CHUNK_SIZE,
+                 compression=COMPRESSION_DEFAULT, max_workers=None, on_stats=None):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.max_workers = max_workers
+        self.on_stats = on_stats
+
+    def __iter__(self):
+        ts = time.time()
+        stats = ArchiveStats(self.path)
+        if self.max_workers and self.max_workers > 1:
+            chunks = _iter_zip_folder_parallel(
+                self.path, self.compression, self.max_workers, stats, self.chunk_size)
+        else:
+            chunks = self._iter_zip_folder(stats)
+
+        for data in chunks:
+            stats.archive_size += len(data)
+            yield data
+        stats.archives = 1
+        stats.duration = time.time() - ts
+        stats.log()
+        if self.on_stats:
+            self.on_stats(stats)
+
+    def _iter_zip_folder(self, stats):
+        buffer = _StreamBuffer()
+        # zipfile writes data descriptors after each member as the buffer is not seekable
+        with zipfile.ZipFile(buffer, 'w') as zipf:
+            for abspath, archive_path in _walk_folder(self.path):
+                # the time spent by the consumer of the chunks is not counted
+                duration = 0
+                member_ts = time.time()
+                zinfo = _get_zip_info(abspath, archive_path, self.compression)
+                with open(abspath, 'rb') as src, zipf.open(zinfo, 'w') as dst:
+                    for data in iter(lambda: src.read(self.chunk_size), b''):
+                        dst.write(data)
+                        if len(buffer) >= self.chunk_size:
+                            duration += time.time() - member_ts
+                            yield buffer.pop()
+                            member_ts = time.time()
+                stats.add_file(zinfo, duration + time.time() - member_ts)
+        if len(buffer):
+            yield buffer.pop()
+
+    def close(self):
+        pass
+
+
+class MultipartStream():
+    """multipart/form-data request body produced chunk by chunk while iterating.
+
+    `fields` maps field names to strings, `files` maps file names to iterables of
+    bytes (e.g. `ZipStream` objects). Passed as the request data, the body is sent
+    with a chunked transfer encoding.
+    """
+
+    def __init__(self, fields, files):
+        self.fields = fields
+        self.files = files
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={self.boundary}'
+
+    def __iter__(self):
+        for name, value in self.fields.items():
+            yield (f'--{self.boundary}\r\n'
+                   f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                   f'{value}\r\n').encode('utf-8')
+
+        for name, content in self.files.items():
+            yield (f'--{self.boundary}\r\n'
+                   f'Content-Disposition: form-data; name="{name}"; filename="{name}"\r\n'
+                   f'Content-Type: application/octet-stream\r\n\r\n').encode('utf-8')
+            yield from content
+            yield b'\r\n'
+
+        yield f'--{self.boundary}--\r\n'.encode('utf-8')
+
+
 @contextlib.contextmanager
-def extract_data_sample_files(data):
+def extract_data_sample_files(data, stream=False, compression=COMPRESSION_DEFAULT,
+                              max_workers=None, on_stats=None):
+    """Extract the data sample folders from data and archive them.
+
+    If `stream` is true, the folders are archived as `ZipStream` objects to be
+    sent as a `MultipartStream` request body instead of being archived in memory.
+
+    For the `compression`, `max_workers` and `on_stats` arguments, please refer to
+    the function `zip_folder`.
+    """
     # handle data sample specific case; paths and path cases
     data = copy.deepcopy(data)
 
@@ -88,14 +532,25 @@ def extract_data_sample_files(data):
         del data[attr]
 
     for p in list(data.get('paths', [])):
-        folders[path_leaf(p)] = p
+        # folders may share the same basename, the archive names must be unique
+        name = leaf = path_leaf(p)
+        index = 1
+        while name in folders:
+            name = f'{leaf}_{index}'
+            index += 1
+        folders[name] = p
         data['paths'].remove(p)
 
     files = {}
     for k, f in folders.items():
         if not os.path.isdir(f):
             raise exceptions.LoadDataException(f"Paths '{f}' is not an existing directory")
-        files[k] = zip_folder_in_memory(f)
+        if stream:
+            files[k] = ZipStream(f, compression=compression, max_workers=max_workers,
+                                 on_stats=on_stats)
+        else:
+            files[k] = zip_folder_in_memory(f, compression=compression, max_workers=max_workers,
+                                            on_stats=on_stats)
 
     try:
         yield (data, files)
@@ -104,12 +559,202 @@ def extract_data_sample_files(data):
             f.close()
 
 
+def get_data_sample_hash(path):
+    """Get the key of the data sample of a local folder.
+
+    The key is computed as the server does: the sorted sha256 hex digests of the
+    files of the folder are hashed together with sha256.
+    """
+    hashes = []
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            sha256 = hashlib.sha256()
+            with open(os.path.join(root, filename), 'rb') as fh:
+                for data in iter(lambda: fh.read(DEFAULT_STREAM_CHUNK_SIZE), b''):
+                    sha256.update(data)
+            hashes.append(sha256.hexdigest())
+
+    sha256 = hashlib.sha256()
+    for h in sorted(hashes):
+        sha256.update(h.encode('utf-8'))
+    return sha256.hexdigest()
+
+
+def get_item_id(item):
+    """Get the identifier of a listed item: its asset key, or its value if it has none."""
+    if isinstance(item, dict):
+        key = item.get('key') or item.get('pkhash')
+        if key is not None:
+            return key
+        return json.dumps(item, sort_keys=True, default=str)
+    return item
+
+
+def iter_unique(items):
+    """Iterate over items without duplicates.
+
+    Items are deduplicated by asset key (`key` or `pkhash`), or by value if they do
+    not have one.
+    """
+    seen = set()
+    for item in items:
+        item_id = get_item_id(item)
+        if item_id not in seen:
+            seen.add(item_id)
+            yield item
+
+
+def iter_flatten(list_of_list):
+    """Iterate over the items of a list of lists, without duplicates."""
+    return iter_unique(itertools.chain.from_iterable(list_of_list))
+
+
 def flatten(list_of_list):
-    res = []
-    for item in itertools.chain.from_iterable(list_of_list):
-        if item not in res:
-            res.append(item)
-    return res
+    return list(iter_flatten(list_of_list))
+
+
+_JSON_WHITESPACE = ' \t\n\r'
+_JSON_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class _JsonListParser():
+    """Incremental parser of the items of a JSON list received by chunks of bytes.
+
+    Items are decoded one by one with `json.JSONDecoder.raw_decode`, so that only
+    the item being decoded is buffered. Nested lists are flattened.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Append the next chunk to the buffer, return false once the body is read."""
+        if self._eof:
+            return False
+        try:
+            text = self._text_decoder.decode(next(self._chunks))
+        except StopIteration:
+            text = self._text_decoder.decode(b'', final=True)
+            self._eof = True
+        # drop the parsed data to keep the buffer small
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Return the next non whitespace character, or an empty string at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _JSON_WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ''
+
+    def _expect(self, chars):
+        c = self._peek()
+        if not c or c not in chars:
+            raise ValueError(f"Expecting one of {chars!r}, got {c!r}")
+        self._pos += 1
+        return c
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                if not self._read():
+                    raise
+                continue
+            # a number may continue in the next chunk
+            if (isinstance(value, (int, float)) and
+                    not self._buffer[end:].lstrip(_JSON_NUMBER_CHARS) and self._read()):
+                continue
+            self._pos = end
+            return value
+
+    def _iter_items(self, flatten):
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            if flatten and self._peek() == '[':
+                yield from self._iter_items(flatten=False)
+            else:
+                yield self._decode_value()
+            if self._expect(',]') == ']':
+                return
+
+    def __iter__(self):
+        yield from self._iter_items(flatten=True)
+        if self._peek():
+            raise ValueError("Extra data after the JSON list")
+
+
+class JsonStream():
+    """JSON body received by chunks of bytes, e.g. from `response.iter_content`.
+
+    `iter_items` parses a list body incrementally and yields its items as soon as
+    they are received, flattening nested lists, so that large lists are never
+    entirely loaded in memory. The ijson library is used as parsing backend if it
+    is installed.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._head = []
+
+    def _peek_chars(self, n):
+        """Return the first n non whitespace characters of the body."""
+        whitespace = _JSON_WHITESPACE.encode()
+        chars = b''.join(c.translate(None, whitespace) for c in self._head)
+        while len(chars) < n:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            self._head.append(chunk)
+            chars += chunk.translate(None, whitespace)
+        return chars[:n].decode('utf-8', errors='replace')
+
+    def _iter_chunks(self):
+        return itertools.chain(self._head, self._chunks)
+
+    def peek(self):
+        """Return the first non whitespace character of the body."""
+        return self._peek_chars(1)
+
+    def load(self):
+        """Parse the whole body."""
+        return json.loads(b''.join(self._iter_chunks()))
+
+    def _iter_items_ijson(self):
+        prefix = 'item.item' if self._peek_chars(2) == '[[' else 'item'
+        items = ijson.sendable_list()
+        coroutine = ijson.items_coro(items, prefix, use_float=True)
+        try:
+            for chunk in self._iter_chunks():
+                coroutine.send(chunk)
+                yield from items
+                del items[:]
+            coroutine.close()
+        except ijson.JSONError as e:
+            raise ValueError(str(e)) from e
+        yield from items
+
+    def iter_items(self):
+        """Iterate over the items of a list body, flattening nested lists."""
+        if ijson is not None:
+            return self._iter_items_ijson()
+        return iter(_JsonListParser(self._iter_chunks()))
 
 
 def _join_and_groups(items):
@@ -156,13 +801,26 @@ def parse_filters(filters):
     return 'search=%s' % quote(''.join(filters))
 
 
+def get_remaining_time(deadline):
+    """Get the number of seconds left before a deadline, a `time.time()` timestamp.
+
+    Returns None if there is no deadline and raises `DeadlineExceeded` if it has
+    expired.
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise exceptions.DeadlineExceeded("Deadline exceeded", None)
+    return remaining
+
+
 def retry_on_exception(exceptions, timeout=300):
     """Retry function in case of exception(s)."""
     def _retry(f):
         @functools.wraps(f)
         def wrapper(*args, **kwargs):
-            delay = 1
-            backoff = 2
+            attempt = 0
             tstart = time.time()
 
             while True:
@@ -172,15 +830,107 @@ def retry_on_exception(exceptions, timeout=300):
                 except exceptions:
                     if timeout is not False and time.time() - tstart > timeout:
                         raise
+                    delay = retry.full_jitter(attempt)
+                    attempt += 1
                     logging.warning(
-                        f'Function {f.__name__} failed: retrying in {delay}s')
+                        f'Function {f.__name__} failed: retrying in {delay:.2f}s')
                     time.sleep(delay)
-                    delay *= backoff
 
         return wrapper
     return _retry
 
 
+class SingleFlight():
+    """Share the result of identical concurrent calls.
+
+    While a call identified by a key is running, the calls with the same key wait
+    for its result instead of being executed. The waiting callers get a copy of the
+    result, or the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, f):
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not is_leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = f()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class Poller():
+    """Adaptive delay between the polls of a server.
+
+    The delay starts at `min_delay` seconds and is multiplied by `backoff` after
+    each poll which does not observe any change, up to `max_delay` seconds. It is
+    reset to `min_delay` once a change is observed.
+    """
+
+    def __init__(self, min_delay, max_delay, timeout=None, backoff=2):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.delay = min_delay
+        self.deadline = time.time() + timeout if timeout is not None else None
+
+    def wait(self, changed=False):
+        """Sleep until the next poll.
+
+        Returns false without sleeping if the timeout has elapsed.
+        """
+        if changed:
+            self.delay = self.min_delay
+        delay = self.delay
+        if self.deadline is not None:
+            remaining = self.deadline - time.time()
+            if remaining <= 0:
+                return False
+            delay = min(delay, remaining)
+        time.sleep(delay)
+        self.delay = min(self.delay * self.backoff, self.max_delay)
+        return True
+
+
+def map_concurrently(f, items, max_workers):
+    """Call f on each item from a thread pool.
+
+    Results are returned in the items order. An item for which f raised an
+    SDK exception gets the exception in place of its result, any other error
+    is raised.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(f, item) for item in items]
+
+    results = []
+    for future in futures:
+        error = future.exception()
+        if error is None:
+            results.append(future.result())
+        elif isinstance(error, exceptions.SDKException):
+            results.append(error)
+        else:
+            raise error
+    return results
+
+
 def response_get_destination_filename(response):
     """Get filename from content-disposition header."""
     disposition = response.headers.get('content-disposition')
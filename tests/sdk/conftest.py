@@ -15,6 +15,15 @@
 import pytest
 
 import substra
+from substra.sdk import circuit_breaker
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    # circuit breakers are shared by the clients of the process
+    circuit_breaker.reset()
+    yield
+    circuit_breaker.reset()
 
 
 @pytest.fixture
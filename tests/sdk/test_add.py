@@ -11,11 +11,15 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+import os
+import time
+
 import pytest
 import substra
 
 from .. import datastore
-from .utils import mock_requests
+from .utils import mock_requests, mock_requests_responses, mock_response
 
 
 def test_add_dataset(client, dataset_query, mocker):
@@ -62,6 +66,16 @@ def test_add_objective(client, objective_query, mocker):
     m_get.assert_called()
 
 
+def test_add_objective_deadline(client, objective_query, mocker):
+    mock_requests(mocker, "post", response=datastore.OBJECTIVE)
+    m_get = mock_requests(mocker, "get", response=datastore.OBJECTIVE)
+    client.add_objective(objective_query, deadline=time.time() + 60)
+
+    # the asset is fetched again within the deadline
+    _, read_timeout = m_get.call_args[1]['timeout']
+    assert read_timeout <= 60
+
+
 def test_add_algo(client, algo_query, mocker):
     m_post = mock_requests(mocker, "post", response=datastore.ALGO)
     m_get = mock_requests(mocker, "get", response=datastore.ALGO)
@@ -109,6 +123,71 @@ def test_add_data_sample_already_exists(client, data_sample_query, mocker):
     m.assert_called()
 
 
+def test_add_data_sample_precheck(client, data_sample_query, mocker):
+    key = substra.sdk.utils.get_data_sample_hash(data_sample_query['path'])
+    m_get = mock_requests_responses(
+        mocker, "get", [mock_response([[{"key": key}]]) for _ in range(2)])
+    m_post = mock_requests(mocker, "post", response=[{"key": "42"}])
+
+    response = client.add_data_sample(data_sample_query, exist_ok=True, precheck=True)
+    assert response == {"pkhash": key}
+    m_post.assert_not_called()
+
+    with pytest.raises(substra.sdk.exceptions.AlreadyExists):
+        client.add_data_sample(data_sample_query, precheck=True)
+    assert m_get.call_count == 2
+    m_post.assert_not_called()
+
+
+def test_add_data_sample_stream(client, data_sample_query, mocker):
+    server_response = [{"key": "42"}]
+    m = mock_requests(mocker, "post", response=server_response)
+    response = client.add_data_sample(data_sample_query, stream=True)
+
+    assert response == server_response[0]
+    body = m.call_args[1]['data']
+    assert isinstance(body, substra.sdk.utils.MultipartStream)
+    assert m.call_args[1]['headers']['Content-Type'] == body.content_type
+    assert 'files' not in m.call_args[1]
+    assert list(body.files) == ['path']
+
+
+def test_add_data_sample_profile_compression(client, data_sample_query, mocker):
+    mock_requests_responses(mocker, "post", [mock_response([{"key": "42"}]) for _ in range(2)])
+    m_zip = mocker.patch('substra.sdk.utils.zip_folder_in_memory')
+
+    client._current_profile['archive_compression'] = 'store'
+    client.add_data_sample(data_sample_query)
+    assert m_zip.call_args[1] == {'compression': 'store', 'max_workers': None,
+                                  'on_stats': client._add_archive_stats}
+
+    client._current_profile['archive_workers'] = 4
+    client.add_data_sample(data_sample_query, compression='fast')
+    assert m_zip.call_args[1] == {'compression': 'fast', 'max_workers': 4,
+                                  'on_stats': client._add_archive_stats}
+
+    with pytest.raises(ValueError):
+        client.add_data_sample(data_sample_query, compression='foo')
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_add_data_samples_archive_stats(client, data_samples_query, mocker, stream):
+    def post(url, data=None, files=None, **kwargs):
+        if stream:
+            # consume the streamed body as the request would
+            b''.join(data)
+        return mock_response([{"key": "42"}] * 3)
+
+    mocker.patch('substra.sdk.rest_client.requests.Session.post', side_effect=post)
+    assert client.get_archive_stats()['archives'] == 0
+
+    client.add_data_samples(data_samples_query, stream=stream)
+    stats = client.get_archive_stats()
+    assert stats['archives'] == 3
+    assert stats['files_size'] == 3 * len('Hello world 0')
+    assert stats['bytes_saved'] == stats['files_size'] - stats['archive_size']
+
+
 # We try to add multiple data samples instead of a single one
 def test_add_data_sample_with_paths(client, data_samples_query):
     with pytest.raises(ValueError):
@@ -128,3 +207,90 @@ def test_add_data_samples(client, data_samples_query, mocker):
 def test_add_data_samples_with_path(client, data_sample_query):
     with pytest.raises(ValueError):
         client.add_data_samples(data_sample_query)
+
+
+def _mock_add_data_samples(mocker, fail_on=None):
+    def post(url, data=None, files=None, **kwargs):
+        if fail_on and fail_on in files:
+            return mock_response(status=500)
+        return mock_response([{"pkhash": f"key-{name}"} for name in files])
+
+    return mocker.patch('substra.sdk.rest_client.requests.Session.post', side_effect=post)
+
+
+def test_add_data_samples_in_batches(client, data_samples_query, mocker):
+    m = _mock_add_data_samples(mocker)
+    response = client.add_data_samples_in_batches(data_samples_query, batch_size=2)
+
+    assert response == ['key-data_sample_0', 'key-data_sample_1', 'key-data_sample_2']
+    assert m.call_count == 2
+
+
+def test_add_data_samples_in_batches_resume(client, data_samples_query, mocker, tmpdir):
+    journal_path = str(tmpdir / "journal")
+
+    m = _mock_add_data_samples(mocker, fail_on='data_sample_2')
+    with pytest.raises(substra.sdk.exceptions.InternalServerError):
+        client.add_data_samples_in_batches(
+            data_samples_query, batch_size=1, journal_path=journal_path)
+    assert m.call_count == 3
+
+    with open(journal_path) as fh:
+        journal = [json.loads(line) for line in fh]
+    assert sorted(e['key'] for e in journal) == ['key-data_sample_0', 'key-data_sample_1']
+
+    # only the failed batch is sent again
+    m = _mock_add_data_samples(mocker)
+    response = client.add_data_samples_in_batches(
+        data_samples_query, batch_size=1, journal_path=journal_path)
+    assert response == ['key-data_sample_0', 'key-data_sample_1', 'key-data_sample_2']
+    assert m.call_count == 1
+
+
+def test_add_data_samples_in_batches_precheck(client, data_samples_query, mocker, tmpdir):
+    journal_path = str(tmpdir / "journal")
+    existing_key = substra.sdk.utils.get_data_sample_hash(data_samples_query['paths'][1])
+    mock_requests(mocker, "get", response=[[{"key": existing_key}, {"key": "foo"}]])
+
+    m = _mock_add_data_samples(mocker)
+    response = client.add_data_samples_in_batches(
+        data_samples_query, batch_size=1, journal_path=journal_path, precheck=True)
+    assert response == ['key-data_sample_0', existing_key, 'key-data_sample_2']
+    assert m.call_count == 2
+
+    with open(journal_path) as fh:
+        assert existing_key in [json.loads(line)['key'] for line in fh]
+
+
+def test_add_data_samples_in_batches_same_basename(client, mocker, tmpdir):
+    paths = []
+    for i, name in enumerate(['a/sample', 'b/sample', 'c/other']):
+        path = tmpdir / 'dup' / name
+        (path / 'data.txt').write_text(f'Hello world {i}', encoding='utf-8', ensure=True)
+        paths.append(str(path))
+    hashes = [substra.sdk.utils.get_data_sample_hash(p) for p in paths]
+    journal_path = str(tmpdir / 'journal')
+
+    def post(url, data=None, files=None, **kwargs):
+        assert len(files) == 3
+        # the data samples are mapped to the paths by key, whatever their order
+        return mock_response([{"pkhash": h} for h in reversed(hashes)])
+
+    mocker.patch('substra.sdk.rest_client.requests.Session.post', side_effect=post)
+    response = client.add_data_samples_in_batches(
+        {'paths': paths, 'data_manager_keys': ['42']}, batch_size=3, journal_path=journal_path)
+    assert response == hashes
+
+    with open(journal_path) as fh:
+        journal = {e['path']: e['key'] for e in map(json.loads, fh)}
+    assert journal == dict(zip(paths, hashes))
+
+
+def test_add_data_samples_in_batches_missing_results(client, data_samples_query, mocker, tmpdir):
+    journal_path = str(tmpdir / 'journal')
+    mock_requests(mocker, 'post', response=[{"pkhash": "foo"}])
+
+    with pytest.raises(substra.sdk.exceptions.InvalidResponse):
+        client.add_data_samples_in_batches(
+            data_samples_query, batch_size=3, journal_path=journal_path)
+    assert not os.path.exists(journal_path) or os.path.getsize(journal_path) == 0
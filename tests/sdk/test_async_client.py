@@ -0,0 +1,71 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+
+import pytest
+
+import substra
+
+from .. import datastore
+from .utils import mock_requests, mock_requests_responses, mock_response
+
+
+@pytest.fixture
+def async_client(tmpdir):
+    config_path = tmpdir / "substra.cfg"
+    c = substra.AsyncClient(config_path=str(config_path), max_concurrency=4)
+    c.add_profile('test', 'foo', 'password', url="http://foo.io")
+    yield c
+    c.close()
+
+
+def test_get_asset(async_client, mocker):
+    m = mock_requests(mocker, "get", response=datastore.TRAINTUPLE)
+
+    response = asyncio.run(async_client.get_traintuple('magic-key'))
+
+    assert response == datastore.TRAINTUPLE
+    m.assert_called()
+
+
+def test_get_many_concurrently(async_client, mocker):
+    nb = 20
+    m = mock_requests_responses(
+        mocker, "get", [mock_response(datastore.TESTTUPLE) for _ in range(nb)])
+
+    async def get_all():
+        return await asyncio.gather(*[
+            async_client.get_testtuple(f'key-{i}') for i in range(nb)
+        ])
+
+    responses = asyncio.run(get_all())
+
+    assert responses == [datastore.TESTTUPLE] * nb
+    assert m.call_count == nb
+
+
+def test_list_asset_with_filters(async_client, mocker):
+    m = mock_requests(mocker, "get", response=[[datastore.ALGO]])
+
+    response = asyncio.run(async_client.list_algo(['algo:name:foo']))
+
+    assert response == [datastore.ALGO]
+    assert m.call_args[1]['params'] == 'search=algo%3Aname%3Afoo'
+
+
+def test_get_asset_not_found(async_client, mocker):
+    mock_requests(mocker, "get", status=404)
+
+    with pytest.raises(substra.exceptions.NotFound):
+        asyncio.run(async_client.get_algo('magic-key'))
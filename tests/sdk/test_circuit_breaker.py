@@ -0,0 +1,149 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import requests
+
+from substra.sdk import circuit_breaker, exceptions, rest_client
+
+from .test_rest_client import CONFIG
+from .utils import mock_response
+
+
+@pytest.fixture
+def m_time(mocker):
+    m = mocker.patch('substra.sdk.circuit_breaker.time.monotonic')
+    m.return_value = 0
+    return m
+
+
+def test_circuit_breaker(m_time):
+    breaker = circuit_breaker.CircuitBreaker('http://foo.com', failure_threshold=2,
+                                             recovery_timeout=10)
+    breaker.on_failure()
+    breaker.before_request()
+    breaker.on_failure()
+    assert breaker.state == circuit_breaker.OPEN
+    with pytest.raises(exceptions.CircuitOpen):
+        breaker.before_request()
+
+    # a single request probes the server once the recovery timeout has expired
+    m_time.return_value = 10
+    breaker.before_request()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+    with pytest.raises(exceptions.CircuitOpen):
+        breaker.before_request()
+
+    # the circuit is opened again if the probe fails
+    breaker.on_failure()
+    assert breaker.state == circuit_breaker.OPEN
+    with pytest.raises(exceptions.CircuitOpen):
+        breaker.before_request()
+
+    m_time.return_value = 20
+    breaker.before_request()
+    breaker.on_success()
+    assert breaker.state == circuit_breaker.CLOSED
+    breaker.before_request()
+
+
+def test_circuit_breaker_shared_by_url():
+    assert circuit_breaker.get('http://foo.com') is circuit_breaker.get('http://foo.com')
+    assert circuit_breaker.get('http://foo.com') is not circuit_breaker.get('http://bar.com')
+
+
+def test_rest_client_fails_fast(mocker, m_time):
+    mocker.patch('substra.sdk.retry.time.sleep')
+    m = mocker.patch('substra.sdk.rest_client.requests.Session.get',
+                     side_effect=requests.exceptions.ConnectionError('refused'))
+    client = rest_client.Client(dict(CONFIG, circuit_breaker_threshold=3, retry_max_attempts=10))
+
+    with pytest.raises(exceptions.CircuitOpen):
+        client.get('traintuple', 'a-key')
+    assert m.call_count == 3
+
+    # another client to the same server fails fast as well
+    with pytest.raises(exceptions.CircuitOpen):
+        rest_client.Client(CONFIG).get('traintuple', 'a-key')
+    assert m.call_count == 3
+
+
+def test_rest_client_server_errors_close_circuit(mocker):
+    m = mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=[
+        requests.exceptions.ConnectionError('refused'),
+        mock_response(status=404),
+        requests.exceptions.ConnectionError('refused'),
+    ])
+    client = rest_client.Client(dict(CONFIG, circuit_breaker_threshold=2, retry_max_attempts=1))
+
+    for error in (exceptions.ConnectionError, exceptions.NotFound, exceptions.ConnectionError):
+        with pytest.raises(error):
+            client.get('traintuple', 'a-key')
+    assert client._circuit_breaker.state == circuit_breaker.CLOSED
+    assert m.call_count == 3
+
+
+def test_rest_client_circuit_breaker_disabled(mocker):
+    client = rest_client.Client(dict(CONFIG, circuit_breaker_threshold=0))
+    assert client._circuit_breaker is None
+
+
+def test_circuit_breaker_probe_expires(m_time):
+    breaker = circuit_breaker.CircuitBreaker('http://foo.com', failure_threshold=1,
+                                             recovery_timeout=10)
+    breaker.on_failure()
+    m_time.return_value = 10
+    breaker.before_request()
+
+    # the probe has no outcome, another one is sent once the recovery timeout expires
+    m_time.return_value = 15
+    with pytest.raises(exceptions.CircuitOpen):
+        breaker.before_request()
+    m_time.return_value = 20
+    breaker.before_request()
+    assert breaker.state == circuit_breaker.HALF_OPEN
+
+
+def test_circuit_breaker_timeout(m_time):
+    breaker = circuit_breaker.CircuitBreaker('http://foo.com', failure_threshold=2,
+                                             recovery_timeout=10)
+    breaker.on_failure()
+    breaker.on_timeout()
+    assert breaker.state == circuit_breaker.CLOSED
+    breaker.on_failure()
+    assert breaker.state == circuit_breaker.OPEN
+
+    # a timed out probe does not close the circuit
+    m_time.return_value = 10
+    breaker.before_request()
+    breaker.on_timeout()
+    assert breaker.state == circuit_breaker.OPEN
+
+
+def test_rest_client_interrupted_probe(mocker, m_time):
+    mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=[
+        requests.exceptions.ConnectionError('refused'),
+        KeyboardInterrupt(),
+        mock_response({}),
+    ])
+    client = rest_client.Client(dict(CONFIG, circuit_breaker_threshold=1, retry_max_attempts=1))
+    with pytest.raises(exceptions.ConnectionError):
+        client.get('traintuple', 'a-key')
+
+    m_time.return_value = 100
+    with pytest.raises(KeyboardInterrupt):
+        client.get('traintuple', 'a-key')
+    # the interrupted probe is released, the next request probes the server again
+    assert client.get('traintuple', 'a-key') == {}
+    assert client._circuit_breaker.state == circuit_breaker.CLOSED
@@ -0,0 +1,122 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from substra.sdk import ComputePlanBuilder, exceptions
+
+
+def _ids(tuples, field):
+    return [t[field] for t in tuples]
+
+
+def test_build():
+    builder = ComputePlanBuilder(tag='foo', clean_models=True)
+    # tuples may be added before the tuples they depend on
+    aggregate_id = builder.add_aggregatetuple('algo', 'worker', in_models_ids=['c1', 't1'])
+    t1 = builder.add_traintuple('algo', 'dm', ['s1'], traintuple_id='t1')
+    c1 = builder.add_composite_traintuple('algo', 'dm', ['s2'], composite_traintuple_id='c1')
+    c2 = builder.add_composite_traintuple('algo', 'dm', ['s2'], in_head_model_id=c1,
+                                          in_trunk_model_id=aggregate_id)
+    builder.add_testtuple('objective', c2, tag='test')
+
+    assert builder.get_topological_order() == [t1, c1, aggregate_id, c2]
+
+    payload = builder.build()
+    assert payload['tag'] == 'foo'
+    assert payload['clean_models'] is True
+    assert payload['traintuples'] == [{
+        'traintuple_id': 't1',
+        'algo_key': 'algo',
+        'data_manager_key': 'dm',
+        'train_data_sample_keys': ['s1'],
+        'in_models_ids': [],
+    }]
+    assert _ids(payload['composite_traintuples'], 'composite_traintuple_id') == [c1, c2]
+    assert payload['composite_traintuples'][1]['in_trunk_model_id'] == aggregate_id
+    assert _ids(payload['aggregatetuples'], 'aggregatetuple_id') == [aggregate_id]
+    assert payload['testtuples'] == [
+        {'objective_key': 'objective', 'traintuple_id': c2, 'tag': 'test'}]
+
+    update = builder.build_update()
+    assert 'tag' not in update
+    assert 'clean_models' not in update
+
+
+def test_build_update_existing_tuples():
+    builder = ComputePlanBuilder(existing_ids=['t1'])
+    t2 = builder.add_traintuple('algo', 'dm', ['s1'], in_models_ids=['t1'])
+    builder.add_testtuple('objective', 't1')
+
+    payload = builder.build_update()
+    assert _ids(payload['traintuples'], 'traintuple_id') == [t2]
+    assert len(payload['testtuples']) == 1
+
+
+@pytest.mark.parametrize('add,error', [
+    (lambda b: b.add_traintuple('algo', 'dm', ['s1'], in_models_ids=['unknown']),
+     "references unknown tuple 'unknown'"),
+    (lambda b: b.add_testtuple('objective', 'unknown'),
+     "references unknown tuple 'unknown'"),
+    (lambda b: b.add_composite_traintuple('algo', 'dm', ['s1'], in_head_model_id='t0'),
+     "which is not one of the composite_traintuples"),
+])
+def test_validate_references(add, error):
+    builder = ComputePlanBuilder()
+    builder.add_traintuple('algo', 'dm', ['s1'], traintuple_id='t0')
+    add(builder)
+
+    with pytest.raises(exceptions.InvalidComputePlan) as exc_info:
+        builder.build()
+    assert error in str(exc_info.value)
+
+
+def test_validate_cycle():
+    builder = ComputePlanBuilder()
+    builder.add_traintuple('algo', 'dm', ['s1'], traintuple_id='root')
+    builder.add_traintuple('algo', 'dm', ['s1'], in_models_ids=['root', 'b'], traintuple_id='a')
+    builder.add_traintuple('algo', 'dm', ['s1'], in_models_ids=['a'], traintuple_id='b')
+
+    with pytest.raises(exceptions.InvalidComputePlan) as exc_info:
+        builder.validate()
+    assert exc_info.value.errors == ['Cycle between the tuples a, b']
+
+
+def test_duplicate_id():
+    builder = ComputePlanBuilder(existing_ids=['t1'])
+    with pytest.raises(exceptions.InvalidComputePlan):
+        builder.add_traintuple('algo', 'dm', ['s1'], traintuple_id='t1')
+
+
+def test_validate_large_chain():
+    builder = ComputePlanBuilder()
+    previous_ids = []
+    for i in range(10000):
+        previous_ids = [builder.add_traintuple('algo', 'dm', ['s1'], in_models_ids=previous_ids)]
+    assert len(builder.get_topological_order()) == 10000
+
+
+def test_build_batches():
+    builder = ComputePlanBuilder(tag='foo')
+    ids = []
+    for i in range(5):
+        ids.append(builder.add_traintuple('algo', 'dm', ['s1'], in_models_ids=ids[-1:]))
+    builder.add_testtuple('objective', ids[3])
+
+    payloads = builder.build_batches(2)
+    assert [_ids(p['traintuples'], 'traintuple_id') for p in payloads] == \
+        [ids[0:2], ids[2:4], ids[4:]]
+    assert payloads[0]['tag'] == 'foo'
+    assert 'tag' not in payloads[1]
+    assert [len(p['testtuples']) for p in payloads] == [0, 1, 0]
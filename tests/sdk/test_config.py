@@ -83,3 +83,10 @@ def test_login_without_profile(tmpdir):
 
     with pytest.raises(substra.exceptions.SDKException):
         client.login()
+
+
+def test_client_context_manager(client, mocker):
+    m = mocker.patch.object(client.client, 'close')
+    with client as c:
+        assert c is client
+    m.assert_called_once()
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import hashlib
 import pytest
 import os
+import time
 
 import substra
 
@@ -21,21 +24,29 @@ from .. import datastore
 from .utils import mock_requests_responses, mock_requests, mock_response
 
 
-@pytest.mark.parametrize(
-    'asset_name, filename', [
-        ('dataset', 'opener.py'),
-        ('algo', 'algo.tar.gz'),
-        ('aggregate_algo', 'aggregate_algo.tar.gz'),
-        ('composite_algo', 'composite_algo.tar.gz'),
-        ('objective', 'metrics.py')
-    ]
-)
-def test_download_asset(asset_name, filename, tmp_path, client, mocker):
-    item = getattr(datastore, asset_name.upper())
-    responses = [
+DOWNLOADABLE_ASSETS = [
+    ('dataset', 'opener', 'opener.py'),
+    ('algo', 'content', 'algo.tar.gz'),
+    ('aggregate_algo', 'content', 'aggregate_algo.tar.gz'),
+    ('composite_algo', 'content', 'composite_algo.tar.gz'),
+    ('objective', 'metrics', 'metrics.py'),
+]
+
+
+def _mock_download_responses(asset_name, field, content=b'foo'):
+    item = copy.deepcopy(getattr(datastore, asset_name.upper()))
+    item[field]['hash'] = hashlib.sha256(b'foo').hexdigest()
+    data = mock_response()
+    data.iter_content.return_value = [content]
+    return [
         mock_response(item),  # metadata
-        mock_response('foo'),  # data
+        data,
     ]
+
+
+@pytest.mark.parametrize('asset_name, field, filename', DOWNLOADABLE_ASSETS)
+def test_download_asset(asset_name, field, filename, tmp_path, client, mocker):
+    responses = _mock_download_responses(asset_name, field)
     m = mock_requests_responses(mocker, 'get', responses)
 
     method = getattr(client, f'download_{asset_name}')
@@ -46,6 +57,37 @@ def test_download_asset(asset_name, filename, tmp_path, client, mocker):
     m.assert_called()
 
 
+@pytest.mark.parametrize('asset_name, field, filename', DOWNLOADABLE_ASSETS)
+def test_download_asset_invalid_hash(asset_name, field, filename, tmp_path, client, mocker):
+    responses = _mock_download_responses(asset_name, field, content=b'bar')
+    mock_requests_responses(mocker, 'get', responses)
+
+    method = getattr(client, f'download_{asset_name}')
+    with pytest.raises(substra.sdk.exceptions.InvalidResponse):
+        method("foo", tmp_path)
+
+    assert not os.path.exists(tmp_path / filename)
+
+
+def test_download_asset_cache(tmp_path, client, mocker):
+    client._file_cache = substra.sdk.cache.FileCache(str(tmp_path / 'cache'))
+    responses = _mock_download_responses('algo', 'content')
+    m = mock_requests_responses(mocker, 'get', responses + responses[:1])
+
+    for i in range(2):
+        folder = tmp_path / f'folder_{i}'
+        folder.mkdir()
+        client.download_algo("foo", str(folder))
+        assert (folder / 'algo.tar.gz').read_bytes() == b'foo'
+
+    # the second download only gets the metadata
+    assert m.call_count == 3
+
+    # a file modified in place is not served from the cache
+    (tmp_path / 'folder_1' / 'algo.tar.gz').write_bytes(b'bar')
+    assert client._file_cache.get(hashlib.sha256(b'foo').hexdigest()) is None
+
+
 @pytest.mark.parametrize(
     'asset_name', ['dataset', 'algo', 'aggregate_algo', 'composite_algo', 'objective']
 )
@@ -76,3 +118,130 @@ def test_download_content_not_found(asset_name, tmp_path, client, mocker):
         method("key", tmp_path)
 
     assert m.call_count == 2
+
+
+def _mock_range_server(mocker, content):
+    def get(url, headers=None, **kwargs):
+        headers = headers or {}
+        response = mock_response(headers={
+            'content-length': str(len(content)),
+            'accept-ranges': 'bytes',
+        })
+        data = content
+        if 'Range' in headers:
+            start, end = headers['Range'][len('bytes='):].split('-')
+            data = content[int(start):int(end) + 1 if end else None]
+            response.status_code = 206
+        response.iter_content.side_effect = lambda chunk_size: (
+            data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+        return response
+
+    return mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+
+
+def test_download_resume(tmp_path, client, mocker):
+    content = os.urandom(1000)
+    m = _mock_range_server(mocker, content)
+    (tmp_path / 'algo.tar.gz.part').write_bytes(content[:300])
+
+    downloader = substra.sdk.download.Downloader(client.client, chunk_size=128)
+    path, content_hash = downloader.download('http://foo.io/file', str(tmp_path), 'algo.tar.gz')
+
+    assert m.call_args[1]['headers']['Range'] == 'bytes=300-'
+    assert (tmp_path / 'algo.tar.gz').read_bytes() == content
+    assert content_hash == hashlib.sha256(content).hexdigest()
+    assert not os.path.exists(tmp_path / 'algo.tar.gz.part')
+
+
+def test_download_ranges(tmp_path, client, mocker):
+    content = os.urandom(1000)
+    m = _mock_range_server(mocker, content)
+
+    downloader = substra.sdk.download.Downloader(
+        client.client, chunk_size=64, max_workers=3, range_size=300)
+    path, content_hash = downloader.download('http://foo.io/file', str(tmp_path), 'algo.tar.gz')
+
+    assert m.call_count == 1 + 4
+    assert (tmp_path / 'algo.tar.gz').read_bytes() == content
+    assert content_hash == hashlib.sha256(content).hexdigest()
+
+
+def test_download_deadline(tmp_path, client, mocker):
+    content = os.urandom(1000)
+    _mock_range_server(mocker, content)
+    # the deadline expires while the content is being received, after the request and
+    # the first chunk
+    mocker.patch('substra.sdk.utils.get_remaining_time', side_effect=[
+        10, 10, substra.sdk.exceptions.DeadlineExceeded("Deadline exceeded", None)])
+
+    downloader = substra.sdk.download.Downloader(client.client, chunk_size=128)
+    with pytest.raises(substra.sdk.exceptions.DeadlineExceeded):
+        downloader.download('http://foo.io/file', str(tmp_path), 'algo.tar.gz', deadline=10)
+
+    # the partial content is kept to resume the download
+    assert (tmp_path / 'algo.tar.gz.part').read_bytes() == content[:128]
+    assert not os.path.exists(tmp_path / 'algo.tar.gz')
+
+
+@pytest.mark.parametrize('download', [
+    lambda client, path, deadline: client.download_algo('algo-0', path, deadline=deadline),
+    lambda client, path, deadline: client.download_many(
+        'dataset', ['dataset-0'], path, deadline=deadline),
+    lambda client, path, deadline: client.download_compute_plan(
+        'compute_plan', path, deadline=deadline),
+])
+def test_download_expired_deadline(tmp_path, client, mocker, download):
+    m = mock_requests(mocker, 'get', response=datastore.ALGO)
+
+    with pytest.raises(substra.sdk.exceptions.DeadlineExceeded):
+        download(client, str(tmp_path), time.time() - 1)
+    # the assets are not fetched either
+    m.assert_not_called()
+
+
+def test_download_compute_plan(tmp_path, client, mocker):
+    def _file(name):
+        return {'hash': hashlib.sha256(name.encode()).hexdigest(),
+                'storageAddress': f'http://foo.io/files/{name}'}
+
+    compute_plan = dict(datastore.COMPUTE_PLAN, traintupleKeys=['train-0', 'train-1'],
+                        testtupleKeys=['test-0'])
+    traintuple = dict(datastore.TRAINTUPLE, algo={'hash': 'algo-0'},
+                      dataset={'openerHash': 'dataset-0'}, objective=None)
+    testtuple = dict(datastore.TESTTUPLE, dataset={'openerHash': 'dataset-0'},
+                     objective={'hash': 'objective-0'})
+    items = {
+        'compute_plan': compute_plan,
+        'train-0': traintuple,
+        'train-1': traintuple,
+        'test-0': testtuple,
+        'algo-0': dict(datastore.ALGO, content=_file('algo')),
+        'dataset-0': dict(datastore.DATASET, opener=_file('opener')),
+        # the metrics have the same content as the opener
+        'objective-0': dict(datastore.OBJECTIVE, metrics=_file('opener')),
+    }
+
+    def get(url, **kwargs):
+        name = url.rstrip('/').split('/')[-1]
+        if '/files/' in url:
+            response = mock_response()
+            response.iter_content.return_value = [name.encode()]
+            return response
+        return mock_response(items[name])
+
+    m = mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+    progress = mocker.MagicMock()
+
+    response = client.download_compute_plan('compute_plan', str(tmp_path), max_workers=2,
+                                            progress=progress)
+
+    assert response == {
+        'algo-0': str(tmp_path / 'algo' / 'algo-0' / 'algo.tar.gz'),
+        'dataset-0': str(tmp_path / 'dataset' / 'dataset-0' / 'opener.py'),
+        'objective-0': str(tmp_path / 'dataset' / 'dataset-0' / 'opener.py'),
+    }
+    assert (tmp_path / 'algo' / 'algo-0' / 'algo.tar.gz').read_bytes() == b'algo'
+    # each file is downloaded once
+    assert len([c for c in m.call_args_list if '/files/' in c[0][0]]) == 2
+    assert progress.call_args_list[0][0] == (0, 2)
+    assert progress.call_args[0] == (2, 2)
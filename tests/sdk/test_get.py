@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+
 import pytest
 import substra
 
 from .. import datastore
-from .utils import mock_requests
+from .utils import mock_requests, mock_requests_responses, mock_response
 
 
 @pytest.mark.parametrize('asset_name', [
@@ -48,3 +50,124 @@ def test_get_asset_not_found(client, mocker):
 
     with pytest.raises(substra.sdk.exceptions.NotFound):
         client.get_dataset("magic-key")
+
+
+def test_get_many(client, mocker):
+    def get(url, **kwargs):
+        if 'unknown' in url:
+            return mock_response(status=404)
+        key = url.rstrip('/').split('/')[-1]
+        return mock_response(dict(datastore.TESTTUPLE, key=key))
+
+    m = mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+
+    keys = ['key-0', 'key-1', 'unknown', 'key-3']
+    response = client.get_many('testtuple', keys, max_workers=2)
+
+    assert [r['key'] for r in response[:2]] == keys[:2]
+    assert isinstance(response[2], substra.sdk.exceptions.NotFound)
+    assert response[3]['key'] == keys[3]
+    assert m.call_count == len(keys)
+
+
+@pytest.mark.parametrize('asset', ['foo', 'data_sample', 'model', 'node', 'many'])
+def test_get_many_unknown_asset(client, asset):
+    with pytest.raises(ValueError):
+        client.get_many(asset, ['key'])
+
+
+@pytest.fixture
+def cached_client(client, tmpdir):
+    client._cache = substra.sdk.cache.Cache(str(tmpdir / "cache"))
+    return client
+
+
+def test_get_asset_cache(cached_client, mocker):
+    m = mock_requests_responses(mocker, "get", [mock_response(datastore.ALGO)] * 2)
+
+    assert cached_client.get_algo("magic-key") == datastore.ALGO
+    assert cached_client.get_algo("magic-key") == datastore.ALGO
+    assert m.call_count == 1
+
+    assert cached_client.get_algo("magic-key", cache=False) == datastore.ALGO
+    assert m.call_count == 2
+
+
+@pytest.mark.parametrize('status, call_count', [
+    ('done', 1),
+    ('doing', 2),
+])
+def test_get_asset_cache_running_tuple(cached_client, mocker, status, call_count):
+    item = dict(datastore.TRAINTUPLE, status=status)
+    m = mock_requests_responses(mocker, "get", [mock_response(item)] * 2)
+    cached_client._cache.ttl = -1
+
+    cached_client.get_traintuple("magic-key")
+    assert cached_client.get_traintuple("magic-key") == item
+    assert m.call_count == call_count
+
+
+def test_get_asset_cache_invalidation(cached_client, mocker):
+    m_get = mock_requests_responses(mocker, "get", [mock_response(datastore.DATASET)] * 2)
+    mock_requests(mocker, "post", response={})
+
+    cached_client.get_dataset("magic-key")
+    cached_client.link_dataset_with_data_samples("magic-key", ["foo"])
+    cached_client.get_dataset("magic-key")
+    assert m_get.call_count == 2
+
+
+def test_cache_eviction(tmpdir):
+    cache = substra.sdk.cache.Cache(str(tmpdir), max_size=1500)
+    for i in range(3):
+        cache.set('http://foo.io', 'algo', f'key-{i}', {'content': 'a' * 500})
+        # the modification time is the last access time
+        assert cache.get('http://foo.io', 'algo', 'key-0') is not None
+
+    assert cache.get('http://foo.io', 'algo', 'key-1') is None
+    assert cache.get('http://foo.io', 'algo', 'key-2') is not None
+    # entries are scoped by server
+    assert cache.get('http://bar.io', 'algo', 'key-2') is None
+
+
+def test_cache_size_tracking(tmpdir, mocker):
+    cache = substra.sdk.cache.Cache(str(tmpdir), max_size=10000)
+    walk = mocker.patch('substra.sdk.cache.os.walk', wraps=os.walk)
+    for i in range(20):
+        cache.set('http://foo.io', 'algo', f'key-{i}', {'content': 'a' * 500})
+    cache.set('http://foo.io', 'algo', 'key-0', {'content': 'a' * 100})
+    cache.delete('http://foo.io', 'algo', 'key-1')
+
+    # the folder is only walked to compute the initial size and to evict entries
+    assert 1 < walk.call_count < 5
+    assert cache._get_size() == sum(stat.st_size for _, stat in cache._entries())
+    assert cache._get_size() <= 10000 * cache.EVICTION_RATIO
+
+
+def test_revalidation_cache_eviction():
+    cache = substra.sdk.cache.RevalidationCache(max_entries=2)
+    for i in range(3):
+        response = mock_response({'key': i}, headers={'etag': '"v1"'})
+        cache.set(f'http://foo.io/algo/key-{i}/', None, response)
+        # access the first entry so that it is not the least recently used one
+        assert cache.get('http://foo.io/algo/key-0/') is not None
+
+    assert cache.get('http://foo.io/algo/key-1/') is None
+    entry = cache.get('http://foo.io/algo/key-2/')
+    assert cache.get_body(entry) == {'key': 2}
+
+
+def test_revalidation_cache_max_size():
+    cache = substra.sdk.cache.RevalidationCache(max_size=16 * 100)
+    for i in range(20):
+        response = mock_response({'content': 'a' * 80}, headers={'etag': '"v1"'})
+        cache.set(f'http://foo.io/algo/key-{i}/', None, response)
+    # large bodies are not cached
+    cache.set('http://foo.io/algo/large/', None,
+              mock_response({'content': 'a' * 100}, headers={'etag': '"v1"'}))
+
+    assert cache._size <= 16 * 100
+    assert cache._size == sum(len(e.body) for e in cache._entries.values())
+    assert cache.get('http://foo.io/algo/key-0/') is None
+    assert cache.get('http://foo.io/algo/key-19/') is not None
+    assert cache.get('http://foo.io/algo/large/') is None
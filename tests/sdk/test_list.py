@@ -73,3 +73,14 @@ def test_list_asset_with_filters_failure(client, mocker):
 
     m.assert_not_called()
     assert str(exc_info.value).startswith("Cannot load filters")
+
+
+def test_iter_asset(client, mocker):
+    items = [datastore.TRAINTUPLE]
+    m = mock_requests(mocker, "get", response={'count': 1, 'next': None, 'results': items})
+
+    response = client.iter_traintuple(page_size=10)
+
+    m.assert_not_called()
+    assert list(response) == items
+    assert m.call_args[1]['params'] == 'page=1&page_size=10'
@@ -0,0 +1,100 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+import substra
+
+from .. import datastore
+from .utils import mock_response
+
+NODES = ('node-1', 'node-2', 'node-3')
+
+
+@pytest.fixture
+def multi_client(tmpdir):
+    config_path = str(tmpdir / "substra.cfg")
+    manager = substra.sdk.config.Manager(config_path)
+    for node in NODES:
+        manager.add_profile(node, 'foo', 'password', url=f'http://{node}.io')
+
+    c = substra.MultiClient(NODES, config_path=config_path,
+                            user_paths={n: str(tmpdir / f'{n}-user') for n in NODES})
+    yield c
+    c.close()
+
+
+def _mock_nodes(mocker, responses):
+    def get(url, **kwargs):
+        node = url.split('//')[1].split('.')[0]
+        response = responses[node]
+        if isinstance(response, int):
+            return mock_response(status=response)
+        return mock_response(response)
+
+    return mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+
+
+def test_list_merged(multi_client, mocker):
+    m = _mock_nodes(mocker, {
+        'node-1': [[{'key': 'a'}, {'key': 'b'}]],
+        'node-2': [[{'key': 'b'}, {'key': 'c'}]],
+        'node-3': [[]],
+    })
+
+    items = multi_client.list_traintuple()
+
+    assert items == [
+        {'key': 'a', 'source_nodes': ['node-1']},
+        {'key': 'b', 'source_nodes': ['node-1', 'node-2']},
+        {'key': 'c', 'source_nodes': ['node-2']},
+    ]
+    assert m.call_count == 3
+
+
+def test_node_errors(multi_client, mocker):
+    _mock_nodes(mocker, {
+        'node-1': [[{'key': 'a'}]],
+        'node-2': 404,
+        'node-3': [[{'key': 'b'}]],
+    })
+
+    with pytest.raises(substra.exceptions.NotFound):
+        multi_client.list_algo()
+
+    multi_client.ignore_errors = True
+    results = multi_client.run('list_algo')
+    assert list(results) == ['node-1', 'node-3']
+    assert [i['key'] for i in multi_client.list_algo()] == ['a', 'b']
+
+
+def test_leaderboard(multi_client, mocker):
+    def leaderboard(*testtuples):
+        return dict(datastore.LEADERBOARD, testtuples=[
+            {'key': key, 'dataset': {'perf': perf}} for key, perf in testtuples])
+
+    _mock_nodes(mocker, {
+        'node-1': leaderboard(('a', 0.5), ('b', 0.2)),
+        'node-2': leaderboard(('c', 0.9), ('a', 0.5)),
+        'node-3': leaderboard(),
+    })
+
+    response = multi_client.leaderboard('objective-key')
+
+    assert response['objective'] == datastore.LEADERBOARD['objective']
+    assert [(t['key'], t['source_nodes']) for t in response['testtuples']] == [
+        ('c', ['node-2']),
+        ('a', ['node-1', 'node-2']),
+        ('b', ['node-1']),
+    ]
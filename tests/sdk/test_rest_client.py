@@ -12,6 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import json
+import logging
+import threading
+import time
+
 import pytest
 import requests
 
@@ -82,7 +89,7 @@ def test_request_http_errors(mocker, status_code, http_response, sdk_exception):
 
 
 def test_request_connection_error(mocker):
-    mocker.patch('substra.sdk.rest_client.requests.post',
+    mocker.patch('substra.sdk.rest_client.requests.Session.post',
                  side_effect=requests.exceptions.ConnectionError)
     with pytest.raises(exceptions.ConnectionError):
         rest_client.Client(CONFIG).add('foo', {})
@@ -108,3 +115,257 @@ def test_add_exist_ok(mocker):
     assert len(m_post.call_args_list) == 1
     assert len(m_get.call_args_list) == 1
     assert asset == {"pkhash": "a-key"}
+
+
+def test_session_shared_between_requests(mocker):
+    m = mock_requests_responses(mocker, "get", [
+        mock_response(response={}),
+        mock_response(response={}),
+    ])
+    client = rest_client.Client(CONFIG)
+    session = client._session
+    client.get('traintuple', 'a-key')
+    client.get('traintuple', 'b-key')
+    assert client._session is session
+    assert len(m.call_args_list) == 2
+
+
+def test_pool_config():
+    config = dict(CONFIG, pool_maxsize=32, pool_block=True)
+    client = rest_client.Client(config)
+    adapter = client._session.get_adapter('https://foo.com')
+    assert adapter._pool_maxsize == 32
+    assert adapter._pool_block is True
+
+    # pool is kept as is when pool settings do not change
+    client.set_config(dict(config, token='foo'))
+    assert client._session.get_adapter('https://foo.com') is adapter
+
+
+def test_keep_alive_disabled(mocker):
+    m = mock_requests(mocker, "get", response={})
+    rest_client.Client(dict(CONFIG, keep_alive=False)).get('traintuple', 'a-key')
+    assert m.call_args[1]['headers']['Connection'] == 'close'
+
+
+@pytest.mark.parametrize('prefetch', [True, False])
+def test_iter_list_paginated(mocker, prefetch):
+    pages = {
+        1: {'count': 5, 'next': 'page-2', 'results': [{'key': 0}, {'key': 1}]},
+        2: {'count': 5, 'next': 'page-3', 'results': [{'key': 2}, {'key': 3}]},
+        3: {'count': 5, 'next': None, 'results': [{'key': 4}]},
+    }
+
+    def get(url, params=None, **kwargs):
+        return mock_response(pages[int(params.split('page=')[1].split('&')[0])])
+
+    m = mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+    client = rest_client.Client(CONFIG)
+
+    items = client.iter_list('traintuple', page_size=2, prefetch=prefetch)
+    assert next(items) == {'key': 0}
+    assert [i['key'] for i in items] == [1, 2, 3, 4]
+    assert [c[1]['params'] for c in m.call_args_list] == [
+        f'page={i}&page_size=2' for i in (1, 2, 3)]
+
+
+def test_iter_list_not_paginated(mocker):
+    m = mock_requests(mocker, "get", response=[[{'key': 0}, {'key': 1}], [{'key': 1}]])
+    items = rest_client.Client(CONFIG).iter_list('traintuple', filters=['traintuple:tag:foo'])
+    assert list(items) == [{'key': 0}, {'key': 1}]
+    assert m.call_args[1]['params'] == 'search=traintuple%3Atag%3Afoo&page=1&page_size=1000'
+
+
+def test_iter_list_not_paginated_streamed(mocker):
+    r = mock_response()
+    r.iter_content.return_value = iter([b'[[{"key": 0}, {"ke', b'y": 1}], [{"key": 1}]]'])
+    # the close method of streamed responses is wrapped to release their throttling slot
+    close = r.close
+    mock_requests_responses(mocker, "get", [r])
+
+    items = list(rest_client.Client(CONFIG).iter_list('traintuple'))
+
+    assert items == [{'key': 0}, {'key': 1}]
+    r.json.assert_not_called()
+    assert r.iter_content.call_args[0][0] == rest_client.JSON_STREAM_CHUNK_SIZE
+    close.assert_called_once()
+
+
+def test_iter_list_invalid_json(mocker):
+    r = mock_response()
+    r.iter_content.return_value = iter([b'[[{"key": 0}, {"k'])
+    mock_requests_responses(mocker, "get", [r])
+
+    with pytest.raises(exceptions.InvalidResponse):
+        list(rest_client.Client(CONFIG).iter_list('traintuple'))
+
+
+@pytest.mark.parametrize('compression,expected', [
+    (None, rest_client.ACCEPT_ENCODING),
+    (True, rest_client.ACCEPT_ENCODING),
+    (False, 'identity'),
+])
+def test_response_compression(mocker, compression, expected):
+    config = dict(CONFIG) if compression is None else dict(CONFIG, compression=compression)
+    m = mock_requests(mocker, "get", response={})
+    rest_client.Client(config).get('traintuple', 'a-key')
+    assert m.call_args[1]['headers']['Accept-Encoding'] == expected
+
+
+def test_request_compression(mocker):
+    data = {'traintuples': [{'algo_key': 'a' * 64} for _ in range(100)]}
+    m = mock_requests(mocker, "post", response={})
+    client = rest_client.Client(dict(CONFIG, request_compression_min_size=1024))
+
+    client.add('compute_plan', json=data)
+
+    kwargs = m.call_args[1]
+    assert 'json' not in kwargs
+    assert kwargs['headers']['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(kwargs['data'])) == data
+    assert len(kwargs['data']) < len(json.dumps(data)) / 10
+
+    # small bodies are not compressed
+    m = mock_requests(mocker, "post", response={})
+    client.add('compute_plan', json={'traintuples': []})
+    assert m.call_args[1]['json'] == {'traintuples': []}
+    assert 'Content-Encoding' not in m.call_args[1]['headers']
+
+
+def test_request_compression_not_supported(mocker):
+    data = {'traintuples': [{'algo_key': 'a' * 64} for _ in range(100)]}
+    m = mock_requests_responses(mocker, "post", [
+        mock_response(status=415),
+        mock_response({}),
+        mock_response({}),
+    ])
+    client = rest_client.Client(dict(CONFIG, request_compression_min_size=1024))
+
+    client.add('compute_plan', json=data)
+    client.add('compute_plan', json=data)
+
+    assert m.call_count == 3
+    for c in m.call_args_list[1:]:
+        assert c[1]['json'] == data
+        assert 'Content-Encoding' not in c[1]['headers']
+
+
+def test_transfer_sizes_debug_logs(mocker, caplog):
+    r = mock_response({}, headers={'content-length': '10', 'content-encoding': 'gzip'})
+    r.content = b'x' * 100
+    mock_requests_responses(mocker, "get", [r])
+
+    with caplog.at_level(logging.DEBUG, logger='substra.sdk.rest_client'):
+        rest_client.Client(CONFIG).get('traintuple', 'a-key')
+
+    assert 'received 100 bytes (10 on the wire, encoding=gzip)' in caplog.text
+
+
+def test_revalidation(mocker):
+    headers = {'etag': '"v1"', 'last-modified': 'Wed, 21 Oct 2015 07:28:00 GMT'}
+    m = mock_requests_responses(mocker, "get", [
+        mock_response({'key': 'a-key', 'status': 'doing'}, headers=headers),
+        mock_response(status=304),
+        mock_response({'key': 'a-key', 'status': 'done'}),
+        mock_response({'key': 'a-key', 'status': 'done'}),
+    ])
+    client = rest_client.Client(CONFIG)
+
+    item = client.get('traintuple', 'a-key')
+    item['status'] = 'modified'
+    assert client.get('traintuple', 'a-key') == {'key': 'a-key', 'status': 'doing'}
+    assert client.get('traintuple', 'a-key') == {'key': 'a-key', 'status': 'done'}
+    # the response without validators is not cached
+    client.get('traintuple', 'a-key')
+
+    requests_headers = [c[1]['headers'] for c in m.call_args_list]
+    assert 'If-None-Match' not in requests_headers[0]
+    for h in requests_headers[1:3]:
+        assert h['If-None-Match'] == '"v1"'
+        assert h['If-Modified-Since'] == headers['last-modified']
+    assert 'If-None-Match' not in requests_headers[3]
+
+
+def test_revalidation_by_params(mocker):
+    m = mock_requests_responses(mocker, "get", [
+        mock_response([[{'key': 'a'}]], headers={'etag': '"a"'}),
+        mock_response([[{'key': 'b'}]], headers={'etag': '"b"'}),
+        mock_response(status=304),
+    ])
+    client = rest_client.Client(CONFIG)
+
+    client.list('traintuple', filters=['traintuple:tag:a'])
+    client.list('traintuple', filters=['traintuple:tag:b'])
+    assert client.list('traintuple', filters=['traintuple:tag:a']) == [{'key': 'a'}]
+    assert m.call_args[1]['headers']['If-None-Match'] == '"a"'
+
+
+def test_revalidation_disabled(mocker):
+    m = mock_requests_responses(mocker, "get", [
+        mock_response({}, headers={'etag': '"v1"'}),
+        mock_response({}, headers={'etag': '"v1"'}),
+    ])
+    client = rest_client.Client(dict(CONFIG, revalidation_cache_size=0))
+    client.get('traintuple', 'a-key')
+    client.get('traintuple', 'a-key')
+    assert 'If-None-Match' not in m.call_args[1]['headers']
+
+
+def test_concurrent_get_single_flight(mocker):
+    released = threading.Event()
+
+    def get(url, **kwargs):
+        released.wait(timeout=5)
+        return mock_response({'key': 'a-key'})
+
+    m = mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+    client = rest_client.Client(CONFIG)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(client.get, 'algo', 'a-key') for _ in range(4)]
+        # let all the requests start before the response is received
+        time.sleep(0.2)
+        released.set()
+        results = [f.result() for f in futures]
+
+    assert m.call_count == 1
+    assert results == [{'key': 'a-key'}] * 4
+    assert len({id(r) for r in results}) == 4
+
+
+def test_request_timeouts(mocker):
+    m = mock_requests_responses(mocker, "get", [mock_response({}), mock_response({})])
+
+    rest_client.Client(CONFIG).get('traintuple', 'a-key')
+    assert m.call_args[1]['timeout'] == (rest_client.DEFAULT_CONNECT_TIMEOUT,
+                                         rest_client.DEFAULT_READ_TIMEOUT)
+
+    rest_client.Client(dict(CONFIG, connect_timeout=1, read_timeout=None)).get('algo', 'a-key')
+    assert m.call_args[1]['timeout'] == (1, None)
+
+
+def test_request_deadline(mocker):
+    m = mock_requests(mocker, "get", response={})
+    client = rest_client.Client(CONFIG)
+
+    client.get('traintuple', 'a-key', deadline=time.time() + 60)
+    connect_timeout, read_timeout = m.call_args[1]['timeout']
+    assert connect_timeout == rest_client.DEFAULT_CONNECT_TIMEOUT
+    assert 59 < read_timeout <= 60
+
+    with pytest.raises(exceptions.DeadlineExceeded):
+        client.get('traintuple', 'a-key', deadline=time.time() - 1)
+    assert m.call_count == 1
+
+
+def test_add_deadline_stops_retries(mocker):
+    m_sleep = mocker.patch('substra.sdk.retry.time.sleep')
+    m = mock_requests_responses(mocker, "post", [
+        mock_response(status=503, headers={'Retry-After': '10'}),
+        mock_response({'pkhash': 'a-key'}),
+    ])
+
+    with pytest.raises(exceptions.GatewayUnavailable):
+        rest_client.Client(CONFIG).add('traintuple', json={}, deadline=time.time() + 5)
+    assert m.call_count == 1
+    m_sleep.assert_not_called()
@@ -0,0 +1,162 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import email.utils
+import time
+
+import pytest
+
+from substra.sdk import exceptions, rest_client, retry
+
+from .test_rest_client import CONFIG
+from .utils import mock_response, mock_requests_responses
+
+
+@pytest.fixture
+def m_sleep(mocker):
+    return mocker.patch('substra.sdk.retry.time.sleep')
+
+
+def _failing(errors, result='ok'):
+    errors = list(errors)
+
+    def f():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return f
+
+
+def test_full_jitter():
+    delays = [retry.full_jitter(attempt, base_delay=1, max_delay=5)
+              for attempt in range(6) for _ in range(100)]
+    assert all(0 <= d <= 5 for d in delays)
+    assert max(delays[:100]) <= 1
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.parametrize('value,expected', [
+    (None, None),
+    ('3', 3),
+    ('-1', 0),
+    ('foo', None),
+    (email.utils.formatdate(time.time() - 60, usegmt=True), 0),
+])
+def test_parse_retry_after(value, expected):
+    assert retry.parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_date():
+    value = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 50 < retry.parse_retry_after(value) <= 60
+
+
+@pytest.mark.parametrize('error,idempotent,expected', [
+    (exceptions.GatewayUnavailable('', 503), False, True),
+    (exceptions.GatewayUnavailable('', 504), False, False),
+    (exceptions.GatewayUnavailable('', 504), True, True),
+    (exceptions.TooManyRequests('', 429), False, True),
+    (exceptions.ConnectionError('', None), False, False),
+    (exceptions.ConnectionError('', None), True, True),
+    (exceptions.Timeout('', None), True, True),
+    (exceptions.InternalServerError('', 500), True, False),
+    (exceptions.NotFound('', 404), True, False),
+])
+def test_is_retryable(error, idempotent, expected):
+    assert retry.RetryPolicy.is_retryable(error, idempotent) is expected
+
+
+def test_retry(m_sleep):
+    policy = retry.RetryPolicy(max_attempts=3, base_delay=1, max_delay=2)
+    f = _failing([exceptions.GatewayUnavailable('', 503)] * 2)
+
+    assert policy.call(f) == 'ok'
+    assert m_sleep.call_count == 2
+    assert all(0 <= c[0][0] <= 2 for c in m_sleep.call_args_list)
+    assert policy.metrics == {'calls': 1, 'retries': 2, 'retries.GatewayUnavailable': 2}
+
+
+def test_retry_exhausted(m_sleep):
+    policy = retry.RetryPolicy(max_attempts=3)
+    f = _failing([exceptions.GatewayUnavailable('', 503)] * 3)
+
+    with pytest.raises(exceptions.GatewayUnavailable):
+        policy.call(f)
+    assert m_sleep.call_count == 2
+    assert policy.metrics['retries_exhausted'] == 1
+
+
+def test_retry_after(m_sleep):
+    error = exceptions.TooManyRequests('', 429)
+    error.retry_after = '7'
+    policy = retry.RetryPolicy()
+
+    policy.call(_failing([error]))
+    m_sleep.assert_called_once_with(7)
+
+    # the call is not retried if the server asks to wait beyond the timeout
+    policy.timeout = 5
+    with pytest.raises(exceptions.TooManyRequests):
+        policy.call(_failing([error]))
+    assert m_sleep.call_count == 1
+
+
+def test_retry_not_idempotent(m_sleep):
+    policy = retry.RetryPolicy()
+    with pytest.raises(exceptions.GatewayUnavailable):
+        policy.call(_failing([exceptions.GatewayUnavailable('', 504)]), idempotent=False)
+    m_sleep.assert_not_called()
+
+
+def test_retry_budget(m_sleep):
+    policy = retry.RetryPolicy(max_attempts=100, budget=retry.RetryBudget(ratio=0.5, reserve=2))
+
+    with pytest.raises(exceptions.GatewayUnavailable):
+        policy.call(_failing([exceptions.GatewayUnavailable('', 503)] * 10))
+    assert m_sleep.call_count == 2
+    assert policy.metrics['retry_budget_exhausted'] == 1
+
+    # calls refill the budget
+    policy.call(_failing([]))
+    policy.call(_failing([]))
+    assert policy.call(_failing([exceptions.GatewayUnavailable('', 503)])) == 'ok'
+
+
+def test_rest_client_retries(mocker, m_sleep):
+    m = mock_requests_responses(mocker, 'get', [
+        mock_response(status=503, headers={'Retry-After': '1'}),
+        mock_response({'key': 'a-key'}),
+    ])
+    client = rest_client.Client(CONFIG)
+
+    assert client.get('traintuple', 'a-key') == {'key': 'a-key'}
+    assert m.call_count == 2
+    m_sleep.assert_called_once_with(1)
+    assert client.get_retry_metrics()['retries'] == 1
+
+
+@pytest.mark.parametrize('exist_ok,call_count', [(False, 1), (True, 2)])
+def test_rest_client_post_retries(mocker, m_sleep, exist_ok, call_count):
+    m = mock_requests_responses(mocker, 'post', [
+        mock_response(status=504),
+        mock_response({'pkhash': 'a-key'}),
+    ])
+    client = rest_client.Client(dict(CONFIG, retry_max_attempts=2))
+
+    if exist_ok:
+        client.add('traintuple', exist_ok=True, json={})
+    else:
+        with pytest.raises(exceptions.GatewayUnavailable):
+            client.add('traintuple', json={})
+    assert m.call_count == call_count
@@ -0,0 +1,94 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+from substra.sdk import rest_client, throttling
+
+from .test_rest_client import CONFIG
+from .utils import mock_response
+
+
+def test_token_bucket():
+    bucket = throttling.TokenBucket(rate=50, burst=2)
+
+    tstart = time.monotonic()
+    for _ in range(7):
+        bucket.acquire()
+    elapsed = time.monotonic() - tstart
+
+    # the first 2 tokens are available at once, the next ones at 50 per second
+    assert 0.09 < elapsed < 0.5
+
+
+def test_throttle_max_in_flight():
+    throttle = throttling.Throttle(max_in_flight=2)
+    lock = threading.Lock()
+    in_flight = []
+    max_in_flight = []
+
+    def request(_):
+        with throttle:
+            with lock:
+                in_flight.append(1)
+                max_in_flight.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.pop()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(request, range(16)))
+
+    assert max(max_in_flight) == 2
+
+
+def test_rest_client_throttle(mocker):
+    config = dict(CONFIG, max_requests_per_second=100, max_requests_in_flight=1)
+    client = rest_client.Client(config)
+    throttle = client._throttle
+    assert throttle.rate == 100
+    assert throttle.max_in_flight == 1
+
+    # the throttle is kept as is when its settings do not change
+    client.set_config(dict(config, token='foo'))
+    assert client._throttle is throttle
+
+    in_flight = []
+
+    def get(url, **kwargs):
+        in_flight.append(throttle._semaphore._value)
+        return mock_response({})
+
+    mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+    client.get('traintuple', 'a-key')
+    assert in_flight == [0]
+    assert throttle._semaphore._value == 1
+
+
+def test_rest_client_throttle_stream(mocker):
+    config = dict(CONFIG, max_requests_in_flight=1)
+    client = rest_client.Client(config)
+    throttle = client._throttle
+
+    mocker.patch('substra.sdk.rest_client.requests.Session.get',
+                 return_value=mock_response({}))
+    response = client.get_data('http://foo.io/algo/a-key/file/', stream=True)
+
+    # the slot is held while the body is read
+    assert throttle._semaphore._value == 0
+    response.close()
+    response.close()
+    assert throttle._semaphore._value == 1
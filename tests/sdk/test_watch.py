@@ -0,0 +1,141 @@
+# Copyright 2018 Owkin, inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+import substra
+
+from .. import datastore
+from .utils import mock_requests, mock_requests_responses, mock_response
+
+
+@pytest.fixture
+def m_sleep(mocker):
+    return mocker.patch('substra.sdk.utils.time.sleep')
+
+
+def test_wait(client, mocker, m_sleep):
+    statuses = ['todo', 'doing', 'doing', 'doing', 'done']
+    m = mock_requests_responses(mocker, 'get', [
+        mock_response(dict(datastore.TRAINTUPLE, status=s)) for s in statuses])
+
+    response = client.wait('traintuple', 'magic-key', min_delay=1, max_delay=3)
+
+    assert response['status'] == 'done'
+    assert m.call_count == len(statuses)
+    # the delay is reset on status changes and increased otherwise
+    assert [c[0][0] for c in m_sleep.call_args_list] == [1, 1, 2, 3]
+
+
+def test_wait_timeout(client, mocker, m_sleep):
+    mock_requests(mocker, 'get', response=dict(datastore.TRAINTUPLE, status='doing'))
+
+    with pytest.raises(substra.sdk.exceptions.WaitTimeout):
+        client.wait('traintuple', 'magic-key', timeout=0)
+    m_sleep.assert_not_called()
+
+
+def test_wait_invalid_asset(client):
+    with pytest.raises(ValueError):
+        client.wait('algo', 'magic-key')
+
+
+def test_watch_compute_plan(client, mocker, m_sleep):
+    compute_plan = dict(datastore.COMPUTE_PLAN, traintupleKeys=['train-0', 'train-1'],
+                        testtupleKeys=[], tupleCount=2)
+    responses = {
+        'compute_plan': [
+            dict(compute_plan, status='doing', doneCount=0),
+            dict(compute_plan, status='doing', doneCount=1),
+            dict(compute_plan, status='done', doneCount=2),
+        ],
+        'train-0': [
+            dict(datastore.TRAINTUPLE, status='doing'),
+            dict(datastore.TRAINTUPLE, status='done'),
+        ],
+        'train-1': [
+            dict(datastore.TRAINTUPLE, status='todo'),
+            dict(datastore.TRAINTUPLE, status='todo'),
+            dict(datastore.TRAINTUPLE, status='done'),
+        ],
+    }
+
+    def get(url, **kwargs):
+        key = url.rstrip('/').split('/')[-1]
+        return mock_response(responses[key].pop(0))
+
+    mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+
+    events = [(e['asset'], e['key'], e['previous_status'], e['status'])
+              for e in client.watch_compute_plan('compute_plan')]
+
+    assert events == [
+        ('traintuple', 'train-0', None, 'doing'),
+        ('traintuple', 'train-1', None, 'todo'),
+        ('compute_plan', 'compute_plan', None, 'doing'),
+        ('traintuple', 'train-0', 'doing', 'done'),
+        ('compute_plan', 'compute_plan', 'doing', 'doing'),
+        ('traintuple', 'train-1', 'todo', 'done'),
+        ('compute_plan', 'compute_plan', 'doing', 'done'),
+    ]
+    # the tuples which have ended are not fetched anymore
+    assert all(not r for r in responses.values())
+    assert m_sleep.call_count == 2
+
+
+def test_watch_compute_plan_updated(client, mocker, m_sleep):
+    compute_plan = dict(datastore.COMPUTE_PLAN, traintupleKeys=['train-0'], testtupleKeys=[])
+    updated_compute_plan = dict(compute_plan, testtupleKeys=['test-0'])
+    responses = {
+        'compute_plan': [
+            dict(compute_plan, status='doing', doneCount=0, tupleCount=1),
+            dict(updated_compute_plan, status='doing', doneCount=1, tupleCount=2),
+            dict(updated_compute_plan, status='done', doneCount=2, tupleCount=2),
+        ],
+        'train-0': [
+            dict(datastore.TRAINTUPLE, status='doing'),
+            dict(datastore.TRAINTUPLE, status='done'),
+        ],
+        'test-0': [
+            dict(datastore.TESTTUPLE, status='doing'),
+            dict(datastore.TESTTUPLE, status='done'),
+        ],
+    }
+
+    def get(url, **kwargs):
+        key = url.rstrip('/').split('/')[-1]
+        return mock_response(responses[key].pop(0))
+
+    mocker.patch('substra.sdk.rest_client.requests.Session.get', side_effect=get)
+
+    events = [(e['asset'], e['key'], e['status'])
+              for e in client.watch_compute_plan('compute_plan')]
+
+    # the testtuple added by the update is watched as well
+    assert ('testtuple', 'test-0', 'doing') in events
+    assert ('testtuple', 'test-0', 'done') in events
+    assert all(not r for r in responses.values())
+
+
+def test_watch_compute_plan_log(client, mocker, m_sleep, caplog):
+    mock_requests(mocker, 'get', status=404)
+    caplog.set_level('INFO', logger='substra.sdk.client')
+
+    # the generator is logged once consumed, not when it is created
+    watch = client.watch_compute_plan('compute_plan')
+    assert 'watch_compute_plan: done' not in caplog.text
+
+    with pytest.raises(substra.sdk.exceptions.NotFound):
+        list(watch)
+    assert 'watch_compute_plan: done' in caplog.text
+    assert 'error=NotFound' in caplog.text
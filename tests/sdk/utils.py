@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 from unittest import mock
 
 import requests
@@ -24,8 +25,11 @@ def mock_response(response=None, status=200, headers=None):
     m.headers = headers
     m.text = str(response)
     m.json = mock.MagicMock(return_value=response, headers=headers)
+    if response is not None:
+        m.content = json.dumps(response).encode('utf-8')
+        m.iter_content = mock.MagicMock(return_value=[m.content])
 
-    if status not in (200, 201):
+    if status >= 400:
         exception = requests.exceptions.HTTPError(str(status), response=m)
         m.raise_for_status = mock.MagicMock(side_effect=exception)
 
@@ -34,7 +38,7 @@ def mock_response(response=None, status=200, headers=None):
 
 def mock_requests_responses(mocker, method, responses):
     return mocker.patch(
-        f'substra.sdk.rest_client.requests.{method}',
+        f'substra.sdk.rest_client.requests.Session.{method}',
         side_effect=responses,
     )
 
@@ -118,13 +118,21 @@ def test_command_login(workdir, mocker):
 ])
 def test_command_list(asset_name, key_field, workdir, mocker):
     item = getattr(datastore, asset_name.upper())
-    method_name = f'list_{asset_name}'
-    m = mock_client_call(mocker, method_name, [item])
+    method_name = f'iter_{asset_name}'
+    m = mock_client_call(mocker, method_name, iter([item]))
     output = client_execute(workdir, ['list', asset_name])
     m.assert_called()
     assert item[key_field] in output
 
 
+@pytest.mark.parametrize('output_format', ['pretty', 'json'])
+def test_command_list_stream(workdir, mocker, output_format):
+    items = [dict(datastore.ALGO, name=f'algo-{i}') for i in range(3)]
+    mock_client_call(mocker, 'iter_algo', iter(items))
+    output = client_execute(workdir, ['list', 'algo', '-o', output_format])
+    assert all(item['name'] in output for item in items)
+
+
 def test_command_list_node(workdir, mocker):
     mock_client_call(mocker, 'list_node', datastore.NODES)
     output = client_execute(workdir, ['list', 'node'])
@@ -261,6 +269,37 @@ def test_command_add_data_sample(workdir, mocker):
     assert re.search(r"Directory '.*' does not exist\.", res)
 
 
+def test_command_add_data_sample_archive_stats(workdir, mocker):
+    temp_dir = workdir / "test"
+    temp_dir.mkdir()
+
+    mock_client_call(mocker, 'add_data_samples', response=['key-0'])
+    mock_client_call(mocker, 'get_archive_stats', response={
+        'archives': 1, 'files_size': 4012, 'stored_size': 12, 'archive_size': 300,
+        'duration': 0.5, 'bytes_saved': 3712, 'time_saved': 0.25,
+    })
+    res = client_execute(workdir, ['add', 'data_sample', str(temp_dir), '--dataset-key', 'foo'])
+    assert '4012 bytes into 300 bytes, 3712 bytes and ~0.25s saved' in res
+
+
+def test_command_add_data_sample_in_batches(workdir, mocker):
+    temp_dir = workdir / "test"
+    (temp_dir / "sample_0").mkdir(parents=True)
+    journal = workdir / "journal"
+
+    m = mock_client_call(mocker, 'add_data_samples_in_batches', response=['key-0'])
+    client_execute(workdir, ['add', 'data_sample', str(temp_dir), '--dataset-key', 'foo',
+                             '--multiple', '--batch-size', '5', '--workers', '2',
+                             '--journal', str(journal), '--precheck'])
+    m.assert_called()
+    assert m.call_args[1] == {'batch_size': 5, 'max_workers': 2, 'journal_path': str(journal),
+                              'stream': False, 'compression': None, 'precheck': True}
+
+    res = client_execute(workdir, ['add', 'data_sample', str(temp_dir), '--dataset-key', 'foo',
+                                   '--batch-size', '5'], exit_code=2)
+    assert 'requires the --multiple' in res
+
+
 @pytest.mark.parametrize('asset_name, params', [
     ('dataset', []),
     ('algo', []),
@@ -314,6 +353,15 @@ def test_command_get(asset_name, key_field, workdir, mocker):
     assert item[key_field] in output
 
 
+def test_command_get_no_cache(workdir, mocker):
+    m = mock_client_call(mocker, 'get_algo', datastore.ALGO)
+    client_execute(workdir, ['get', 'algo', 'fakekey'])
+    assert m.call_args[1] == {'cache': True}
+
+    client_execute(workdir, ['get', 'algo', 'fakekey', '--no-cache'])
+    assert m.call_args[1] == {'cache': False}
+
+
 def test_command_describe(workdir, mocker):
     response = "My description."
     m = mock_client_call(mocker, 'describe_objective', response)
@@ -328,12 +376,37 @@ def test_command_download(workdir, mocker):
     m.assert_called()
 
 
+def test_command_download_compute_plan(workdir, mocker):
+    def download_compute_plan(key, folder, max_workers, progress):
+        progress(0, 2)
+        progress(2, 2)
+        return {'foo': 'bar'}
+
+    m = mock_client_call(mocker, 'download_compute_plan', side_effect=download_compute_plan)
+    output = client_execute(workdir, ['download', 'compute_plan', 'fakekey', '--workers', '3'])
+    assert m.call_args[1]['max_workers'] == 3
+    assert '"foo": "bar"' in output
+
+
 def test_command_cancel_compute_plan(workdir, mocker):
     m = mock_client_call(mocker, 'cancel_compute_plan', datastore.COMPUTE_PLAN)
     client_execute(workdir, ['cancel', 'compute_plan', 'fakekey'])
     m.assert_called()
 
 
+def test_command_watch_compute_plan(workdir, mocker):
+    events = [
+        {'asset': 'traintuple', 'key': 'foo', 'status': 'done', 'item': datastore.TRAINTUPLE},
+        {'asset': 'compute_plan', 'key': 'bar', 'status': 'done',
+         'item': datastore.COMPUTE_PLAN},
+    ]
+    m = mock_client_call(mocker, 'watch_compute_plan', iter(events))
+    output = client_execute(workdir, ['watch', 'compute_plan', 'bar', '--timeout', '10'])
+    assert m.call_args[1] == {'timeout': 10}
+    assert 'traintuple foo: done' in output
+    assert 'compute_plan bar: done (2/2)' in output
+
+
 def test_command_leaderboard(workdir, mocker):
     m = mock_client_call(mocker, 'leaderboard', datastore.LEADERBOARD)
     client_execute(workdir, ['leaderboard', 'fakekey'])
@@ -53,3 +53,22 @@ def test_get_asset_printer(asset, output_format, printer_cls):
 ])
 def test_get_leaderboard_printer(output_format, printer_cls):
     assert isinstance(printers.get_leaderboard_printer(output_format), printer_cls)
+
+
+def test_print_table_chunks(capsys):
+    fields = (printers.Field('Name', 'name'), printers.Field('Owner', 'owner'))
+    items = [{'name': 'a', 'owner': 'b'}, {'name': 'c', 'owner': 'd'},
+             {'name': 'a' * 20, 'owner': 'e'}]
+
+    printers.BasePrinter().print_table(iter(items), fields, chunk_size=2)
+    lines = capsys.readouterr().out.splitlines()
+
+    # the header is printed once, with the first chunk
+    assert [line.split() for line in lines] == [
+        ['NAME', 'OWNER'],
+        ['a', 'b'],
+        ['c', 'd'],
+        ['a' * 20, 'e'],
+    ]
+    # the columns grow with the following chunks
+    assert lines[1].index('b') < lines[3].index('e')
@@ -12,7 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
+import io
 import os
+import threading
+import time
 import zipfile
 
 import pytest
@@ -59,6 +63,134 @@ def test_zip_folder(tmp_path):
         assert path.read_text() == content
 
 
+@pytest.mark.parametrize('max_workers', [None, 4])
+@pytest.mark.parametrize('compression, compress_types', [
+    ('store', [zipfile.ZIP_STORED, zipfile.ZIP_STORED]),
+    ('fast', [zipfile.ZIP_DEFLATED, zipfile.ZIP_DEFLATED]),
+    ('default', [zipfile.ZIP_DEFLATED, zipfile.ZIP_DEFLATED]),
+    ('best', [zipfile.ZIP_DEFLATED, zipfile.ZIP_DEFLATED]),
+    ('auto', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED]),
+])
+def test_zip_folder_compression(tmp_path, compression, compress_types, max_workers):
+    dir_to_zip = tmp_path / "dir"
+    dir_to_zip.mkdir()
+    (dir_to_zip / "image.JPG").write_bytes(b"jpeg content")
+    (dir_to_zip / "data.csv").write_text("a,b\n" * 1000)
+
+    fp = io.BytesIO()
+    stats = utils.zip_folder(fp, str(dir_to_zip), compression=compression,
+                             max_workers=max_workers)
+
+    with zipfile.ZipFile(fp) as zipf:
+        assert zipf.testzip() is None
+        types = {i.filename: i.compress_type for i in zipf.infolist()}
+        assert [types['image.JPG'], types['data.csv']] == compress_types
+        assert zipf.read('data.csv') == b"a,b\n" * 1000
+
+    assert stats.files_size == 12 + 4000
+    assert stats.archive_size == len(fp.getvalue())
+    assert stats.stored_size == sum(
+        size for t, size in zip(compress_types, (12, 4000)) if t == zipfile.ZIP_STORED)
+    assert stats.bytes_saved == 4012 - len(fp.getvalue())
+    if compression == 'auto':
+        assert stats.time_saved >= 0
+    elif compression == 'store':
+        # no file has been compressed to estimate the compression throughput
+        assert stats.time_saved is None
+    else:
+        assert stats.time_saved == 0
+
+
+def test_archive_stats_merge(tmp_path):
+    (tmp_path / "image.jpg").write_bytes(b"jpeg content")
+    (tmp_path / "data.csv").write_text("a,b\n" * 1000)
+    total = utils.ArchiveStats()
+
+    archives = [b''.join(utils.ZipStream(str(tmp_path), compression='auto', on_stats=total.merge))
+                for _ in range(2)]
+
+    assert total.archives == 2
+    assert total.files_size == 2 * 4012
+    assert total.stored_size == 2 * 12
+    assert total.archive_size == sum(len(a) for a in archives)
+    assert total.to_dict()['bytes_saved'] == total.files_size - total.archive_size
+
+
+def test_zip_folder_invalid_compression(tmp_path):
+    (tmp_path / "data.csv").write_text("a,b")
+    with pytest.raises(ValueError):
+        utils.zip_folder(io.BytesIO(), str(tmp_path), compression='foo')
+
+
+def test_zip_stream(tmp_path):
+    dir_to_zip = tmp_path / "dir"
+    (dir_to_zip / "subdir").mkdir(parents=True)
+    contents = {
+        "name0.txt": os.urandom(1024 * 1024),
+        "subdir/name1.txt": b"content1" * 1000,
+    }
+    for name, content in contents.items():
+        (dir_to_zip / name).write_bytes(content)
+
+    chunk_size = 16 * 1024
+    stream = utils.ZipStream(str(dir_to_zip), chunk_size=chunk_size)
+    chunks = list(stream)
+    # memory is bounded by the chunk size and the compressor output
+    assert max(len(c) for c in chunks) < 4 * chunk_size
+    # the stream can be consumed again (e.g. when a request is retried)
+    assert b''.join(stream) == b''.join(chunks)
+
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zipf:
+        assert zipf.testzip() is None
+        for name, content in contents.items():
+            assert zipf.read(name) == content
+
+
+def test_zip_stream_parallel(tmp_path):
+    dir_to_zip = tmp_path / "dir"
+    (dir_to_zip / "subdir").mkdir(parents=True)
+    contents = {f"subdir/name{i}.txt": f"content{i}".encode() * 1000 for i in range(20)}
+    contents["random.bin"] = os.urandom(1024 * 1024)
+    contents["unicodé.txt"] = b"unicode"
+    for name, content in contents.items():
+        (dir_to_zip / name).write_bytes(content)
+
+    stream = utils.ZipStream(str(dir_to_zip), chunk_size=16 * 1024, max_workers=3)
+    archive = b''.join(stream)
+    # archives are identical whatever the number of workers
+    assert archive == b''.join(utils.ZipStream(str(dir_to_zip), max_workers=8))
+
+    with zipfile.ZipFile(io.BytesIO(archive)) as zipf:
+        assert zipf.testzip() is None
+        assert sorted(zipf.namelist()) == sorted(contents)
+        for name, content in contents.items():
+            assert zipf.read(name) == content
+
+
+def test_get_data_sample_hash(tmp_path):
+    (tmp_path / "subdir").mkdir()
+    (tmp_path / "a.txt").write_bytes(b"a")
+    (tmp_path / "subdir" / "b.txt").write_bytes(b"b")
+
+    # sha256 of the sorted sha256 hex digests of the files
+    file_hashes = sorted(hashlib.sha256(c).hexdigest() for c in (b"a", b"b"))
+    expected = hashlib.sha256(''.join(file_hashes).encode()).hexdigest()
+    assert utils.get_data_sample_hash(str(tmp_path)) == expected
+
+    # the hash only depends on the files content
+    (tmp_path / "subdir" / "b.txt").rename(tmp_path / "c.txt")
+    assert utils.get_data_sample_hash(str(tmp_path)) == expected
+
+
+def test_multipart_stream():
+    body = utils.MultipartStream({'json': '{}'}, {'foo': [b'abc', b'def']})
+    content = b''.join(body)
+    assert body.content_type.endswith(body.boundary)
+    assert b'name="json"\r\n\r\n{}\r\n' in content
+    assert b'filename="foo"\r\nContent-Type: application/octet-stream\r\n\r\nabcdef\r\n' in content
+    assert content.endswith(f'--{body.boundary}--\r\n'.encode())
+
+
 @pytest.mark.parametrize('raw, parsed', [
     (['foo'], ['foo']),
     (['foo', 'bar'], ['foo,bar']),
@@ -90,3 +222,109 @@ def test_parse_filters(raw, parsed, exception):
             utils.parse_filters(raw)
     else:
         assert utils.parse_filters(raw) == parsed
+
+
+@pytest.mark.parametrize('list_of_list, expected', [
+    ([[{'key': 'a', 'v': 1}, {'key': 'b'}], [{'key': 'a', 'v': 2}]],
+     [{'key': 'a', 'v': 1}, {'key': 'b'}]),
+    ([[{'pkhash': 'a'}], [{'pkhash': 'a'}, {'pkhash': 'b'}]], [{'pkhash': 'a'}, {'pkhash': 'b'}]),
+    ([[{'id': 'foo'}, {'id': 'bar'}], [{'id': 'foo'}]], [{'id': 'foo'}, {'id': 'bar'}]),
+    ([['a', 'b'], ['a']], ['a', 'b']),
+    ([], []),
+])
+def test_flatten(list_of_list, expected):
+    assert utils.flatten(list_of_list) == expected
+
+
+def test_iter_flatten_is_lazy():
+    def pages():
+        yield [{'key': 'a'}]
+        raise AssertionError('the second page must not be consumed')
+
+    assert next(utils.iter_flatten(pages())) == {'key': 'a'}
+
+
+def _split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture(params=['builtin', 'ijson'])
+def json_backend(request, monkeypatch):
+    if request.param == 'ijson':
+        pytest.importorskip('ijson')
+    else:
+        monkeypatch.setattr(utils, 'ijson', None)
+    return request.param
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+@pytest.mark.parametrize('body,expected', [
+    (b'[]', []),
+    (b' [ [ ] , [ ] ] ', []),
+    (b'[[{"key": "a", "size": 12345}, {"key": "\xc3\xa9t\xc3\xa9"}], [1.5, null, [2]]]',
+     [{'key': 'a', 'size': 12345}, {'key': 'été'}, 1.5, None, [2]]),
+    (b'[{"key": "a"}, {"key": "b"}]', [{'key': 'a'}, {'key': 'b'}]),
+])
+def test_json_stream_iter_items(json_backend, chunk_size, body, expected):
+    items = utils.JsonStream(_split(body, chunk_size)).iter_items()
+    assert list(items) == expected
+
+
+@pytest.mark.parametrize('body', [b'', b'[{"key": "a"}', b'[{"key": "a"}}]', b'[1] 2'])
+def test_json_stream_iter_items_invalid(json_backend, body):
+    with pytest.raises(ValueError):
+        list(utils.JsonStream(_split(body, 2)).iter_items())
+
+
+def test_json_stream_iter_items_is_lazy(json_backend):
+    def chunks():
+        yield b'[[{"key": "a"}, '
+        raise AssertionError('the body must not be read entirely')
+
+    assert next(utils.JsonStream(chunks()).iter_items()) == {'key': 'a'}
+
+
+def test_json_stream_peek_and_load():
+    body = utils.JsonStream([b'  ', b'\n {"results"', b': []}'])
+    assert body.peek() == '{'
+    assert body.load() == {'results': []}
+
+
+def test_single_flight():
+    single_flight = utils.SingleFlight()
+    calls = []
+    results = []
+
+    def follow():
+        results.append(single_flight.do('key', lambda: calls.append('follower')))
+
+    followers = [threading.Thread(target=follow) for _ in range(4)]
+
+    def lead():
+        calls.append('leader')
+        for t in followers:
+            t.start()
+        # let the followers wait for the result of the running call
+        time.sleep(0.2)
+        return {'key': 'value'}
+
+    result = single_flight.do('key', lead)
+    for t in followers:
+        t.join()
+
+    assert calls == ['leader']
+    assert results == [result] * 4
+    assert all(r is not result for r in results)
+    # the key is released once the call is done
+    assert single_flight.do('key', lambda: 'other') == 'other'
+
+
+def test_single_flight_error():
+    single_flight = utils.SingleFlight()
+
+    def fail():
+        raise ValueError('error')
+
+    with pytest.raises(ValueError):
+        single_flight.do('key', fail)
+    assert single_flight.do('key', lambda: 'value') == 'value'